@@ -0,0 +1,46 @@
+# POST endpoint for the combined Orkes analysis agent
+
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel
+from typing import List
+from services.ai_prompts import ai_service
+from services.llm_cache import llm_cache
+from services import pre_classifier
+
+router = APIRouter()
+
+class TranscriptRequest(BaseModel):
+    call_id: str
+    transcript: str
+
+class AnalysisResponse(BaseModel):
+    call_id: str
+    score: int
+    concerns: List[str]
+
+@router.post("/api/ai/analysis", response_model=AnalysisResponse)
+async def get_analysis(request: TranscriptRequest):
+    """
+    Endpoint for the Orkes call analysis agent: urgency score (1-10) and key concerns
+    for a 911 call transcript from a single model request.
+    """
+    try:
+        result = await ai_service.get_analysis(request.transcript)
+        return AnalysisResponse(call_id=request.call_id, score=result["score"], concerns=result["concerns"])
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/metrics/ai-cache")
+async def ai_cache_metrics():
+    """Model response cache hits, misses and coalesced requests"""
+    return llm_cache.get_stats()
+
+@router.get("/metrics/preclassifier")
+async def preclassifier_metrics():
+    """How many transcripts the local pre-classifier answered versus escalated to the model"""
+    return pre_classifier.get_stats()
+
+@router.get("/metrics/ai-client")
+async def ai_client_metrics():
+    """Model requests, timeouts and per-priority slot usage"""
+    return ai_service.get_stats()
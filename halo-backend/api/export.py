@@ -0,0 +1,28 @@
+# Streaming NDJSON export of calls for offline QA and analytics
+
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Query
+from fastapi.responses import StreamingResponse
+from services.call_export import stream_export
+
+router = APIRouter()
+
+@router.get("/export/calls")
+async def export_calls(
+    status: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    include_archived: bool = Query(False)
+):
+    """
+    Every call that started in [since, until), optionally only one status, as NDJSON: one
+    call per line with its transcripts, insights and units nested. Rows are streamed from
+    a server-side cursor, so the export can be any size. include_archived adds calls
+    already moved to the archive (they come first).
+    """
+    filename = f"calls-{datetime.now().strftime('%Y%m%d-%H%M%S')}.ndjson"
+    return StreamingResponse(stream_export(status, since, until, include_archived),
+                             media_type="application/x-ndjson",
+                             headers={"Content-Disposition": f'attachment; filename="{filename}"'})
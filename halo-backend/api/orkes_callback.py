@@ -0,0 +1,58 @@
+# Completion callbacks from the Orkes workflows, and result lookups
+
+import hmac
+import os
+
+from fastapi import APIRouter, Header, HTTPException
+from pydantic import BaseModel
+from typing import Any, Optional, Union
+from services.orkes_client import workflow_results
+
+# Shared with the workflows' notify_result task (Orkes secret halo_callback_secret).
+# Unset, every callback is refused and results arrive through the fallback poll.
+ORKES_CALLBACK_SECRET = os.getenv("ORKES_CALLBACK_SECRET")
+
+router = APIRouter()
+
+class WorkflowCallback(BaseModel):
+    workflow_id: str
+    workflow_name: Optional[str] = None
+    call_id: Optional[str] = None
+    status: str = "COMPLETED"
+    output: Any = None
+    # Epoch milliseconds the result-producing task finished, when Orkes provides it
+    end_time: Optional[Union[int, float, str]] = None
+
+@router.post("/api/orkes/callback")
+async def workflow_callback(callback: WorkflowCallback,
+                            x_orkes_callback_secret: Optional[str] = Header(None)):
+    """
+    Final task of each Orkes workflow: makes the result visible as soon as it exists
+    instead of waiting for the next status poll. Only workflows the backend started are accepted.
+    """
+    if not ORKES_CALLBACK_SECRET or not x_orkes_callback_secret or not hmac.compare_digest(
+            x_orkes_callback_secret.encode(), ORKES_CALLBACK_SECRET.encode()):
+        raise HTTPException(status_code=401, detail="Invalid callback secret")
+    if workflow_results.is_finished(callback.workflow_id):
+        # Already completed by the poller or an earlier callback
+        return {"status": "ok", "duplicate": True}
+    if not workflow_results.is_pending(callback.workflow_id):
+        raise HTTPException(status_code=404, detail="Workflow not found")
+    result = workflow_results.complete(
+        callback.workflow_id,
+        callback.status,
+        callback.output,
+        callback.end_time,
+        source="callback",
+        name=callback.workflow_name,
+        call_id=callback.call_id,
+    )
+    return {"status": "ok", "duplicate": result is None}
+
+@router.get("/api/orkes/workflows/{workflow_id}")
+async def get_workflow_result(workflow_id: str):
+    """Result of a workflow started by the backend, or RUNNING while it is pending"""
+    result = workflow_results.get(workflow_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Workflow not found")
+    return result
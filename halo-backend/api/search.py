@@ -0,0 +1,48 @@
+# GET endpoint for full-text transcript search
+
+from datetime import datetime
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+from db.models import get_async_db
+from services.transcript_search import search_transcripts, SearchUnavailable, SEARCH_MAX_PAGE_SIZE
+
+router = APIRouter()
+
+class TranscriptMatch(BaseModel):
+    transcript_id: int
+    call_id: int
+    external_call_id: Optional[str] = None
+    call_status: Optional[str] = None
+    speaker: str
+    timestamp: datetime
+    snippet: str  # HTML-escaped text with matches wrapped in <mark>
+    rank: float
+
+class SearchResponse(BaseModel):
+    query: str
+    results: List[TranscriptMatch]
+    next_offset: Optional[int] = None
+
+@router.get("/search/transcripts", response_model=SearchResponse)
+async def search(
+    q: str = Query(..., min_length=1, max_length=500),
+    status: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = Query(20, ge=1, le=SEARCH_MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Search transcript text, best matches first. All words must match; use "quotes" for a
+    phrase and word* for a prefix. Filter by call status (active/completed) and by a
+    [since, until) time window; pass next_offset back as offset for the next page.
+    """
+    try:
+        results, has_more = await search_transcripts(db, q, status, since, until, limit, offset)
+    except SearchUnavailable as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    return SearchResponse(query=q, results=results, next_offset=offset + limit if has_more else None)
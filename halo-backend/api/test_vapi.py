@@ -1,13 +1,16 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from db.models import get_db, Call, Transcript
+from fastapi import APIRouter, Depends, Header, Query, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from db.models import get_async_db, get_async_writer_db, Call
+from services.transcript_feed import transcript_page_query, transcript_etag, page_etag_parts, etag_matches, next_cursor_headers, MAX_PAGE_SIZE
 from datetime import datetime
+from typing import Optional
 import json
 
 router = APIRouter()
 
 @router.post("/test/vapi/call-start")
-async def test_call_start(db: Session = Depends(get_db)):
+async def test_call_start(db: AsyncSession = Depends(get_async_writer_db)):
     """Test endpoint to simulate a VAPI call start"""
     test_data = {
         "message": {
@@ -31,7 +34,7 @@ async def test_call_start(db: Session = Depends(get_db)):
     }
 
 @router.post("/test/vapi/transcript")
-async def test_transcript(db: Session = Depends(get_db)):
+async def test_transcript(db: AsyncSession = Depends(get_async_writer_db)):
     """Test endpoint to simulate a VAPI transcript"""
     test_data = {
         "message": {
@@ -57,13 +60,31 @@ async def test_transcript(db: Session = Depends(get_db)):
     }
 
 @router.get("/test/calls/{external_call_id}")
-async def get_test_call(external_call_id: str, db: Session = Depends(get_db)):
-    """Get call data by external VAPI call ID"""
-    call = db.query(Call).filter(Call.external_call_id == external_call_id).first()
+async def get_test_call(
+    external_call_id: str,
+    response: Response,
+    since_id: Optional[int] = None,
+    since_ts: Optional[datetime] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get call data by external VAPI call ID; since_id/since_ts return only newer transcripts"""
+    result = await db.execute(select(Call).where(Call.external_call_id == external_call_id))
+    call = result.scalars().first()
     if not call:
         return {"error": "Call not found"}
     
-    transcripts = db.query(Transcript).filter(Transcript.call_id == call.id).all()
+    # The payload also carries call status, so it is part of the tag
+    etag = await transcript_etag(db, call.id, call.status, call.current_score,
+                                 *page_etag_parts(since_id, since_ts, limit))
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    
+    result = await db.execute(transcript_page_query(call.id, since_id=since_id, since_ts=since_ts, limit=limit))
+    transcripts = result.scalars().all()
+    response.headers["ETag"] = etag
+    response.headers.update(next_cursor_headers(transcripts, limit))
     
     return {
         "call": {
@@ -74,6 +95,7 @@ async def get_test_call(external_call_id: str, db: Session = Depends(get_db)):
         },
         "transcripts": [
             {
+                "id": t.id,
                 "speaker": t.speaker,
                 "text": t.text, 
                 "timestamp": t.timestamp
@@ -4,8 +4,15 @@ import hmac
 import hashlib
 import json
 from datetime import datetime
-from sqlalchemy.orm import Session
-from db.models import get_db, Call, Transcript, User
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from db.models import get_async_writer_db, Call
+from services.transcript_ingest import transcript_ingest, TranscriptSegment
+from services.call_cache import call_id_cache, resolve_call_id
+from services.call_board import call_board
+from services.socket_server import live_updates
+from services.analysis_engine import analysis_engine
+from services.orkes_client import call_workflows
 
 router = APIRouter()
 
@@ -13,7 +20,7 @@ VAPI_WEBHOOK_SECRET = os.getenv("VAPI_WEBHOOK_SECRET")
 DISPATCHER_PHONE_NUMBER = os.getenv("DISPATCHER_PHONE_NUMBER", "+1234567890")  # Set your dispatcher's number
 
 @router.post("/webhook/vapi")
-async def vapi_webhook(request: Request, db: Session = Depends(get_db)):
+async def vapi_webhook(request: Request, db: AsyncSession = Depends(get_async_writer_db)):
     # Verify webhook signature if provided by Vapi.ai
     signature = request.headers.get("X-Vapi-Signature")
     body = await request.body()
@@ -43,7 +50,28 @@ async def vapi_webhook(request: Request, db: Session = Depends(get_db)):
         print(f"Unhandled message type: {message_type}")
         return {"status": "ok"}
 
-async def handle_function_call(data, db: Session):
+@router.get("/metrics/ingest")
+async def ingest_metrics():
+    """Queue depth and flush latency of the transcript ingestion pipeline"""
+    stats = transcript_ingest.get_stats()
+    stats["call_id_cache"] = call_id_cache.get_stats()
+    return stats
+
+@router.get("/metrics/analysis")
+async def analysis_metrics():
+    """Trigger counts and outcomes of the incremental analysis engine"""
+    stats = analysis_engine.get_stats()
+    stats["call_board"] = call_board.get_stats()
+    return stats
+
+@router.get("/metrics/orkes")
+async def orkes_metrics():
+    """Workflow starts, failures and re-authentications, plus end-to-visible result latency"""
+    stats = call_workflows.get_stats()
+    stats["results"] = call_workflows.results.get_stats()
+    return stats
+
+async def handle_function_call(data, db: AsyncSession):
     """Handle function calls - primarily for call forwarding"""
     function_call = data.get("message", {}).get("functionCall", {})
     function_name = function_call.get("name")
@@ -62,7 +90,7 @@ async def handle_function_call(data, db: Session):
     
     return {"status": "ok"}
 
-async def handle_transcript(data, db: Session):
+async def handle_transcript(data, db: AsyncSession):
     """Handle live transcription data"""
     message = data.get("message", {})
     call_id = data.get("call", {}).get("id")
@@ -76,50 +104,33 @@ async def handle_transcript(data, db: Session):
     if not text.strip():
         return {"status": "ok"}
     
-    # Find or create call record
-    db_call = db.query(Call).filter(Call.external_call_id == call_id).first()
-    if not db_call:
-        # Create a new call record
-        # For now, create a generic user - in production you'd want to identify the caller
-        user = db.query(User).first()
-        if not user:
-            user = User(name="Unknown Caller", address="Unknown")
-            db.add(user)
-            db.commit()
-            db.refresh(user)
-        
-        db_call = Call(
-            user_id=user.id,
-            external_call_id=call_id,
-            timestamp=timestamp,
-            status="active"
-        )
-        db.add(db_call)
-        db.commit()
-        db.refresh(db_call)
-    
-    # Save transcript
-    transcript = Transcript(
-        call_id=db_call.id,
+    # Hand the segment to the background writer; it resolves the call and batches the insert
+    await transcript_ingest.submit(TranscriptSegment(
+        external_call_id=call_id,
         speaker=speaker,
-        timestamp=timestamp,
-        text=text
-    )
-    db.add(transcript)
-    db.commit()
+        text=text,
+        timestamp=timestamp
+    ))
     
-    print(f"Saved transcript: {speaker}: {text}")
+    print(f"Queued transcript: {speaker}: {text}")
     
-    # TODO: Trigger AI analysis via Orkes workflow
-    # TODO: Publish to websocket for real-time updates
+    # Start the Orkes analysis workflows in the background (throttled per call)
+    call_workflows.on_segment(call_id, speaker, text)
+    # Once the segment is committed, the writer notifies live subscribers and
+    # feeds it to the incremental analysis engine
     
     return {"status": "ok"}
 
-async def handle_call_start(data, db: Session):
+async def handle_call_start(data, db: AsyncSession):
     """Handle call start event"""
     call_data = data.get("call", {})
     call_id = call_data.get("id")
     
+    # Create the call record and warm the ID cache before the first transcript arrives
+    if call_id:
+        internal_id = await db.run_sync(resolve_call_id, call_id, datetime.now())
+        live_updates.publish_status(internal_id, "active")
+    
     print(f"Call started: {call_id}")
     
     # Immediate call forwarding instruction
@@ -159,16 +170,22 @@ async def handle_call_start(data, db: Session):
         }
     }
 
-async def handle_call_end(data, db: Session):
+async def handle_call_end(data, db: AsyncSession):
     """Handle call end event"""
     call_data = data.get("call", {})
     call_id = call_data.get("id")
     
     # Update call status to completed
-    db_call = db.query(Call).filter(Call.external_call_id == call_id).first()
-    if db_call:
-        db_call.status = "completed"
-        db.commit()
+    result = await db.execute(select(Call.id).where(Call.external_call_id == call_id))
+    internal_id = result.scalar()
+    if internal_id is not None:
+        await db.execute(update(Call).where(Call.id == internal_id).values(status="completed"))
+        await db.commit()
+        live_updates.publish_status(internal_id, "completed")
+        analysis_engine.end_call(internal_id)
+        call_board.remove(internal_id)
+    call_id_cache.evict(call_id)
+    call_workflows.end_call(call_id)
     
     print(f"Call ended: {call_id}")
     return {"status": "ok"}
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Benchmark micro-batched analysis against one model request per transcript.
+
+The model is replaced by a local stand-in whose latency grows with the number of
+transcripts in a request (fixed overhead + per-transcript cost), so the run is free
+and repeatable. Reports throughput, per-call latency and upstream requests for each
+batch setting.
+
+Usage:
+    python benchmarks/analysis_batching.py --callers 64 --requests 8 --overhead-ms 400 --per-item-ms 40
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import types
+
+# Every transcript must reach the (stand-in) model
+os.environ["PRECLASSIFIER_ENABLED"] = "false"
+os.environ["LLM_CACHE_ENABLED"] = "false"
+
+# Add parent directory to path to import from backend modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.ai_prompts import AIPromptService
+from services.micro_batch import MicroBatcher
+from services.percentiles import percentile
+from services.priority_limiter import PriorityLimiter
+
+
+class StandInModel:
+    """Answers single and batched analysis prompts after a size-dependent delay"""
+
+    def __init__(self, overhead, per_item):
+        self.overhead = overhead
+        self.per_item = per_item
+        self.requests = 0
+
+    async def create(self, **kwargs):
+        self.requests += 1
+        prompt = kwargs["messages"][0]["content"]
+        # Batch prompts end with the transcripts as a JSON array of {"id", "text"} objects
+        _, marker, entries = prompt.partition("Transcripts:\n")
+        ids = [entry["id"] for entry in json.loads(entries)] if marker else []
+        await asyncio.sleep(self.overhead + self.per_item * max(1, len(ids)))
+        if ids:
+            content = json.dumps({"results": [{"id": i, "score": 6, "concerns": ["Bleeding"]} for i in ids]})
+        else:
+            content = json.dumps({"score": 6, "concerns": ["Bleeding"]})
+        message = types.SimpleNamespace(content=content)
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)])
+
+
+async def run_setting(args, batch_size, callers):
+    model = StandInModel(args.overhead_ms / 1000, args.per_item_ms / 1000)
+    service = AIPromptService()
+    service._client = types.SimpleNamespace(chat=types.SimpleNamespace(completions=model))
+    service._limiter = PriorityLimiter(args.concurrency)
+    service.batching = batch_size > 1
+    service._batcher = MicroBatcher(service._request_analysis_batch, batch_size, args.max_wait_ms)
+
+    latencies = []
+
+    async def caller(n):
+        for i in range(args.requests):
+            started = time.perf_counter()
+            await service.get_analysis(f"Caller {n} update {i}: someone is hurt near the station")
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(caller(n) for n in range(callers)))
+    elapsed = time.perf_counter() - started
+    return {
+        "batch_size": batch_size,
+        "analyses": len(latencies),
+        "throughput": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "upstream_requests": model.requests,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark micro-batched analysis requests")
+    parser.add_argument("--callers", type=int, default=64, help="Concurrent calls requesting analysis")
+    parser.add_argument("--requests", type=int, default=8, help="Analyses per caller, back to back")
+    parser.add_argument("--concurrency", type=int, default=8, help="Model requests in flight at once")
+    parser.add_argument("--overhead-ms", type=float, default=400, help="Stand-in latency per request")
+    parser.add_argument("--per-item-ms", type=float, default=40, help="Stand-in latency per transcript")
+    parser.add_argument("--max-wait-ms", type=float, default=20, help="Batch gathering window")
+    parser.add_argument("--batch-sizes", default="1,4,8,16", help="Comma-separated batch sizes (1 = off)")
+    args = parser.parse_args()
+
+    print(f"{args.callers} concurrent callers; idle = a single caller, showing the latency batching adds")
+    print(f"{'batch':>5} {'analyses/s':>11} {'p50 ms':>8} {'p95 ms':>8} {'upstream':>9} {'idle p50 ms':>12}")
+    baseline = None
+    for batch_size in [int(size) for size in args.batch_sizes.split(",")]:
+        result = asyncio.run(run_setting(args, batch_size, args.callers))
+        idle = asyncio.run(run_setting(args, batch_size, 1))
+        baseline = baseline or (result, idle)
+        print(f"{result['batch_size']:>5} {result['throughput']:>11.1f} {result['p50_ms']:>8.0f} "
+              f"{result['p95_ms']:>8.0f} {result['upstream_requests']:>9} {idle['p50_ms']:>12.0f}"
+              f"   ({result['throughput'] / baseline[0]['throughput']:.1f}x throughput, "
+              f"{idle['p50_ms'] - baseline[1]['p50_ms']:+.0f} ms idle latency)")
+
+
+if __name__ == "__main__":
+    main()
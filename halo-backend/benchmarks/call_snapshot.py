@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Benchmark rendering one call: the snapshot endpoint against the separate
+/calls/{id}, /transcripts, /ai-insights and /units requests a dashboard makes today.
+
+Runs the app in process against a throwaway SQLite database seeded with calls,
+transcripts, insights and units. Reports per-render latency and the number of SQL
+statements each render executes.
+
+Usage:
+    python benchmarks/call_snapshot.py --calls 200 --segments 300 --renders 500 --tail 50
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'snapshot.db')}")
+
+# Add parent directory to path to import from backend modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from sqlalchemy import event, insert
+from db.models import Base, engine, async_engine, User, Call, Transcript, AIInsight, Unit
+from services.percentiles import percentile
+
+
+def seed_database(calls, segments):
+    Base.metadata.create_all(bind=engine)
+    now = datetime.now()
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{"name": "Benchmark Caller"}])
+        conn.execute(insert(Call), [
+            {"user_id": 1, "external_call_id": f"snapshot-{n}", "timestamp": now, "status": "active"}
+            for n in range(calls)
+        ])
+        conn.execute(insert(Transcript), [
+            {"call_id": n + 1, "speaker": "CALLER" if i % 2 == 0 else "DISPATCHER",
+             "timestamp": now + timedelta(seconds=i), "text": f"segment {i} of call {n}"}
+            for n in range(calls) for i in range(segments)
+        ])
+        # A few re-scores per call; the dashboard shows the latest
+        conn.execute(insert(AIInsight), [
+            {"call_id": n + 1, "concern_tags": "Bleeding,Weapon", "urgency_score": 5 + i}
+            for n in range(calls) for i in range(3)
+        ])
+        conn.execute(insert(Unit), [
+            {"call_id": n + 1, "status": "en_route", "eta": now + timedelta(minutes=5 + i), "location": "37.87,-122.27"}
+            for n in range(calls) for i in range(2)
+        ])
+
+
+async def render_separately(client, call_id, tail):
+    # What the dashboard does today; the four requests go out together. With a tail, the
+    # transcripts route returns the first N segments, the closest it offers
+    transcripts = f"/calls/{call_id}/transcripts" + (f"?limit={tail}" if tail else "")
+    responses = await asyncio.gather(*(client.get(path) for path in (
+        f"/calls/{call_id}", transcripts, f"/calls/{call_id}/ai-insights", f"/calls/{call_id}/units",
+    )))
+    assert all(response.status_code == 200 for response in responses)
+
+
+async def render_snapshot(client, call_id, tail):
+    response = await client.get(f"/calls/{call_id}/snapshot" + (f"?transcripts={tail}" if tail else ""))
+    assert response.status_code == 200
+
+
+async def run(args):
+    from main import app
+
+    statements = []
+    event.listen(async_engine.sync_engine, "before_cursor_execute",
+                 lambda *params: statements.append(1))
+
+    results = {}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        for name, render in (("separate requests", render_separately), ("snapshot", render_snapshot)):
+            # Warm up connections and statement caches
+            await render(client, 1, args.tail)
+            latencies = []
+            statements.clear()
+            for n in range(args.renders):
+                started = time.perf_counter()
+                await render(client, n % args.calls + 1, args.tail)
+                latencies.append(time.perf_counter() - started)
+            results[name] = {
+                "p50_ms": percentile(latencies, 50) * 1000,
+                "p95_ms": percentile(latencies, 95) * 1000,
+                "statements": len(statements) / args.renders,
+            }
+    # aiosqlite's connection threads would otherwise keep the process alive
+    await async_engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the call snapshot endpoint")
+    parser.add_argument("--calls", type=int, default=200, help="Calls in the seeded database")
+    parser.add_argument("--segments", type=int, default=300, help="Transcript segments per call")
+    parser.add_argument("--renders", type=int, default=500, help="Call screens rendered per variant")
+    parser.add_argument("--tail", type=int, default=None, help="Only the last N segments (default: all)")
+    args = parser.parse_args()
+
+    seed_database(args.calls, args.segments)
+    results = asyncio.run(run(args))
+    transcripts = f"last {args.tail}" if args.tail else f"all {args.segments}"
+    print(f"{args.renders} renders, {transcripts} transcript segments per call")
+    print(f"{'variant':<18} {'p50 ms':>8} {'p95 ms':>8} {'SQL/render':>11}")
+    for name, result in results.items():
+        print(f"{name:<18} {result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} {result['statements']:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
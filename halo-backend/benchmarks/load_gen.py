@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Replay a transcript corpus against the backend AI endpoints or the Orkes workflow API
+at a fixed concurrency or a fixed request rate, and report latency percentiles,
+throughput and errors.
+
+The corpus is a JSON list or a JSONL file of {"id": ..., "transcript": ...} objects
+(plain strings work too), e.g. orkes/tests/test_transcripts.json. Results can be
+written as JSON and compared against an earlier run to catch regressions.
+
+Usage:
+    # 16 callers back to back for 30 seconds
+    python benchmarks/load_gen.py --target urgency --concurrency 16 --duration 30
+    # Open loop: 20 requests/s regardless of how fast responses come back
+    python benchmarks/load_gen.py --target analysis --rate 20 --requests 500 --output run.json
+    # Start real Orkes workflows (needs ORKES_KEY_ID / ORKES_KEY_SECRET)
+    python benchmarks/load_gen.py --target workflow --workflow urgency_score_agent --rate 2 --requests 20
+    # Compare against a previous release and fail if p95 got more than 20% worse
+    python benchmarks/load_gen.py --target urgency --output new.json --baseline old.json --max-regression 20
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+# Add parent directory to path to import from backend modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from services.percentiles import percentile
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                              "orkes", "tests", "test_transcripts.json")
+
+# Backend endpoints that take {"call_id", "transcript"}
+ENDPOINTS = {
+    "urgency": "/api/ai/urgency-score",
+    "concerns": "/api/ai/key-concerns",
+    "analysis": "/api/ai/analysis",
+}
+
+
+def load_corpus(path):
+    """Transcripts from a JSON list or a JSONL file"""
+    with open(path) as f:
+        if path.endswith(".jsonl"):
+            entries = [json.loads(line) for line in f if line.strip()]
+        else:
+            entries = json.load(f)
+    transcripts = []
+    for n, entry in enumerate(entries):
+        if isinstance(entry, str):
+            entry = {"transcript": entry}
+        if entry.get("transcript"):
+            transcripts.append({"id": entry.get("id", f"transcript-{n}"), "transcript": entry["transcript"]})
+    return transcripts
+
+
+class LoadGenerator:
+    def __init__(self, args, corpus):
+        self.args = args
+        self.corpus = corpus
+        self.latencies = []
+        self.statuses = Counter()
+        self.errors = Counter()
+        self.sent = 0
+        self.client = None
+
+    def next_payload(self):
+        n = self.sent
+        self.sent += 1
+        entry = self.corpus[n % len(self.corpus)]
+        transcript = entry["transcript"]
+        if self.args.unique:
+            # Defeat the response cache so every request reaches the model
+            transcript = f"{transcript} (load test {n})"
+        return {"call_id": f"load-{entry['id']}-{n}", "transcript": transcript}
+
+    async def send(self, payload):
+        if self.args.target == "workflow":
+            from orkes.token_manager import token_manager
+            jwt_token = await token_manager.get_token_async(self.client)
+            if not jwt_token:
+                raise RuntimeError("no Orkes token")
+            payload = {"name": self.args.workflow, "version": 1,
+                       "input": {**payload, "backend_url": self.args.backend_url}}
+            return await self.client.post(f"{token_manager.server_url}/api/workflow", json=payload,
+                                          headers={"X-Authorization": jwt_token})
+        return await self.client.post(f"{self.args.backend_url}{ENDPOINTS[self.args.target]}", json=payload)
+
+    async def request(self, payload, scheduled_at):
+        try:
+            response = await self.send(payload)
+            self.statuses[response.status_code] += 1
+            if response.status_code >= 400:
+                self.errors[f"HTTP {response.status_code}"] += 1
+        except Exception as e:
+            self.errors[type(e).__name__] += 1
+        # Measured from when the request was due, so a backed-up server can't hide its queueing delay
+        self.latencies.append(time.perf_counter() - scheduled_at)
+
+    def more(self, deadline):
+        if self.args.requests and self.sent >= self.args.requests:
+            return False
+        return time.perf_counter() < deadline
+
+    async def closed_loop(self, deadline):
+        # Each worker sends its next request as soon as the previous one answers
+        async def worker():
+            while self.more(deadline):
+                await self.request(self.next_payload(), time.perf_counter())
+
+        await asyncio.gather(*(worker() for _ in range(self.args.concurrency)))
+
+    async def open_loop(self, deadline):
+        # Requests go out on a fixed schedule whether or not earlier ones have answered
+        interval = 1 / self.args.rate
+        started = time.perf_counter()
+        tasks = []
+        n = 0
+        while self.more(deadline):
+            scheduled_at = started + n * interval
+            await asyncio.sleep(max(0.0, scheduled_at - time.perf_counter()))
+            tasks.append(asyncio.create_task(self.request(self.next_payload(), scheduled_at)))
+            n += 1
+        await asyncio.gather(*tasks)
+
+    async def run(self):
+        limits = httpx.Limits(max_connections=self.args.max_connections,
+                              max_keepalive_connections=self.args.max_connections)
+        async with httpx.AsyncClient(limits=limits, timeout=self.args.timeout) as client:
+            self.client = client
+            started = time.perf_counter()
+            deadline = started + self.args.duration
+            if self.args.rate:
+                await self.open_loop(deadline)
+            else:
+                await self.closed_loop(deadline)
+            elapsed = time.perf_counter() - started
+        return self.summary(elapsed)
+
+    def summary(self, elapsed):
+        total = len(self.latencies)
+        errors = sum(self.errors.values())
+        return {
+            "requests": total,
+            "errors": errors,
+            "error_rate": errors / total if total else 0.0,
+            "elapsed_seconds": elapsed,
+            "throughput": total / elapsed if elapsed else 0.0,
+            "latency_ms": {
+                "p50": percentile(self.latencies, 50) * 1000,
+                "p95": percentile(self.latencies, 95) * 1000,
+                "p99": percentile(self.latencies, 99) * 1000,
+                "max": max(self.latencies, default=0.0) * 1000,
+                "mean": sum(self.latencies) / total * 1000 if total else 0.0,
+            },
+            "status_codes": {str(code): count for code, count in sorted(self.statuses.items())},
+            "error_kinds": dict(self.errors),
+        }
+
+
+def print_summary(results):
+    latency = results["latency_ms"]
+    print(f"requests    {results['requests']} in {results['elapsed_seconds']:.1f}s "
+          f"({results['throughput']:.1f}/s)")
+    print(f"errors      {results['errors']} ({results['error_rate']:.1%}) {results['error_kinds'] or ''}")
+    print(f"latency ms  p50 {latency['p50']:.0f}  p95 {latency['p95']:.0f}  p99 {latency['p99']:.0f}  "
+          f"max {latency['max']:.0f}")
+    print(f"statuses    {results['status_codes']}")
+
+
+def compare(results, baseline, max_regression):
+    """Print changes against a baseline run; True if any exceeds max_regression percent"""
+    regressed = False
+    checks = [
+        ("p50 ms", results["latency_ms"]["p50"], baseline["latency_ms"]["p50"], True),
+        ("p95 ms", results["latency_ms"]["p95"], baseline["latency_ms"]["p95"], True),
+        ("p99 ms", results["latency_ms"]["p99"], baseline["latency_ms"]["p99"], True),
+        ("throughput", results["throughput"], baseline["throughput"], False),
+    ]
+    print(f"\nAgainst baseline ({baseline.get('label') or baseline.get('started_at')}):")
+    load_keys = ("target", "workflow", "concurrency", "rate", "unique")
+    if any(results["config"].get(key) != baseline.get("config", {}).get(key) for key in load_keys):
+        print("  Warning: target or load settings differ from the baseline run")
+    for name, value, before, lower_is_better in checks:
+        change = (value - before) / before * 100 if before else 0.0
+        worse = change if lower_is_better else -change
+        flag = ""
+        if max_regression is not None and worse > max_regression:
+            flag = "  REGRESSION"
+            regressed = True
+        print(f"  {name:<11} {before:>9.1f} -> {value:>9.1f} ({change:+.1f}%){flag}")
+    if results["error_rate"] > baseline["error_rate"]:
+        print(f"  error rate  {baseline['error_rate']:.1%} -> {results['error_rate']:.1%}")
+        regressed = regressed or max_regression is not None
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the backend AI endpoints or Orkes workflows")
+    parser.add_argument("--target", choices=sorted(ENDPOINTS) + ["workflow"], default="urgency",
+                        help="Backend endpoint to call, or 'workflow' to start Orkes workflows")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="JSON or JSONL transcript corpus")
+    parser.add_argument("--backend-url", default="http://localhost:8000", help="Backend base URL")
+    parser.add_argument("--workflow", default="urgency_score_agent", help="Workflow started by --target workflow")
+    parser.add_argument("--concurrency", type=int, default=8, help="Callers sending back to back (closed loop)")
+    parser.add_argument("--rate", type=float, default=None, help="Requests per second (open loop)")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to run")
+    parser.add_argument("--requests", type=int, default=None, help="Stop after this many requests")
+    parser.add_argument("--unique", action="store_true", help="Make every transcript unique to bypass caching")
+    parser.add_argument("--timeout", type=float, default=30, help="Per-request timeout in seconds")
+    parser.add_argument("--max-connections", type=int, default=100, help="HTTP connection pool size")
+    parser.add_argument("--label", default=None, help="Name for this run in the results, e.g. a release tag")
+    parser.add_argument("--output", default=None, help="Write results as JSON to this file")
+    parser.add_argument("--baseline", default=None, help="Results JSON of an earlier run to compare against")
+    parser.add_argument("--max-regression", type=float, default=None,
+                        help="Exit 1 if latency or throughput is this many percent worse than the baseline")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    if not corpus:
+        print(f"No transcripts found in {args.corpus}")
+        sys.exit(2)
+
+    mode = f"{args.rate}/s open loop" if args.rate else f"{args.concurrency} concurrent"
+    print(f"{args.target}: {len(corpus)} transcripts from {args.corpus}, {mode}")
+    started_at = datetime.now(timezone.utc).isoformat()
+    results = asyncio.run(LoadGenerator(args, corpus).run())
+    print_summary(results)
+
+    report = {
+        "label": args.label,
+        "started_at": started_at,
+        "config": {key: value for key, value in vars(args).items()
+                   if key not in ("output", "baseline", "max_regression")},
+        **results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare(report, baseline, args.max_regression):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
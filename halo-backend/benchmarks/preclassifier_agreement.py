@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Benchmark the local pre-classifier against the model on the Orkes test transcripts:
+local latency, how many transcripts it answers without escalating, and - when
+OPENAI_API_KEY is set - agreement with the model on the ones it answers
+
+Usage:
+    python benchmarks/preclassifier_agreement.py --iterations 1000 --tolerance 1
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+# Add parent directory to path to import from backend modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.ai_prompts import ai_service
+from services.percentiles import percentile
+from services.pre_classifier import classify
+
+DEFAULT_TRANSCRIPTS = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "orkes", "tests", "test_transcripts.json"
+)
+
+
+def time_local(transcripts, iterations):
+    latencies = []
+    for _ in range(iterations):
+        for item in transcripts:
+            started = time.perf_counter()
+            classify(item["transcript"])
+            latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+async def model_results(transcripts):
+    """Ask the model directly, bypassing the cache and the pre-classifier"""
+    results = {}
+    for item in transcripts:
+        started = time.perf_counter()
+        result = await ai_service._request_analysis(item["transcript"])
+        results[item["id"]] = (result, time.perf_counter() - started)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the local pre-classifier against the model")
+    parser.add_argument("--transcripts", default=DEFAULT_TRANSCRIPTS, help="JSON list of {id, transcript}")
+    parser.add_argument("--iterations", type=int, default=1000, help="Local classification passes over the set")
+    parser.add_argument("--tolerance", type=int, default=1, help="Score difference still counted as agreement")
+    args = parser.parse_args()
+
+    with open(args.transcripts) as f:
+        transcripts = json.load(f)
+
+    latencies = time_local(transcripts, args.iterations)
+    print(f"Local: {len(latencies)} classifications, "
+          f"p50 {percentile(latencies, 50) * 1e6:.1f}us, p95 {percentile(latencies, 95) * 1e6:.1f}us, "
+          f"p99 {percentile(latencies, 99) * 1e6:.1f}us")
+
+    model = None
+    if os.getenv("OPENAI_API_KEY"):
+        model = asyncio.run(model_results(transcripts))
+        model_latencies = [elapsed for _, elapsed in model.values()]
+        print(f"Model: {len(model_latencies)} requests, "
+              f"p50 {percentile(model_latencies, 50) * 1000:.0f}ms, "
+              f"p95 {percentile(model_latencies, 95) * 1000:.0f}ms")
+    else:
+        print("Model: skipped (OPENAI_API_KEY not set)")
+
+    answered = concerns_answered = score_agree = concerns_agree = 0
+    print()
+    print(f"{'id':<20} {'local':>5} {'conf':>5} {'model':>5}  decision  concerns")
+    for item in transcripts:
+        local = classify(item["transcript"])
+        # "score": the score is answered locally but the concerns still go to the model
+        decision = "escalate" if not local.confident else "local" if local.concerns_confident else "score"
+        model_score = "-"
+        if local.confident:
+            answered += 1
+            concerns_answered += local.concerns_confident
+        if model is not None:
+            result, _ = model[item["id"]]
+            model_score = str(result["score"])
+            if local.confident:
+                score_agree += abs(local.score - result["score"]) <= args.tolerance
+            if local.confident and local.concerns_confident:
+                concerns_agree += set(local.concerns) == set(result["concerns"])
+        print(f"{item['id']:<20} {local.score:>5} {local.confidence:>5.2f} {model_score:>5}  "
+              f"{decision:<8}  {', '.join(local.concerns) or '-'}")
+
+    print()
+    print(f"Scores answered locally: {answered}/{len(transcripts)} ({answered / len(transcripts):.0%} of model calls skipped)")
+    print(f"Concerns answered locally: {concerns_answered}/{len(transcripts)}")
+    if model is not None and answered:
+        print(f"Agreement on answered: score within ±{args.tolerance} {score_agree}/{answered}, "
+              f"identical concerns {concerns_agree}/{concerns_answered}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Benchmark concurrent transcript writes and dashboard reads against SQLite,
+with and without the production profile (WAL + pragmas + single writer connection)
+
+Usage:
+    python benchmarks/sqlite_concurrency.py --writers 8 --readers 8 --duration 10
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# Add parent directory to path to import from backend modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select, insert
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from db.models import Base, Call, Transcript, User, SQLITE_PRAGMAS, apply_sqlite_profile
+from services.percentiles import percentile
+
+
+async def setup_database(url, calls):
+    engine = create_async_engine(url)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(User), [{"name": "Benchmark Caller"}])
+        await conn.execute(insert(Call), [
+            {"user_id": 1, "external_call_id": f"bench-{i}", "timestamp": datetime.now(), "status": "active"}
+            for i in range(calls)
+        ])
+    await engine.dispose()
+
+
+async def run_profile(name, url, profile, args):
+    pool = {"poolclass": AsyncAdaptedQueuePool, "pool_size": args.writers + args.readers, "max_overflow": 0}
+    read_engine = create_async_engine(url, **pool)
+    if profile:
+        # One connection serialises all writes; readers keep their own pool
+        write_engine = create_async_engine(url, poolclass=AsyncAdaptedQueuePool, pool_size=1, max_overflow=0)
+        apply_sqlite_profile(read_engine.sync_engine)
+        apply_sqlite_profile(write_engine.sync_engine)
+    else:
+        # Stock SQLAlchemy setup: every writer competes for the file lock from the shared pool
+        write_engine = read_engine
+
+    stats = {"writes": 0, "reads": 0, "write_errors": 0, "read_errors": 0,
+             "write_latency": [], "read_latency": []}
+    deadline = time.perf_counter() + args.duration
+
+    async def writer(worker_id):
+        n = 0
+        while time.perf_counter() < deadline:
+            rows = [
+                {"call_id": (worker_id % args.calls) + 1, "speaker": "CALLER",
+                 "timestamp": datetime.now(), "text": f"segment {worker_id}-{n}-{i}"}
+                for i in range(args.batch)
+            ]
+            started = time.perf_counter()
+            try:
+                async with write_engine.begin() as conn:
+                    await conn.execute(insert(Transcript), rows)
+                stats["writes"] += len(rows)
+                stats["write_latency"].append((time.perf_counter() - started) * 1000)
+            except OperationalError:
+                stats["write_errors"] += 1
+            n += 1
+
+    async def reader(worker_id):
+        n = 0
+        while time.perf_counter() < deadline:
+            call_id = ((worker_id + n) % args.calls) + 1
+            started = time.perf_counter()
+            try:
+                async with read_engine.connect() as conn:
+                    await conn.execute(
+                        select(Transcript).where(Transcript.call_id == call_id).order_by(Transcript.timestamp)
+                    )
+                stats["reads"] += 1
+                stats["read_latency"].append((time.perf_counter() - started) * 1000)
+            except OperationalError:
+                stats["read_errors"] += 1
+            n += 1
+
+    await asyncio.gather(
+        *(writer(i) for i in range(args.writers)),
+        *(reader(i) for i in range(args.readers)),
+    )
+    await read_engine.dispose()
+    if write_engine is not read_engine:
+        await write_engine.dispose()
+
+    print(f"\n{name}")
+    print(f"  Rows written/s:   {stats['writes'] / args.duration:10.1f}  (errors: {stats['write_errors']})")
+    print(f"  Reads/s:          {stats['reads'] / args.duration:10.1f}  (errors: {stats['read_errors']})")
+    print(f"  Write p50/p95 ms: {percentile(stats['write_latency'], 50):8.2f} / {percentile(stats['write_latency'], 95):8.2f}")
+    print(f"  Read p50/p95 ms:  {percentile(stats['read_latency'], 50):8.2f} / {percentile(stats['read_latency'], 95):8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SQLite read/write concurrency")
+    parser.add_argument("--writers", type=int, default=8, help="Concurrent writer tasks")
+    parser.add_argument("--readers", type=int, default=8, help="Concurrent reader tasks")
+    parser.add_argument("--batch", type=int, default=20, help="Transcript rows per write transaction")
+    parser.add_argument("--calls", type=int, default=50, help="Number of calls to spread rows over")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds to run each profile")
+    args = parser.parse_args()
+
+    print(f"Profile PRAGMAs: {SQLITE_PRAGMAS}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, profile in [("default (rollback journal, shared pool)", False),
+                              ("production profile (WAL, pragmas, single writer)", True)]:
+            path = os.path.join(tmp, f"bench_{int(profile)}.db")
+            url = f"sqlite+aiosqlite:///{path}"
+            asyncio.run(setup_database(url, args.calls))
+            asyncio.run(run_profile(name, url, profile, args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Replay synthetic VAPI event streams through /webhook/vapi: N concurrent calls, each a
+call-start, many transcript events and a call-end.
+
+By default the app runs in process (httpx ASGI transport) against a throwaway SQLite
+database, with Orkes and the model switched off, so the run is offline and repeatable.
+It reports webhook requests/s and latency per event type, transcript commit latency
+(per batch flush and until every segment is committed) and event-loop lag. With --url
+the same streams are sent to a running server instead; commit figures then come from
+its /metrics/ingest.
+
+Usage:
+    python benchmarks/webhook_replay.py --calls 50 --segments 200
+    python benchmarks/webhook_replay.py --calls 20 --segments 100 --interval-ms 50 --output replay.json
+    python benchmarks/webhook_replay.py --url http://localhost:8000 --calls 10 --segments 100
+"""
+
+import argparse
+import asyncio
+import contextlib
+import hashlib
+import hmac
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+# Offline defaults; set before the backend modules read their configuration
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'replay.db')}")
+os.environ.setdefault("ORKES_WORKFLOWS_ENABLED", "false")
+os.environ.setdefault("ANALYSIS_ENABLED", "false")
+
+# Add parent directory to path to import from backend modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from services.percentiles import percentile
+
+CALLER_LINES = [
+    "Please hurry, he's not breathing",
+    "There's smoke coming from the kitchen",
+    "I'm at the corner of Main and Fifth",
+    "She fell down the stairs and can't move her leg",
+    "He has a knife and he's yelling",
+    "The car flipped over, there are two people inside",
+    "I think it's a heart attack, he's clutching his chest",
+    "Yes, I'm still here",
+]
+DISPATCHER_LINES = [
+    "What's the address of your emergency?",
+    "Is the person conscious and breathing?",
+    "Help is on the way, stay on the line with me",
+    "Are you somewhere safe right now?",
+    "How many people are hurt?",
+]
+
+
+def latency_summary(values):
+    return {
+        "count": len(values),
+        "p50_ms": percentile(values, 50) * 1000,
+        "p95_ms": percentile(values, 95) * 1000,
+        "p99_ms": percentile(values, 99) * 1000,
+        "max_ms": max(values, default=0.0) * 1000,
+    }
+
+
+def call_events(call_id, segments, rng):
+    """VAPI webhook bodies for one call, in order"""
+    yield "call-start", {"message": {"type": "call-start"},
+                         "call": {"id": call_id, "from": "+15550100", "to": "+15550199"}}
+    for n in range(segments):
+        role = "user" if n % 2 == 0 else "assistant"
+        text = rng.choice(CALLER_LINES if role == "user" else DISPATCHER_LINES)
+        yield "transcript", {"message": {"type": "transcript", "transcript": {"role": role, "text": text}},
+                             "call": {"id": call_id}}
+    yield "call-end", {"message": {"type": "call-end"}, "call": {"id": call_id}}
+
+
+class LoopLagSampler:
+    """How late a short sleep wakes up: time the loop spent busy with other work"""
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.lags = []
+        self._task = None
+
+    async def _run(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.lags.append(max(0.0, time.perf_counter() - started - self.interval))
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        self._task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._task
+
+
+async def replay(client, base_url, args):
+    secret = os.getenv("VAPI_WEBHOOK_SECRET")
+    latencies = {"call-start": [], "transcript": [], "call-end": []}
+    errors = []
+
+    async def send(kind, body):
+        content = json.dumps(body).encode()
+        headers = {"Content-Type": "application/json"}
+        if secret:
+            headers["X-Vapi-Signature"] = hmac.new(secret.encode(), content, hashlib.sha256).hexdigest()
+        started = time.perf_counter()
+        try:
+            response = await client.post(f"{base_url}/webhook/vapi", content=content, headers=headers)
+            if response.status_code != 200:
+                errors.append(f"HTTP {response.status_code}")
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+        latencies[kind].append(time.perf_counter() - started)
+
+    async def call(n):
+        rng = random.Random(n)
+        # Stagger call starts so they don't all arrive in the same instant
+        await asyncio.sleep(rng.uniform(0, args.interval_ms / 1000))
+        for kind, body in call_events(f"replay-{args.run_id}-{n}", args.segments, rng):
+            await send(kind, body)
+            if args.interval_ms:
+                await asyncio.sleep(args.interval_ms / 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(call(n) for n in range(args.calls)))
+    return latencies, errors, time.perf_counter() - started
+
+
+async def run_in_process(args):
+    from main import app
+    from db.models import Base, engine, SessionLocal, Transcript
+    from services.transcript_ingest import transcript_ingest
+
+    Base.metadata.create_all(bind=engine)
+
+    # Time every batch commit of the transcript writer
+    flush_times = []
+    original_flush = transcript_ingest._flush
+
+    async def timed_flush(batch):
+        started = time.perf_counter()
+        await original_flush(batch)
+        flush_times.append(time.perf_counter() - started)
+
+    transcript_ingest._flush = timed_flush
+
+    # The ASGI transport doesn't send lifespan events; run the app's startup/shutdown directly
+    await app.router.startup()
+    sampler = LoopLagSampler()
+    sampler.start()
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app)) as client:
+            latencies, errors, elapsed = await replay(client, "http://replay", args)
+        # Everything acknowledged; now wait until the last segment is committed
+        drain_started = time.perf_counter()
+        await transcript_ingest._queue.join()
+        drain = time.perf_counter() - drain_started
+    finally:
+        await sampler.stop()
+        await app.router.shutdown()
+
+    with SessionLocal() as db:
+        stored = db.query(Transcript).count()
+    return {
+        "latencies": latencies,
+        "errors": errors,
+        "elapsed": elapsed,
+        "commit": {
+            "flushes": latency_summary(flush_times),
+            "segments_per_flush": transcript_ingest.get_stats()["flushed_segments"] / max(1, len(flush_times)),
+            "drain_after_last_ack_ms": drain * 1000,
+            "stored_segments": stored,
+        },
+        "loop_lag": latency_summary(sampler.lags),
+    }
+
+
+async def run_against_server(args):
+    async with httpx.AsyncClient(timeout=30) as client:
+        before = (await client.get(f"{args.url}/metrics/ingest")).json()
+        sampler = LoopLagSampler()
+        sampler.start()
+        latencies, errors, elapsed = await replay(client, args.url, args)
+        await sampler.stop()
+        # Give the server's writer a moment to flush what it has acknowledged
+        await asyncio.sleep(1)
+        after = (await client.get(f"{args.url}/metrics/ingest")).json()
+        loop = (await client.get(f"{args.url}/metrics/loop")).json()
+    batches = after["flushed_batches"] - before["flushed_batches"]
+    return {
+        "latencies": latencies,
+        "errors": errors,
+        "elapsed": elapsed,
+        "commit": {
+            "flushed_batches": batches,
+            "segments_per_flush": (after["flushed_segments"] - before["flushed_segments"]) / max(1, batches),
+            "server_avg_flush_ms": after["avg_flush_ms"],
+            "server_max_flush_ms": after["max_flush_ms"],
+            "failed_batches": after["failed_batches"] - before["failed_batches"],
+        },
+        # Lag of this client's loop; a saturated client would understate the server's throughput
+        "client_loop_lag": latency_summary(sampler.lags),
+        # Only reported when the server runs with LOOP_MONITOR_ENABLED
+        "server_loop": {key: loop[key] for key in ("lag_ms", "stalls")} if loop.get("enabled") else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay synthetic VAPI calls through the webhook")
+    parser.add_argument("--calls", type=int, default=50, help="Concurrent calls")
+    parser.add_argument("--segments", type=int, default=200, help="Transcript events per call")
+    parser.add_argument("--interval-ms", type=float, default=0,
+                        help="Pause between a call's events (0 = as fast as the webhook answers)")
+    parser.add_argument("--url", default=None, help="Send to a running server instead of in process")
+    parser.add_argument("--show-logs", action="store_true", help="Keep the backend's per-event prints")
+    parser.add_argument("--output", default=None, help="Write results as JSON to this file")
+    args = parser.parse_args()
+    args.run_id = int(time.time())
+
+    print(f"{args.calls} calls x {args.segments} transcript events "
+          f"({'server ' + args.url if args.url else 'in process, SQLite ' + os.environ['DATABASE_URL']})")
+    if args.url:
+        result = asyncio.run(run_against_server(args))
+    elif args.show_logs:
+        result = asyncio.run(run_in_process(args))
+    else:
+        # The webhook prints every event; keep that out of the report (the print calls still run)
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            result = asyncio.run(run_in_process(args))
+
+    requests = sum(len(values) for values in result["latencies"].values())
+    report = {
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "show_logs")},
+        "requests": requests,
+        "errors": len(result["errors"]),
+        "requests_per_second": requests / result["elapsed"],
+        "webhook": {kind: latency_summary(values) for kind, values in result["latencies"].items()},
+        "commit": result["commit"],
+    }
+    for key in ("loop_lag", "client_loop_lag", "server_loop"):
+        if result.get(key):
+            report[key] = result[key]
+
+    print(f"requests    {requests} in {result['elapsed']:.1f}s ({report['requests_per_second']:.0f}/s), "
+          f"{report['errors']} errors")
+    for kind, summary in report["webhook"].items():
+        print(f"{kind:<11} p50 {summary['p50_ms']:.1f} ms  p95 {summary['p95_ms']:.1f} ms  "
+              f"p99 {summary['p99_ms']:.1f} ms  max {summary['max_ms']:.1f} ms")
+    commit = report["commit"]
+    if "flushes" in commit:
+        flushes = commit["flushes"]
+        print(f"commit      {flushes['count']} flushes of {commit['segments_per_flush']:.0f} segments, "
+              f"p50 {flushes['p50_ms']:.1f} ms  p95 {flushes['p95_ms']:.1f} ms  max {flushes['max_ms']:.1f} ms; "
+              f"drained {commit['drain_after_last_ack_ms']:.0f} ms after the last ack, "
+              f"{commit['stored_segments']} segments stored")
+    else:
+        print(f"commit      {commit['flushed_batches']} flushes of {commit['segments_per_flush']:.0f} segments, "
+              f"server avg {commit['server_avg_flush_ms']:.1f} ms  max {commit['server_max_flush_ms']:.1f} ms, "
+              f"{commit['failed_batches']} failed")
+    for key in ("loop_lag", "client_loop_lag"):
+        if key in report:
+            lag = report[key]
+            print(f"{key.replace('_', ' '):<11} p50 {lag['p50_ms']:.1f} ms  p99 {lag['p99_ms']:.1f} ms  "
+                  f"max {lag['max_ms']:.1f} ms")
+    if "server_loop" in report:
+        lag = report["server_loop"]["lag_ms"]
+        print(f"server loop p50 {lag['p50']:.1f} ms  p99 {lag['p99']:.1f} ms  max {lag['max']:.1f} ms, "
+              f"{report['server_loop']['stalls']} stalls (details at {args.url}/metrics/loop)")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
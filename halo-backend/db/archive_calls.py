@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Archive completed calls older than N days out of the hot tables
+Each call is written with its transcripts, insights and units to a compressed JSONL
+part under ARCHIVE_DIR/day=YYYY-MM-DD/, then deleted in batches of ARCHIVE_BATCH_SIZE.
+/calls/{id} and /calls/{id}/snapshot keep serving archived calls from those files.
+
+Usage:
+    python db/archive_calls.py --days 30 --dry-run
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Add parent directory to path to import from backend modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db.models import async_engine, async_writer_engine
+from services.call_archive import call_archive, ARCHIVE_AFTER_DAYS
+
+async def archive(days=ARCHIVE_AFTER_DAYS, dry_run=False, max_batches=None):
+    """Archive eligible calls, or only count them for a dry run"""
+    try:
+        if dry_run:
+            print(f"ℹ️  {await call_archive.eligible(days)} completed calls are older than {days:g} days")
+            return True
+        archived = await call_archive.run(days, max_batches=max_batches)
+        stats = call_archive.get_stats()
+        print(f"✅ Archived {archived} calls and {stats['archived_transcripts']} transcript segments "
+              f"in {stats['parts_written']} {stats['compression']} parts ({stats['last_run_seconds']:.1f}s)")
+    except Exception as e:
+        print(f"❌ Error during archival: {e}")
+        return False
+    finally:
+        await async_engine.dispose()
+        await async_writer_engine.dispose()
+    return True
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archive old completed calls")
+    parser.add_argument("--days", type=float, default=ARCHIVE_AFTER_DAYS, help="Archive calls older than this")
+    parser.add_argument("--dry-run", action="store_true", help="Only count the calls that would be archived")
+    parser.add_argument("--max-batches", type=int, default=None, help="Stop after this many batches")
+    args = parser.parse_args()
+
+    print("🔄 Archiving completed calls...")
+    if not asyncio.run(archive(args.days, args.dry_run, args.max_batches)):
+        sys.exit(1)
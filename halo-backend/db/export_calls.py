@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Export calls with their transcripts, insights and units as NDJSON, one call per line
+Reads straight from the database through a server-side cursor, so memory stays flat
+however many calls match. Output ending in .gz is gzip-compressed.
+
+Usage:
+    python db/export_calls.py --status completed --since 2025-01-01 --until 2025-02-01 -o calls.ndjson.gz
+"""
+
+import argparse
+import gzip
+import os
+import sys
+import time
+from datetime import datetime
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Add parent directory to path to import from backend modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db.models import SessionLocal
+from services.call_export import export_lines, archived_lines, EXPORT_BATCH_SIZE
+
+def open_output(path):
+    if path in (None, "-"):
+        return sys.stdout
+    if path.endswith(".gz"):
+        return gzip.open(path, "wt", encoding="utf-8")
+    return open(path, "w", encoding="utf-8")
+
+def export(output=None, status=None, since=None, until=None, include_archived=False, batch_size=EXPORT_BATCH_SIZE):
+    """Write every matching call; returns the number exported, or None on error"""
+    exported = 0
+    out = open_output(output)
+    try:
+        if include_archived:
+            for line in archived_lines(status, since, until):
+                out.write(line)
+                exported += 1
+        with SessionLocal() as db:
+            for line in export_lines(db, status, since, until, batch_size):
+                out.write(line)
+                exported += 1
+    except Exception as e:
+        print(f"❌ Error during export: {e}", file=sys.stderr)
+        return None
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return exported
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export calls as NDJSON")
+    parser.add_argument("-o", "--output", default="-", help="Output file (.gz to compress); default stdout")
+    parser.add_argument("--status", default=None, help="Only calls with this status (active/completed)")
+    parser.add_argument("--since", type=datetime.fromisoformat, default=None, help="Calls that started at or after this")
+    parser.add_argument("--until", type=datetime.fromisoformat, default=None, help="Calls that started before this")
+    parser.add_argument("--include-archived", action="store_true", help="Also export calls moved to the archive")
+    parser.add_argument("--batch-size", type=int, default=EXPORT_BATCH_SIZE, help="Calls fetched per round trip")
+    args = parser.parse_args()
+
+    started = time.monotonic()
+    exported = export(args.output, args.status, args.since, args.until, args.include_archived, args.batch_size)
+    if exported is None:
+        sys.exit(1)
+    # Progress goes to stderr so stdout stays clean NDJSON
+    print(f"✅ Exported {exported} calls in {time.monotonic() - started:.1f}s", file=sys.stderr)
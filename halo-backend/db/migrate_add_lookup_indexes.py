@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Migration script to add the per-call lookup indexes on transcripts, ai_insights and units,
+and the status index on calls used to load the active-call board
+Works against MySQL (online, in-place DDL) and SQLite, based on DATABASE_URL
+"""
+
+from sqlalchemy import create_engine, text
+import os
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///./halo_dispatch.db')
+
+# (index name, table, columns) - keep in sync with __table_args__ in models.py
+LOOKUP_INDEXES = [
+    ("ix_transcripts_call_id_timestamp", "transcripts", ["call_id", "timestamp"]),
+    ("ix_ai_insights_call_id_id", "ai_insights", ["call_id", "id"]),
+    ("ix_units_call_id", "units", ["call_id"]),
+    ("ix_calls_status", "calls", ["status"]),
+]
+
+def mysql_index_exists(connection, table, index_name):
+    result = connection.execute(text("""
+        SELECT COUNT(*) as count
+        FROM INFORMATION_SCHEMA.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE()
+        AND TABLE_NAME = :table
+        AND INDEX_NAME = :index_name
+    """), {"table": table, "index_name": index_name})
+    return result.fetchone()[0] > 0
+
+def sqlite_index_exists(connection, index_name):
+    result = connection.execute(text(
+        "SELECT COUNT(*) FROM sqlite_master WHERE type = 'index' AND name = :index_name"
+    ), {"index_name": index_name})
+    return result.fetchone()[0] > 0
+
+def migrate_database(database_url=DATABASE_URL):
+    """Create any missing lookup indexes"""
+    engine = create_engine(database_url)
+    dialect = engine.dialect.name
+
+    try:
+        with engine.connect() as connection:
+            for index_name, table, columns in LOOKUP_INDEXES:
+                column_list = ", ".join(columns)
+                if dialect == "mysql":
+                    exists = mysql_index_exists(connection, table, index_name)
+                elif dialect == "sqlite":
+                    exists = sqlite_index_exists(connection, index_name)
+                else:
+                    print(f"❌ Unsupported database: {dialect}")
+                    return False
+                if exists:
+                    print(f"ℹ️  {index_name} already exists")
+                    continue
+
+                if dialect == "mysql":
+                    # INPLACE + LOCK=NONE builds the index without blocking
+                    # concurrent webhook inserts on the table
+                    connection.execute(text(
+                        f"ALTER TABLE {table} ADD INDEX {index_name} ({column_list}), "
+                        f"ALGORITHM=INPLACE, LOCK=NONE"
+                    ))
+                else:
+                    # SQLite has no online DDL; the build holds the write lock briefly,
+                    # which the writer's busy_timeout absorbs
+                    connection.execute(text(
+                        f"CREATE INDEX IF NOT EXISTS {index_name} ON {table} ({column_list})"
+                    ))
+                connection.commit()
+                print(f"✅ Created {index_name} on {table}({column_list})")
+
+            if dialect == "sqlite":
+                # Refresh planner statistics so the new indexes are preferred
+                connection.execute(text("ANALYZE"))
+                connection.commit()
+
+    except Exception as e:
+        print(f"❌ Error during migration: {e}")
+        return False
+
+    return True
+
+if __name__ == "__main__":
+    print("🔄 Running database migration...")
+    if migrate_database():
+        print("✅ Migration completed successfully!")
+    else:
+        print("❌ Migration failed!")
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Migration script to add the transcript full-text search index and index existing rows
+SQLite: an FTS5 table kept in sync by triggers. MySQL: a FULLTEXT index on transcripts.text
+"""
+
+from sqlalchemy import create_engine
+import os
+import sys
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///./halo_dispatch.db')
+
+# Add parent directory to path to import from backend modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.transcript_search import ensure_search_index
+
+def migrate_database(database_url=DATABASE_URL):
+    """Create the search index if it is missing"""
+    engine = create_engine(database_url)
+    try:
+        with engine.begin() as connection:
+            if ensure_search_index(connection):
+                print("✅ Created the transcript search index")
+            else:
+                print("ℹ️  Transcript search index already exists")
+    except Exception as e:
+        print(f"❌ Error during migration: {e}")
+        return False
+    return True
+
+if __name__ == "__main__":
+    print("🔄 Running database migration...")
+    if migrate_database():
+        print("✅ Migration completed successfully!")
+    else:
+        print("❌ Migration failed!")
@@ -1,6 +1,8 @@
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Text, ForeignKey, Float, Enum, Boolean
+from sqlalchemy import create_engine, event, Index, Column, Integer, String, DateTime, Text, ForeignKey, Float, Enum, Boolean
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 import os
 import enum
 
@@ -9,10 +11,87 @@ DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///./halo_dispatch.db')
 
 SQLALCHEMY_DATABASE_URL = DATABASE_URL
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+# Connection pool configuration (ignored for in-memory SQLite, which keeps a single connection)
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '10'))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '20'))
+DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes')
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))
+
+def _async_database_url(url: str) -> str:
+    """Map the sync DATABASE_URL onto its async driver (aiosqlite / aiomysql)"""
+    scheme, _, rest = url.partition('://')
+    backend = scheme.split('+')[0]
+    if backend == 'sqlite':
+        return f'sqlite+aiosqlite://{rest}'
+    if backend == 'mysql':
+        return f'mysql+aiomysql://{rest}'
+    return url
+
+ASYNC_DATABASE_URL = os.getenv('ASYNC_DATABASE_URL', _async_database_url(DATABASE_URL))
+
+# SQLite performance profile, applied to every new SQLite connection
+SQLITE_PROFILE = os.getenv('SQLITE_PROFILE', 'true').lower() in ('1', 'true', 'yes')
+SQLITE_PRAGMAS = {
+    # WAL lets dashboard reads proceed while the webhook writer commits
+    'journal_mode': os.getenv('SQLITE_JOURNAL_MODE', 'WAL'),
+    # NORMAL only fsyncs at checkpoints, which is durable enough with WAL
+    'synchronous': os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL'),
+    'mmap_size': int(os.getenv('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024))),
+    # Negative values are KiB, so this is a 64 MiB page cache per connection
+    'cache_size': int(os.getenv('SQLITE_CACHE_SIZE', '-64000')),
+    'busy_timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000')),
+    'temp_store': 'MEMORY',
+}
+
+def _is_memory_sqlite(url: str) -> bool:
+    return url.startswith('sqlite') and (url.endswith('://') or ':memory:' in url)
+
+def _pool_options(url: str, is_async: bool = False, writer: bool = False) -> dict:
+    options = {'pool_pre_ping': DB_POOL_PRE_PING, 'pool_recycle': DB_POOL_RECYCLE}
+    if _is_memory_sqlite(url):
+        return options
+    if is_async and url.startswith('sqlite'):
+        # aiosqlite defaults to NullPool, which opens a new connection thread per session
+        options['poolclass'] = AsyncAdaptedQueuePool
+    options['pool_size'] = 1 if writer else DB_POOL_SIZE
+    options['max_overflow'] = 0 if writer else DB_MAX_OVERFLOW
+    return options
+
+def apply_sqlite_profile(sync_engine, pragmas: dict = SQLITE_PRAGMAS):
+    """Run the profile PRAGMAs on each connection the engine opens"""
+    @event.listens_for(sync_engine, 'connect')
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
+
+def _uses_sqlite_profile(url: str) -> bool:
+    return SQLITE_PROFILE and url.startswith('sqlite') and not _is_memory_sqlite(url)
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **_pool_options(SQLALCHEMY_DATABASE_URL))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# Async engine for FastAPI handlers, so DB I/O doesn't block the event loop
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **_pool_options(ASYNC_DATABASE_URL, is_async=True))
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+# SQLite allows one writer at a time, so hot-path writes share a single dedicated
+# connection and queue in the pool instead of failing with "database is locked";
+# reads keep using the pool above. Other databases write through the regular pool.
+if _uses_sqlite_profile(ASYNC_DATABASE_URL):
+    async_writer_engine = create_async_engine(
+        ASYNC_DATABASE_URL, **_pool_options(ASYNC_DATABASE_URL, is_async=True, writer=True)
+    )
+    apply_sqlite_profile(async_writer_engine.sync_engine)
+    apply_sqlite_profile(async_engine.sync_engine)
+else:
+    async_writer_engine = async_engine
+if _uses_sqlite_profile(SQLALCHEMY_DATABASE_URL):
+    apply_sqlite_profile(engine)
+AsyncWriterSessionLocal = async_sessionmaker(async_writer_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 # Example transcript model
 def get_db():
     db = SessionLocal()
@@ -21,6 +100,14 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def get_async_writer_db():
+    async with AsyncWriterSessionLocal() as db:
+        yield db
+
 class Call(Base):
     __tablename__ = "calls"
     id = Column(Integer, primary_key=True, index=True)
@@ -32,6 +119,8 @@ class Call(Base):
     transcripts = relationship("Transcript", back_populates="call")
     ai_insights = relationship("AIInsight", back_populates="call")
     units = relationship("Unit", back_populates="call")
+    # Startup rebuild of the active-call board reads only active calls
+    __table_args__ = (Index("ix_calls_status", "status"),)
 
 class Transcript(Base):
     __tablename__ = "transcripts"
@@ -41,6 +130,8 @@ class Transcript(Base):
     timestamp = Column(DateTime)
     text = Column(Text)
     call = relationship("Call", back_populates="transcripts")
+    # Serves /calls/{call_id}/transcripts: filter on call_id, already ordered by timestamp
+    __table_args__ = (Index("ix_transcripts_call_id_timestamp", "call_id", "timestamp"),)
 
 class AIInsight(Base):
     __tablename__ = "ai_insights"
@@ -49,6 +140,8 @@ class AIInsight(Base):
     concern_tags = Column(Text)  # store as comma-separated or JSON string
     urgency_score = Column(Integer)
     call = relationship("Call", back_populates="ai_insights")
+    # Serves /calls/{call_id}/ai-insights: latest insight is the last entry for the call
+    __table_args__ = (Index("ix_ai_insights_call_id_id", "call_id", "id"),)
 
 class User(Base):
     __tablename__ = "users"
@@ -68,3 +161,13 @@ class Unit(Base):
     eta = Column(DateTime)
     location = Column(String(128))  # lat,lng or address
     call = relationship("Call", back_populates="units")
+    __table_args__ = (Index("ix_units_call_id", "call_id"),)
+
+class ArchivedCall(Base):
+    """Where a call moved when it was archived out of the hot tables"""
+    __tablename__ = "archived_calls"
+    call_id = Column(Integer, primary_key=True)  # the Call.id it had while hot
+    external_call_id = Column(String(128), index=True)
+    day = Column(String(10))  # partition, YYYY-MM-DD of the call
+    path = Column(String(512))  # archive file holding the call, relative to ARCHIVE_DIR
+    archived_at = Column(DateTime)
@@ -1,8 +1,10 @@
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Header, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 import os
-from sqlalchemy.orm import Session
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from datetime import datetime, timedelta
 
@@ -24,16 +26,74 @@ app.add_middleware(
 from api import vapi_webhook, test_vapi
 from api.urgency_score import router as urgency_router
 from api.key_concerns import router as concerns_router
+from api.analysis import router as analysis_router
+from api.orkes_callback import router as orkes_callback_router
+from api.search import router as search_router
+from api.export import router as export_router
+from services.socket_server import router as live_router, live_updates
+from services.loop_monitor import router as loop_router, loop_monitor, RouteTimingMiddleware
+from services.call_archive import router as archive_router, call_archive
 
 app.include_router(vapi_webhook.router)
 app.include_router(test_vapi.router)
 app.include_router(urgency_router)
 app.include_router(concerns_router)
+app.include_router(analysis_router)
+app.include_router(orkes_callback_router)
+app.include_router(search_router)
+app.include_router(export_router)
+app.include_router(live_router)
+app.include_router(loop_router)
+app.include_router(archive_router)
+
+# Per-route timings and stall attribution, only when the loop monitor is switched on
+if loop_monitor.enabled:
+    app.add_middleware(RouteTimingMiddleware)
+
+from services.transcript_ingest import transcript_ingest
+from services.ai_prompts import ai_service
+from services.orkes_client import orkes_client, workflow_results
+from services.call_board import call_board
+from services.transcript_search import ensure_search_index, SEARCH_INDEX_AUTO_CREATE
+from db.models import async_engine, async_writer_engine, ArchivedCall
+
+@app.on_event("startup")
+async def start_background_services():
+    loop_monitor.start()
+    await call_board.rebuild()
+    if SEARCH_INDEX_AUTO_CREATE:
+        try:
+            async with async_writer_engine.begin() as conn:
+                await conn.run_sync(ensure_search_index)
+        except Exception as e:
+            print(f"Error creating transcript search index: {e}")
+    try:
+        async with async_writer_engine.begin() as conn:
+            await conn.run_sync(ArchivedCall.__table__.create, checkfirst=True)
+    except Exception as e:
+        print(f"Error creating archived_calls table: {e}")
+    await transcript_ingest.start()
+    ai_service.start()
+    await workflow_results.start()
+    await call_archive.start()
+
+@app.on_event("shutdown")
+async def stop_background_services():
+    # Drain queued transcript segments before the process exits
+    await transcript_ingest.stop()
+    await ai_service.close()
+    await workflow_results.stop()
+    await call_archive.stop()
+    await orkes_client.close()
+    await loop_monitor.stop()
+    await async_engine.dispose()
+    await async_writer_engine.dispose()
 
 # Import the database models and engine
-from db.models import Base, engine, User, get_db
+from db.models import Base, engine, User, get_db, get_async_db, get_async_writer_db
 from db.models import Transcript, AIInsight, Unit, Call
 from db.models import SessionLocal
+from services.transcript_feed import transcript_page_query, transcript_tail_query, transcript_etag, page_etag_parts, etag_matches, next_cursor_headers, MAX_PAGE_SIZE
 from pydantic import BaseModel
 
 class UserCreate(BaseModel):
@@ -107,8 +167,27 @@ class TranscriptRead(BaseModel):
         from_attributes = True
 
 @app.get("/calls/{call_id}/transcripts", response_model=List[TranscriptRead])
-def get_transcripts(call_id: int, db: Session = Depends(get_db)):
-    transcripts = db.query(Transcript).filter(Transcript.call_id == call_id).order_by(Transcript.timestamp).all()
+async def get_transcripts(
+    call_id: int,
+    response: Response,
+    since_id: Optional[int] = None,
+    since_ts: Optional[datetime] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Transcript segments for a call. Pass since_id/since_ts from the X-Next-* headers
+    to fetch only new segments; If-None-Match returns 304 when nothing changed.
+    """
+    etag = await transcript_etag(db, call_id, *page_etag_parts(since_id, since_ts, limit))
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    result = await db.execute(transcript_page_query(call_id, since_id, since_ts, limit))
+    transcripts = result.scalars().all()
+    response.headers["ETag"] = etag
+    response.headers.update(next_cursor_headers(transcripts, limit))
     return transcripts
 
 class AIInsightRead(BaseModel):
@@ -120,8 +199,11 @@ class AIInsightRead(BaseModel):
         from_attributes = True
 
 @app.get("/calls/{call_id}/ai-insights", response_model=AIInsightRead)
-def get_ai_insight(call_id: int, db: Session = Depends(get_db)):
-    insight = db.query(AIInsight).filter(AIInsight.call_id == call_id).order_by(AIInsight.id.desc()).first()
+async def get_ai_insight(call_id: int, db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(
+        select(AIInsight).where(AIInsight.call_id == call_id).order_by(AIInsight.id.desc()).limit(1)
+    )
+    insight = result.scalars().first()
     if insight is None:
         raise HTTPException(status_code=404, detail="AI insight not found")
     return insight
@@ -130,15 +212,48 @@ class UnitRead(BaseModel):
     id: int
     call_id: int
     status: str
-    eta: datetime = None
-    location: str = None
+    eta: Optional[datetime] = None
+    location: Optional[str] = None
     class Config:
         from_attributes = True
 
 @app.get("/calls/{call_id}/units", response_model=List[UnitRead])
-def get_units(call_id: int, db: Session = Depends(get_db)):
-    units = db.query(Unit).filter(Unit.call_id == call_id).all()
-    return units
+async def get_units(call_id: int, db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(select(Unit).where(Unit.call_id == call_id))
+    return result.scalars().all()
+
+class UnitCreate(BaseModel):
+    status: str = "en_route"
+    eta: Optional[datetime] = None
+    location: Optional[str] = None
+
+class UnitUpdate(BaseModel):
+    status: Optional[str] = None
+    eta: Optional[datetime] = None
+    location: Optional[str] = None
+
+@app.post("/calls/{call_id}/units", response_model=UnitRead)
+async def assign_unit(call_id: int, unit: UnitCreate, db: AsyncSession = Depends(get_async_writer_db)):
+    """Assign a unit to a call; live subscribers get a unit event"""
+    if await db.get(Call, call_id) is None:
+        raise HTTPException(status_code=404, detail="Call not found")
+    db_unit = Unit(call_id=call_id, **unit.dict())
+    db.add(db_unit)
+    await db.commit()
+    live_updates.publish_unit(call_id, db_unit.id, db_unit.status, db_unit.eta, db_unit.location)
+    return db_unit
+
+@app.patch("/units/{unit_id}", response_model=UnitRead)
+async def update_unit(unit_id: int, unit: UnitUpdate, db: AsyncSession = Depends(get_async_writer_db)):
+    """Update a unit's status, ETA or location; live subscribers get a unit event"""
+    db_unit = await db.get(Unit, unit_id)
+    if db_unit is None:
+        raise HTTPException(status_code=404, detail="Unit not found")
+    for key, value in unit.dict(exclude_unset=True).items():
+        setattr(db_unit, key, value)
+    await db.commit()
+    live_updates.publish_unit(db_unit.call_id, db_unit.id, db_unit.status, db_unit.eta, db_unit.location)
+    return db_unit
 
 class CallRead(BaseModel):
     id: int
@@ -151,17 +266,84 @@ class CallRead(BaseModel):
         from_attributes = True
 
 @app.get("/calls/", response_model=List[CallRead])
-def read_calls(skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
-    calls = db.query(Call).offset(skip).limit(limit).all()
-    return calls
+async def read_calls(skip: int = 0, limit: int = 10, db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(select(Call).offset(skip).limit(limit))
+    return result.scalars().all()
+
+class ActiveCallRead(BaseModel):
+    rank: int
+    call_id: int
+    external_call_id: Optional[str] = None
+    score: Optional[int] = None
+    timestamp: Optional[datetime] = None
+    age_seconds: Optional[float] = None
+
+@app.get("/calls/active", response_model=List[ActiveCallRead])
+async def read_active_calls(limit: int = Query(10, ge=1, le=1000)):
+    """The most urgent active calls, highest score first, then longest waiting; served from memory"""
+    return call_board.top(limit)
 
 @app.get("/calls/{call_id}", response_model=CallRead)
-def read_call(call_id: int, db: Session = Depends(get_db)):
-    call = db.query(Call).filter(Call.id == call_id).first()
+async def read_call(call_id: int, db: AsyncSession = Depends(get_async_db)):
+    call = await db.get(Call, call_id)
+    if call is None:
+        # Completed calls past ARCHIVE_AFTER_DAYS live in the archive
+        call = await call_archive.load_async(call_id)
     if call is None:
         raise HTTPException(status_code=404, detail="Call not found")
     return call
 
+class CallSnapshot(BaseModel):
+    call: CallRead
+    ai_insight: Optional[AIInsightRead] = None
+    units: List[UnitRead]
+    transcripts: List[TranscriptRead]
+
+@app.get("/calls/{call_id}/snapshot", response_model=CallSnapshot)
+async def get_call_snapshot(
+    call_id: int,
+    response: Response,
+    transcripts: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Everything a dispatcher screen shows for one call in two queries: the call joined with
+    its latest insight and units, then its transcript (only the last `transcripts` segments
+    if given). Continue with /calls/{call_id}/transcripts using the X-Next-* headers.
+    """
+    latest_insight = (
+        select(func.max(AIInsight.id)).where(AIInsight.call_id == Call.id).correlate(Call).scalar_subquery()
+    )
+    result = await db.execute(
+        select(Call, AIInsight)
+        .outerjoin(AIInsight, AIInsight.id == latest_insight)
+        .options(joinedload(Call.units))
+        .where(Call.id == call_id)
+    )
+    row = result.unique().first()
+    if row is None:
+        archived = await call_archive.load_async(call_id)
+        if archived is None:
+            raise HTTPException(status_code=404, detail="Call not found")
+        return archived_snapshot(archived, transcripts)
+    call, insight = row
+
+    if transcripts is None:
+        result = await db.execute(transcript_page_query(call_id))
+        segments = result.scalars().all()
+    else:
+        result = await db.execute(transcript_tail_query(call_id, transcripts))
+        segments = list(reversed(result.scalars().all()))
+    response.headers.update(next_cursor_headers(segments, None))
+    return CallSnapshot(call=call, ai_insight=insight, units=call.units, transcripts=segments)
+
+def archived_snapshot(archived: dict, transcripts: Optional[int]) -> CallSnapshot:
+    # An archived call is final, so there are no cursor headers to continue from
+    segments = archived["transcripts"][-transcripts:] if transcripts else archived["transcripts"]
+    insights = archived["ai_insights"]
+    return CallSnapshot(call=archived, ai_insight=insights[-1] if insights else None,
+                        units=archived["units"], transcripts=segments)
+
 
 if __name__ == "__main__":
     print("Creating tables if they do not exist...")
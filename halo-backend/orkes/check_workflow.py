@@ -2,6 +2,7 @@ import requests
 import argparse
 import json
 import os
+import random
 import sys
 import time
 from dotenv import load_dotenv
@@ -23,55 +24,38 @@ else:
 orkes_server_url = os.environ.get("ORKES_SERVER_URL", "https://developer.orkescloud.com")
 print(f"Using Orkes server URL: {orkes_server_url}")
 
+sys.path.append(parent_dir)
+from orkes.token_manager import token_manager
+
 def get_jwt_token():
     """Get a JWT token from the Orkes API using key ID and secret"""
-    token_url = f"{orkes_server_url}/api/token"
-    
-    # Get key ID and secret from environment variables
-    key_id = os.environ.get("ORKES_KEY_ID")
-    key_secret = os.environ.get("ORKES_KEY_SECRET")
-    
-    if not key_id or not key_secret:
-        print("Error: ORKES_KEY_ID and ORKES_KEY_SECRET environment variables are required")
-        print("Please make sure these are set in your .env file")
-        return None
-    
-    print(f"Using key ID: {key_id[:5]}...")
-    
-    payload = {
-        "keyId": key_id,
-        "keySecret": key_secret
-    }
-    
-    try:
-        response = requests.post(token_url, json=payload)
-        if response.status_code == 200:
-            jwt_token = response.json().get("token")
-            print(f"Successfully obtained JWT token")
-            return jwt_token
-        else:
-            print(f"Error getting JWT token: {response.status_code}")
-            print(f"Response: {response.text}")
-            return None
-    except Exception as e:
-        print(f"Error getting JWT token: {e}")
-        return None
+    return token_manager.get_token()
 
-def check_workflow_status(workflow_id):
-    """Check the status of a workflow execution"""
+TERMINAL_STATUSES = ["COMPLETED", "FAILED", "TERMINATED", "TIMED_OUT"]
+
+# One keep-alive connection for every poll
+session = requests.Session()
+
+def auth_headers():
     jwt_token = get_jwt_token()
     if not jwt_token:
         print("Failed to get JWT token")
         return None
-    
-    url = f"{orkes_server_url}/api/workflow/{workflow_id}"
-    headers = {
+    return {
         "X-Authorization": jwt_token,
         "Accept": "application/json"
     }
+
+def check_workflow_status(workflow_id, include_tasks=False):
+    """Check the status of a workflow execution"""
+    headers = auth_headers()
+    if not headers:
+        return None
+    
+    url = f"{orkes_server_url}/api/workflow/{workflow_id}"
     
     try:
-        response = requests.get(url, headers=headers)
+        response = session.get(url, headers=headers, params={"includeTasks": str(include_tasks).lower()})
         if response.status_code == 200:
             result = response.json()
             return result
@@ -83,29 +67,75 @@ def check_workflow_status(workflow_id):
         print(f"Error checking workflow status: {e}")
         return None
 
-def wait_for_workflow_completion(workflow_id, max_wait_seconds=60, poll_interval=5):
-    """Wait for a workflow to complete and return the result"""
-    print(f"Waiting for workflow {workflow_id} to complete (max {max_wait_seconds} seconds)...")
+def check_workflow_statuses(workflow_ids):
+    """Statuses of several workflows from one search request, falling back to one request each"""
+    headers = auth_headers()
+    if not headers:
+        return {}
+    
+    url = f"{orkes_server_url}/api/workflow/search"
+    params = {"query": "workflowId IN ({})".format(",".join(workflow_ids)), "size": len(workflow_ids)}
+    
+    try:
+        response = session.get(url, headers=headers, params=params)
+        if response.status_code == 200:
+            return {summary["workflowId"]: summary.get("status") for summary in response.json().get("results", [])}
+        print(f"Bulk status check failed ({response.status_code}), checking workflows one by one")
+    except Exception as e:
+        print(f"Bulk status check failed ({e}), checking workflows one by one")
+    
+    statuses = {}
+    for workflow_id in workflow_ids:
+        result = check_workflow_status(workflow_id)
+        if result:
+            statuses[workflow_id] = result.get("status")
+    return statuses
+
+def wait_for_workflows_completion(workflow_ids, max_wait_seconds=60, poll_interval=1, max_poll_interval=15):
+    """Wait for workflows to complete; polls all unfinished ones together, backing off while none finish"""
+    print(f"Waiting for {len(workflow_ids)} workflow(s) to complete (max {max_wait_seconds} seconds)...")
     
+    results = {}
+    delay = poll_interval
     start_time = time.time()
     while time.time() - start_time < max_wait_seconds:
-        result = check_workflow_status(workflow_id)
-        if not result:
+        pending = [workflow_id for workflow_id in workflow_ids if workflow_id not in results]
+        statuses = check_workflow_statuses(pending)
+        if not statuses:
             print("Failed to check workflow status")
-            return None
+            return results
         
-        status = result.get("status")
-        print(f"Current status: {status}")
+        finished = [workflow_id for workflow_id in pending if statuses.get(workflow_id) in TERMINAL_STATUSES]
+        for workflow_id in finished:
+            # Fetch the full workflow only once it has finished, for its output and end time
+            result = check_workflow_status(workflow_id)
+            if not result:
+                continue
+            seen_at = time.time()
+            end_time = result.get("endTime")
+            result["visibilityLatencyMs"] = max(0, seen_at * 1000 - end_time) if end_time else None
+            results[workflow_id] = result
+            latency = f", seen {result['visibilityLatencyMs'] / 1000:.1f}s after it ended" if end_time else ""
+            print(f"Workflow {workflow_id} finished with status: {result.get('status')}{latency}")
         
-        if status in ["COMPLETED", "FAILED", "TERMINATED", "TIMED_OUT"]:
-            print(f"Workflow finished with status: {status}")
-            return result
+        if len(results) == len(workflow_ids):
+            return results
         
-        print(f"Workflow still running. Waiting {poll_interval} seconds...")
-        time.sleep(poll_interval)
+        running = len(workflow_ids) - len(results)
+        # Back off while nothing finishes; jitter spreads out concurrent pollers
+        delay = poll_interval if finished else min(max_poll_interval, delay * 2)
+        wait = delay / 2 + random.uniform(0, delay / 2)
+        print(f"{running} workflow(s) still running. Waiting {wait:.1f} seconds...")
+        time.sleep(wait)
     
-    print(f"Timed out waiting for workflow to complete after {max_wait_seconds} seconds")
-    return None
+    print(f"Timed out waiting for workflows to complete after {max_wait_seconds} seconds")
+    return results
+
+def wait_for_workflow_completion(workflow_id, max_wait_seconds=60, poll_interval=1, max_poll_interval=15):
+    """Wait for a workflow to complete and return the result"""
+    return wait_for_workflows_completion(
+        [workflow_id], max_wait_seconds, poll_interval, max_poll_interval
+    ).get(workflow_id)
 
 def extract_workflow_output(workflow_result):
     """Extract the output from a workflow result"""
@@ -119,39 +149,54 @@ def extract_workflow_output(workflow_result):
         print(f"Error extracting workflow output: {e}")
         return None
 
+def print_workflow(result):
+    print("\nWorkflow details:")
+    print(f"ID: {result.get('workflowId')}")
+    print(f"Name: {result.get('workflowName')}")
+    print(f"Status: {result.get('status')}")
+    print(f"Start time: {result.get('startTime')}")
+    print(f"End time: {result.get('endTime')}")
+    if result.get("visibilityLatencyMs") is not None:
+        print(f"Seen after end: {result['visibilityLatencyMs']:.0f} ms")
+    
+    output = extract_workflow_output(result)
+    if output:
+        print("\nWorkflow output:")
+        print(json.dumps(output, indent=2))
+    else:
+        print("\nNo output available")
+
 def main():
     parser = argparse.ArgumentParser(description="Check Orkes workflow status and results")
     
-    parser.add_argument("workflow_id", help="The ID of the workflow to check")
-    parser.add_argument("--wait", "-w", action="store_true", help="Wait for workflow to complete")
+    parser.add_argument("workflow_ids", nargs="+", help="The ID(s) of the workflow(s) to check")
+    parser.add_argument("--wait", "-w", action="store_true", help="Wait for the workflows to complete")
     parser.add_argument("--max-wait", "-m", type=int, default=60, help="Maximum wait time in seconds")
-    parser.add_argument("--poll-interval", "-p", type=int, default=5, help="Polling interval in seconds")
+    parser.add_argument("--poll-interval", "-p", type=float, default=1, help="Initial polling interval in seconds")
+    parser.add_argument("--max-poll-interval", type=float, default=15, help="Polling interval ceiling in seconds")
     
     args = parser.parse_args()
     
     if args.wait:
-        result = wait_for_workflow_completion(
-            args.workflow_id, 
-            max_wait_seconds=args.max_wait, 
-            poll_interval=args.poll_interval
+        results = wait_for_workflows_completion(
+            args.workflow_ids,
+            max_wait_seconds=args.max_wait,
+            poll_interval=args.poll_interval,
+            max_poll_interval=args.max_poll_interval
         )
+        latencies = [r["visibilityLatencyMs"] for r in results.values() if r.get("visibilityLatencyMs") is not None]
+        if latencies:
+            print(f"\nEnd-to-visibility latency: avg {sum(latencies) / len(latencies):.0f} ms, "
+                  f"max {max(latencies):.0f} ms over {len(latencies)} workflow(s)")
     else:
-        result = check_workflow_status(args.workflow_id)
+        results = {}
+        for workflow_id in args.workflow_ids:
+            result = check_workflow_status(workflow_id)
+            if result:
+                results[workflow_id] = result
     
-    if result:
-        print("\nWorkflow details:")
-        print(f"ID: {result.get('workflowId')}")
-        print(f"Name: {result.get('workflowName')}")
-        print(f"Status: {result.get('status')}")
-        print(f"Start time: {result.get('startTime')}")
-        print(f"End time: {result.get('endTime')}")
-        
-        output = extract_workflow_output(result)
-        if output:
-            print("\nWorkflow output:")
-            print(json.dumps(output, indent=2))
-        else:
-            print("\nNo output available")
+    for result in results.values():
+        print_workflow(result)
 
 if __name__ == "__main__":
     main()
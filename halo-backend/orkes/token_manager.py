@@ -0,0 +1,204 @@
+"""
+Shared Orkes JWT cache for the CLI scripts and the backend.
+
+Fetches a token from /api/token once, reuses it until shortly before it expires and
+refreshes it under a lock so concurrent callers trigger a single request. Optionally
+persists the token to disk so back-to-back script runs skip authentication too.
+
+Usage:
+    from orkes.token_manager import token_manager
+    jwt_token = token_manager.get_token()                       # scripts (requests)
+    jwt_token = await token_manager.get_token_async(client)     # backend (httpx.AsyncClient)
+"""
+
+import asyncio
+import base64
+import json
+import os
+import threading
+import time
+from typing import Optional
+
+# Refresh this many seconds before the token's exp claim
+ORKES_TOKEN_REFRESH_MARGIN_SECONDS = float(os.getenv("ORKES_TOKEN_REFRESH_MARGIN_SECONDS", "60"))
+# Lifetime assumed when the token carries no readable exp claim
+ORKES_TOKEN_TTL_SECONDS = float(os.getenv("ORKES_TOKEN_TTL_SECONDS", "1800"))
+
+
+def decode_jwt_expiry(token: str) -> Optional[float]:
+    """The exp claim (epoch seconds) of a JWT, without verifying its signature"""
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return float(json.loads(base64.urlsafe_b64decode(payload))["exp"])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return None
+
+
+class OrkesTokenManager:
+    def __init__(self, server_url: Optional[str] = None, key_id: Optional[str] = None,
+                 key_secret: Optional[str] = None, cache_path: Optional[str] = None,
+                 refresh_margin: float = ORKES_TOKEN_REFRESH_MARGIN_SECONDS):
+        # Unset values are read from the environment on first use, after scripts have loaded .env
+        self._server_url = server_url
+        self._key_id = key_id
+        self._key_secret = key_secret
+        self._cache_path = cache_path
+        self.refresh_margin = refresh_margin
+        self._token: Optional[str] = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+        self._async_lock = None
+        self._stats = {"hits": 0, "refreshes": 0, "disk_hits": 0, "failures": 0}
+
+    @property
+    def server_url(self) -> str:
+        return self._server_url or os.environ.get("ORKES_SERVER_URL", "https://developer.orkescloud.com")
+
+    @property
+    def cache_path(self) -> Optional[str]:
+        path = self._cache_path or os.environ.get("ORKES_TOKEN_CACHE")
+        return os.path.expanduser(path) if path else None
+
+    def _credentials(self):
+        key_id = self._key_id or os.environ.get("ORKES_KEY_ID")
+        key_secret = self._key_secret or os.environ.get("ORKES_KEY_SECRET")
+        if not key_id or not key_secret:
+            print("Error: ORKES_KEY_ID and ORKES_KEY_SECRET environment variables are required")
+            return None
+        return {"keyId": key_id, "keySecret": key_secret}
+
+    def _fresh(self) -> bool:
+        return self._token is not None and time.time() < self._expires_at - self.refresh_margin
+
+    def _cached(self) -> Optional[str]:
+        """The in-process or on-disk token if it is not due for refresh"""
+        if self._fresh():
+            self._stats["hits"] += 1
+            return self._token
+        if self._load_from_disk() and self._fresh():
+            self._stats["disk_hits"] += 1
+            return self._token
+        return None
+
+    def _store(self, token: str):
+        self._token = token
+        self._expires_at = decode_jwt_expiry(token) or time.time() + ORKES_TOKEN_TTL_SECONDS
+        self._stats["refreshes"] += 1
+        self._save_to_disk()
+
+    def _fallback(self) -> Optional[str]:
+        # A failed refresh-ahead can keep using the old token until it actually expires
+        self._stats["failures"] += 1
+        if self._token is not None and time.time() < self._expires_at:
+            return self._token
+        return None
+
+    def get_token(self, session=None) -> Optional[str]:
+        """JWT for X-Authorization; session is an optional requests.Session to reuse"""
+        token = self._cached()
+        if token:
+            return token
+        with self._lock:
+            # Another thread may have refreshed while we waited
+            token = self._cached()
+            if token:
+                return token
+            payload = self._credentials()
+            if payload is None:
+                return None
+            if session is None:
+                import requests
+                session = requests
+            try:
+                response = session.post(f"{self.server_url}/api/token", json=payload)
+                if response.status_code == 200 and response.json().get("token"):
+                    self._store(response.json()["token"])
+                    print("Successfully obtained JWT token")
+                    return self._token
+                print(f"Error getting JWT token: {response.status_code}")
+                print(f"Response: {response.text}")
+            except Exception as e:
+                print(f"Error getting JWT token: {e}")
+            return self._fallback()
+
+    async def get_token_async(self, client) -> Optional[str]:
+        """Same as get_token, for an httpx.AsyncClient"""
+        token = self._cached()
+        if token:
+            return token
+        if self._async_lock is None:
+            self._async_lock = asyncio.Lock()
+        async with self._async_lock:
+            token = self._cached()
+            if token:
+                return token
+            payload = self._credentials()
+            if payload is None:
+                return None
+            try:
+                response = await client.post(f"{self.server_url}/api/token", json=payload)
+                if response.status_code == 200 and response.json().get("token"):
+                    self._store(response.json()["token"])
+                    return self._token
+                print(f"Error getting Orkes JWT token: {response.status_code} {response.text}")
+            except Exception as e:
+                print(f"Error getting Orkes JWT token: {e}")
+            return self._fallback()
+
+    def invalidate(self):
+        """Drop the token, e.g. after Orkes answers 401, so the next call re-authenticates"""
+        self._token = None
+        self._expires_at = 0.0
+        path = self.cache_path
+        if path and os.path.exists(path):
+            os.remove(path)
+
+    def _load_from_disk(self) -> bool:
+        path = self.cache_path
+        if not path or not os.path.exists(path):
+            return False
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        # Only reuse a token issued for this server and key
+        if data.get("server_url") != self.server_url or data.get("key_id") != (
+            self._key_id or os.environ.get("ORKES_KEY_ID")
+        ):
+            return False
+        self._token = data.get("token")
+        self._expires_at = float(data.get("expires_at", 0))
+        return self._token is not None
+
+    def _save_to_disk(self):
+        path = self.cache_path
+        if not path:
+            return
+        data = {
+            "server_url": self.server_url,
+            "key_id": self._key_id or os.environ.get("ORKES_KEY_ID"),
+            "token": self._token,
+            "expires_at": self._expires_at,
+        }
+        try:
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+            # Write then rename so a concurrent reader never sees a partial file; owner-only, it's a credential
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Warning: could not write Orkes token cache {path}: {e}")
+
+    def get_stats(self) -> dict:
+        stats = dict(self._stats)
+        stats["valid_for_seconds"] = max(0.0, self._expires_at - time.time()) if self._token else 0.0
+        return stats
+
+
+# Create a singleton instance
+token_manager = OrkesTokenManager()
@@ -86,7 +86,7 @@ def trigger_workflow(workflow_name, call_id, transcript, backend_url=DEFAULT_BAC
 def main():
     parser = argparse.ArgumentParser(description="Trigger Orkes workflow agents")
     
-    parser.add_argument("--workflow", "-w", choices=["urgency_score_agent", "key_concerns_agent"], 
+    parser.add_argument("--workflow", "-w", choices=["urgency_score_agent", "key_concerns_agent", "call_analysis_agent"], 
                         default=DEFAULT_WORKFLOW, help="Workflow to trigger")
     parser.add_argument("--call-id", "-c", default=DEFAULT_CALL_ID, 
                         help="Call ID to use for the workflow")
@@ -22,6 +22,9 @@ else:
 orkes_server_url = os.environ.get("ORKES_SERVER_URL", "https://developer.orkescloud.com")
 print(f"Using Orkes server URL: {orkes_server_url}")
 
+sys.path.append(parent_dir)
+from orkes.token_manager import token_manager
+
 # Default values
 DEFAULT_API_URL = f"{orkes_server_url}/api/workflow"
 DEFAULT_WORKFLOW = "urgency_score_agent"
@@ -68,51 +71,7 @@ def load_test_transcript(file_path=None, test_index=0):
 
 def get_jwt_token():
     """Get a JWT token from the Orkes API using key ID and secret"""
-    token_url = f"{orkes_server_url}/api/token"
-    
-    # Get key ID and secret from environment variables
-    key_id = os.environ.get("ORKES_KEY_ID")
-    key_secret = os.environ.get("ORKES_KEY_SECRET")
-    
-    if not key_id or not key_secret:
-        print("Error: ORKES_KEY_ID and ORKES_KEY_SECRET environment variables are required")
-        print("Please make sure these are set in your .env file")
-        print(f"Current environment variables:")
-        for key in sorted(os.environ.keys()):
-            if key.startswith("ORKES_"):
-                value = os.environ[key]
-                # Mask the value for security
-                masked_value = value[:5] + "..." + value[-5:] if len(value) > 10 else "***"
-                print(f"  {key}={masked_value}")
-        return None
-    
-    print(f"Using key ID: {key_id[:5]}...")
-    
-    payload = {
-        "keyId": key_id,
-        "keySecret": key_secret
-    }
-    
-    try:
-        print(f"Sending request to: {token_url}")
-        response = requests.post(token_url, json=payload)
-        print(f"Status code: {response.status_code}")
-        
-        if response.status_code == 200:
-            jwt_token = response.json().get("token")
-            print(f"Successfully obtained JWT token")
-            return jwt_token
-        else:
-            print(f"Error getting JWT token: {response.status_code}")
-            print(f"Response: {response.text}")
-            print("\nPossible issues:")
-            print("1. Invalid key ID or secret")
-            print("2. Key doesn't have the necessary permissions")
-            print("3. The Orkes server URL is incorrect")
-            return None
-    except Exception as e:
-        print(f"Error getting JWT token: {e}")
-        return None
+    return token_manager.get_token()
 
 def trigger_workflow(workflow_name, call_id, transcript, backend_url=DEFAULT_BACKEND_URL, 
                     api_url=DEFAULT_API_URL):
@@ -177,7 +136,7 @@ def trigger_workflow(workflow_name, call_id, transcript, backend_url=DEFAULT_BAC
 def main():
     parser = argparse.ArgumentParser(description="Trigger Orkes workflow agents")
     
-    parser.add_argument("--workflow", "-w", choices=["urgency_score_agent", "key_concerns_agent"], 
+    parser.add_argument("--workflow", "-w", choices=["urgency_score_agent", "key_concerns_agent", "call_analysis_agent"], 
                         default=DEFAULT_WORKFLOW, help="Workflow to trigger")
     parser.add_argument("--call-id", "-c", default=None, 
                         help="Call ID to use for the workflow (overrides test file ID)")
@@ -1,63 +1,267 @@
 # OpenAI calls + prompt formatting
 
 import os
+import re
+import json
+import asyncio
+import httpx
 import openai
-from typing import Dict, List, Optional, Union
+from typing import Callable, Dict, List, Optional, Union
+from services.llm_cache import cache_key, llm_cache, normalize_transcript
+from services.micro_batch import MicroBatcher, AI_BATCH_ENABLED
+from services.pre_classifier import answer_locally
+from services.priority_limiter import PriorityLimiter, PRIORITY_NORMAL
 
 # Configure OpenAI API key
 openai.api_key = os.environ.get("OPENAI_API_KEY")
 
+# Upper bound on one model request, including time spent waiting for a slot
+OPENAI_DEADLINE_SECONDS = float(os.getenv("OPENAI_DEADLINE_SECONDS", "20"))
+OPENAI_CONNECT_TIMEOUT_SECONDS = float(os.getenv("OPENAI_CONNECT_TIMEOUT_SECONDS", "5"))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "1"))
+# Model requests in flight at once; the rest queue by priority
+OPENAI_MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", "8"))
+# Keep-alive pool shared by all requests
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "16"))
+OPENAI_MAX_KEEPALIVE = int(os.getenv("OPENAI_MAX_KEEPALIVE", "8"))
+
+# Concern categories the model may choose from
+VALID_CONCERNS = [
+    "Domestic Violence",
+    "Bleeding",
+    "Head Injury",
+    "Perpetrator Present",
+    "Mental Health Crisis",
+    "Unknown Location"
+]
+
+# Part of every cache key - bump when a prompt's wording (or VALID_CONCERNS) changes so stale answers aren't reused
+PROMPT_VERSIONS = {
+    "urgency": "1",
+    "concerns": "1",
+    "analysis": "1",
+}
+
+def parse_concerns(values) -> List[str]:
+    """Keep only known concern categories, in order, without duplicates"""
+    concerns = []
+    for value in values:
+        concern = str(value).strip()
+        if concern in VALID_CONCERNS and concern not in concerns:
+            concerns.append(concern)
+    return concerns
+
+def parse_analysis(content: str) -> Dict:
+    """Validate a JSON analysis reply: clamp the score and keep only known concerns"""
+    return validate_analysis(json.loads(content))
+
+def validate_analysis(result: Dict) -> Dict:
+    return {
+        "score": max(1, min(10, int(result["score"]))),
+        "concerns": parse_concerns(result.get("concerns", [])),
+        "summary": str(result.get("summary", "")).strip(),
+    }
+
+class StreamingAnalysisParser:
+    """
+    Pulls the score and each finished concern out of a JSON analysis reply while it streams in.
+    Relies on the prompt asking for "score", then "concerns", then "summary".
+    """
+    # The score is only complete once something follows its digits
+    _score = re.compile(r'"score"\s*:\s*"?(\d+)"?\s*[,}\s]')
+    _concerns = re.compile(r'"concerns"\s*:\s*\[')
+    _concern_item = re.compile(r'\s*,?\s*"((?:[^"\\]|\\.)*)"')
+    
+    def __init__(self):
+        self.buffer = ""
+        self.score: Optional[int] = None
+        self.concerns: List[str] = []
+        self._position = None  # where the next concern item starts, once the list is open
+        self._concerns_done = False
+    
+    def feed(self, delta: str) -> bool:
+        """Add streamed text; True if the score or the concern list changed"""
+        self.buffer += delta
+        changed = False
+        if self.score is None:
+            match = self._score.search(self.buffer)
+            if match:
+                self.score = max(1, min(10, int(match.group(1))))
+                changed = True
+        if self._position is None:
+            match = self._concerns.search(self.buffer)
+            if match:
+                self._position = match.end()
+        while self._position is not None and not self._concerns_done:
+            if self.buffer[self._position:].lstrip().startswith("]"):
+                self._concerns_done = True
+                break
+            match = self._concern_item.match(self.buffer, self._position)
+            if not match:
+                break  # item still streaming
+            self._position = match.end()
+            for concern in parse_concerns([match.group(1)]):
+                if concern not in self.concerns:
+                    self.concerns.append(concern)
+                    changed = True
+        return changed
+
 class AIPromptService:
     def __init__(self):
         self.model = "gpt-4o"  # Default model, can be configured
+        self._client = None
+        self._limiter = PriorityLimiter(OPENAI_MAX_CONCURRENCY)
+        # With batching on, concurrent urgency/concerns/analysis requests share model calls
+        self.batching = AI_BATCH_ENABLED
+        self._batcher = MicroBatcher(self._request_analysis_batch)
+        self._stats = {"requests": 0, "timeouts": 0, "errors": 0}
+    
+    def start(self):
+        """Create the pooled client; called on app startup"""
+        if self._client is not None:
+            return
+        if not openai.api_key:
+            print("Warning: OPENAI_API_KEY is not set; model requests will fail")
+            return
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=OPENAI_MAX_CONNECTIONS,
+                max_keepalive_connections=OPENAI_MAX_KEEPALIVE,
+            ),
+            timeout=httpx.Timeout(OPENAI_DEADLINE_SECONDS, connect=OPENAI_CONNECT_TIMEOUT_SECONDS),
+        )
+        self._client = openai.AsyncOpenAI(
+            api_key=openai.api_key,
+            http_client=http_client,
+            timeout=httpx.Timeout(OPENAI_DEADLINE_SECONDS, connect=OPENAI_CONNECT_TIMEOUT_SECONDS),
+            max_retries=OPENAI_MAX_RETRIES,
+        )
+    
+    async def close(self):
+        """Close pooled connections; called on app shutdown"""
+        if self._client is not None:
+            client, self._client = self._client, None
+            await client.close()
+    
+    @property
+    def client(self) -> openai.AsyncOpenAI:
+        # Scripts that never run the app's startup get the same client on first use
+        if self._client is None:
+            self.start()
+            if self._client is None:
+                raise openai.OpenAIError("OPENAI_API_KEY is not set")
+        return self._client
+    
+    async def _complete(self, priority: int = PRIORITY_NORMAL, **kwargs):
+        """One chat completion under the concurrency limit and the request deadline"""
+        async def request():
+            async with self._limiter.slot(priority):
+                return await self.client.chat.completions.create(model=self.model, **kwargs)
+        
+        return await self._with_deadline(request())
+    
+    async def _complete_streaming(self, on_delta: Callable[[str], None],
+                                  priority: int = PRIORITY_NORMAL, **kwargs) -> str:
+        """Like _complete, but hands each content delta to on_delta and returns the full text"""
+        async def request():
+            async with self._limiter.slot(priority):
+                stream = await self.client.chat.completions.create(model=self.model, stream=True, **kwargs)
+                parts = []
+                async for chunk in stream:
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        parts.append(delta)
+                        on_delta(delta)
+                return "".join(parts)
+        
+        return await self._with_deadline(request())
+    
+    async def _with_deadline(self, request):
+        self._stats["requests"] += 1
+        try:
+            return await asyncio.wait_for(request, OPENAI_DEADLINE_SECONDS)
+        except asyncio.TimeoutError:
+            self._stats["timeouts"] += 1
+            raise asyncio.TimeoutError(f"model request exceeded the {OPENAI_DEADLINE_SECONDS}s deadline") from None
+        except Exception:
+            self._stats["errors"] += 1
+            raise
+    
+    def get_stats(self) -> dict:
+        stats = dict(self._stats)
+        stats.update(self._limiter.get_stats())
+        stats["batching"] = self.batching
+        stats["batcher"] = self._batcher.get_stats()
+        return stats
     
-    async def get_urgency_score(self, transcript: str) -> int:
+    def _cache_key(self, kind: str, transcript: str) -> str:
+        # Batched answers come from the combined batch prompt, not the kind's own prompt
+        variant = "batched" if self.batching else "single"
+        return cache_key(self.model, f"{kind}:{PROMPT_VERSIONS[kind]}:{variant}", transcript)
+    
+    async def get_urgency_score(self, transcript: str, priority: int = PRIORITY_NORMAL) -> int:
         """
         Rate the urgency of a 911 transcript from 1-10
         """
+        local = answer_locally(transcript)
+        if local is not None:
+            return local.score
+        try:
+            return await llm_cache.get_or_compute(
+                self._cache_key("urgency", transcript),
+                lambda: self._request_urgency_score(transcript, priority),
+            )
+        except Exception as e:
+            print(f"Error getting urgency score: {str(e)}")
+            return 5  # Default score on error
+    
+    async def _request_urgency_score(self, transcript: str, priority: int = PRIORITY_NORMAL) -> int:
+        if self.batching:
+            return (await self._request_analysis(transcript, priority))["score"]
         prompt = f"""Rate the urgency of this 911 transcript from 1 (not urgent) to 10 (life-threatening). Return only the number.
 
 Transcript:
 "{transcript}"
 """
+        response = await self._complete(
+            priority,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.1,  # Low temperature for consistent scoring
+            max_tokens=10,    # We only need a number
+        )
+        
+        # Extract the score from the response
+        score_text = response.choices[0].message.content.strip()
+        # Try to convert to integer
         try:
-            response = await openai.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.1,  # Low temperature for consistent scoring
-                max_tokens=10,    # We only need a number
-            )
-            
-            # Extract the score from the response
-            score_text = response.choices[0].message.content.strip()
-            # Try to convert to integer
-            try:
-                score = int(score_text)
-                # Ensure score is within range
-                return max(1, min(10, score))
-            except ValueError:
-                # If we can't parse the score, default to 5
-                print(f"Warning: Could not parse urgency score: {score_text}")
-                return 5
-                
-        except Exception as e:
-            print(f"Error getting urgency score: {str(e)}")
-            return 5  # Default score on error
+            score = int(score_text)
+        except ValueError:
+            # Raised rather than defaulted so an unparseable reply isn't cached
+            raise ValueError(f"Could not parse urgency score: {score_text}")
+        # Ensure score is within range
+        return max(1, min(10, score))
     
-    async def get_key_concerns(self, transcript: str) -> List[str]:
+    async def get_key_concerns(self, transcript: str, priority: int = PRIORITY_NORMAL) -> List[str]:
         """
         Extract key safety concerns from a 911 transcript
         """
-        valid_concerns = [
-            "Domestic Violence",
-            "Bleeding",
-            "Head Injury",
-            "Perpetrator Present",
-            "Mental Health Crisis",
-            "Unknown Location"
-        ]
-        
-        concerns_list = ", ".join(valid_concerns)
+        local = answer_locally(transcript, concerns=True)
+        if local is not None:
+            return local.concerns
+        try:
+            concerns = await llm_cache.get_or_compute(
+                self._cache_key("concerns", transcript),
+                lambda: self._request_key_concerns(transcript, priority),
+            )
+            return list(concerns)
+        except Exception as e:
+            print(f"Error getting key concerns: {str(e)}")
+            return []  # Empty list on error
+    
+    async def _request_key_concerns(self, transcript: str, priority: int = PRIORITY_NORMAL) -> List[str]:
+        if self.batching:
+            return list((await self._request_analysis(transcript, priority))["concerns"])
+        concerns_list = ", ".join(VALID_CONCERNS)
         
         prompt = f"""Extract any relevant safety concerns from the transcript. Only choose from this list:
 {concerns_list}
@@ -67,29 +271,186 @@ Return only the concerns as a comma-separated list with no additional text.
 Transcript:
 "{transcript}"
 """
+        response = await self._complete(
+            priority,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.1,
+            max_tokens=100,
+        )
+        
+        # Extract concerns from the response
+        concerns_text = response.choices[0].message.content.strip()
+        
+        # Parse the concerns
+        return parse_concerns(concerns_text.split(","))
+
+    async def get_analysis(self, transcript: str, priority: int = PRIORITY_NORMAL) -> Dict:
+        """
+        Urgency score and key concerns for a 911 transcript from a single model request
+        """
+        local = answer_locally(transcript)
+        if local is not None:
+            if local.concerns_confident:
+                return {"score": local.score, "concerns": local.concerns}
+            # A confident score doesn't mean the patterns found every concern
+            return {"score": local.score, "concerns": await self.get_key_concerns(transcript, priority)}
         try:
-            response = await openai.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.1,
-                max_tokens=100,
+            result = await llm_cache.get_or_compute(
+                self._cache_key("analysis", transcript),
+                lambda: self._request_analysis(transcript, priority),
             )
-            
-            # Extract concerns from the response
-            concerns_text = response.choices[0].message.content.strip()
-            
-            # Parse the concerns
-            concerns = [
-                concern.strip() 
-                for concern in concerns_text.split(",") 
-                if concern.strip() in valid_concerns
-            ]
-            
-            return concerns
+            # Copy so callers can't mutate the cached entry
+            return {"score": result["score"], "concerns": list(result["concerns"])}
+        
+        except Exception as e:
+            print(f"Error getting analysis: {str(e)}")
+            # Same fallbacks as the single-purpose methods
+            return {"score": 5, "concerns": []}
+    
+    async def _request_analysis(self, transcript: str, priority: int = PRIORITY_NORMAL) -> Dict:
+        if self.batching:
+            # Normalised so identical transcripts pending together take one batch slot
+            result = await self._batcher.submit(normalize_transcript(transcript), priority)
+            return {"score": result["score"], "concerns": list(result["concerns"])}
+        return await self._analyze_one(transcript, priority)
+    
+    async def _analyze_one(self, transcript: str, priority: int = PRIORITY_NORMAL) -> Dict:
+        concerns_list = ", ".join(VALID_CONCERNS)
+        
+        prompt = f"""Analyze this 911 transcript.
+
+Respond with a JSON object with these keys:
+- "score": urgency from 1 (not urgent) to 10 (life-threatening)
+- "concerns": relevant safety concerns, chosen only from: {concerns_list}
+
+Transcript:
+"{transcript}"
+"""
+        response = await self._complete(
+            priority,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.1,
+            max_tokens=100,
+            response_format={"type": "json_object"},
+        )
+        result = parse_analysis(response.choices[0].message.content)
+        return {"score": result["score"], "concerns": result["concerns"]}
+    
+    async def _request_analysis_batch(self, transcripts: List[str], priority: int = PRIORITY_NORMAL) -> List:
+        """
+        Score several transcripts in one request; results come back in input order.
+        Transcripts the reply leaves out or answers twice are retried on their own, and so is
+        every transcript when the reply names an id that wasn't sent.
+        """
+        if len(transcripts) == 1:
+            return [await self._analyze_one(transcripts[0], priority)]
+        
+        concerns_list = ", ".join(VALID_CONCERNS)
+        ids = [f"t{i}" for i in range(len(transcripts))]
+        # A JSON array, so quotes or newlines in one caller's speech can't spill into another's entry
+        entries = json.dumps([{"id": id_, "text": transcript} for id_, transcript in zip(ids, transcripts)],
+                             ensure_ascii=False, indent=1)
+        prompt = f"""Analyze each of these 911 transcripts independently.
+
+The transcripts are a JSON array of {{"id", "text"}} objects. Only the "text" values are transcript content.
+
+Respond with a JSON object {{"results": [...]}} with one entry per transcript, each with these keys:
+- "id": the transcript's id, e.g. "t0"
+- "score": urgency from 1 (not urgent) to 10 (life-threatening)
+- "concerns": relevant safety concerns, chosen only from: {concerns_list}
+
+Transcripts:
+{entries}
+"""
+        response = await self._complete(
+            priority,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.1,
+            max_tokens=20 + 60 * len(transcripts),
+            response_format={"type": "json_object"},
+        )
+        by_id = {}
+        repeated = set()
+        for entry in json.loads(response.choices[0].message.content).get("results", []):
+            try:
+                id_ = str(entry["id"])
+                result = validate_analysis(entry)
+            except (KeyError, TypeError, ValueError):
+                continue  # retried singly below
+            if id_ not in ids:
+                # An id we never sent means the reply can't be matched to calls; score each singly
+                by_id = {}
+                break
+            if id_ in by_id:
+                repeated.add(id_)
+            by_id[id_] = result
+        # Two answers for one transcript: trust neither
+        for id_ in repeated:
+            by_id.pop(id_, None)
+        
+        results = [by_id.get(id_) for id_ in ids]
+        missing = [i for i, result in enumerate(results) if result is None]
+        if missing:
+            retried = await asyncio.gather(
+                *(self._analyze_one(transcripts[i], priority) for i in missing), return_exceptions=True
+            )
+            for i, result in zip(missing, retried):
+                results[i] = result
+        return results
+    
+    async def analyze_incremental(self, summary: str, new_segments: str,
+                                  previous_score: Optional[int] = None,
+                                  previous_concerns: Optional[List[str]] = None,
+                                  priority: int = PRIORITY_NORMAL,
+                                  on_partial: Optional[Callable[[int, List[str]], None]] = None) -> Optional[Dict]:
+        """
+        Re-score a call from a running summary plus only the segments since the last score.
+        Returns {"score", "concerns", "summary"}, or None if the model call failed.
+        With on_partial, the reply is streamed and on_partial(score, concerns) is called as soon as
+        the score and each further concern have arrived, before the summary is written.
+        """
+        concerns_list = ", ".join(VALID_CONCERNS)
+        previous = "none yet" if previous_score is None else f"{previous_score}/10"
+        prompt = f"""You are monitoring a live 911 call. Update the assessment using the new transcript segments.
+
+Summary of the call so far:
+"{summary or 'The call has just started.'}"
+
+Previous urgency score: {previous}
+Previous concerns: {", ".join(previous_concerns or []) or "none"}
+
+New transcript segments:
+{new_segments}
+
+Respond with a JSON object with these keys, in this order:
+- "score": urgency of the whole call from 1 (not urgent) to 10 (life-threatening)
+- "concerns": every concern that applies to the whole call, chosen only from: {concerns_list}
+- "summary": an updated summary of the whole call in at most 80 words, keeping locations, injuries and threats
+"""
+        request = dict(
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.1,
+            max_tokens=250,
+            response_format={"type": "json_object"},
+        )
+        try:
+            if on_partial is None:
+                response = await self._complete(priority, **request)
+                content = response.choices[0].message.content
+            else:
+                parser = StreamingAnalysisParser()
+                
+                def on_delta(delta: str):
+                    if parser.feed(delta) and parser.score is not None:
+                        on_partial(parser.score, list(parser.concerns))
                 
+                content = await self._complete_streaming(on_delta, priority, **request)
+            result = parse_analysis(content)
+            result["summary"] = result["summary"] or summary
+            return result
         except Exception as e:
-            print(f"Error getting key concerns: {str(e)}")
-            return []  # Empty list on error
+            print(f"Error running incremental analysis: {str(e)}")
+            return None
 
 # Create a singleton instance
 ai_service = AIPromptService()
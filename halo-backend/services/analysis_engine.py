@@ -0,0 +1,249 @@
+# Incremental per-call AI analysis: re-score on transcript deltas instead of full transcripts
+
+import asyncio
+import os
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from sqlalchemy import update
+from db.models import AsyncWriterSessionLocal, AIInsight, Call
+from services.ai_prompts import ai_service
+from services.call_board import call_board
+from services.pre_classifier import is_filler
+from services.priority_limiter import PRIORITY_HIGH, PRIORITY_RESCORE
+from services.socket_server import live_updates
+
+# Runs by default only when the model can actually be reached
+ANALYSIS_ENABLED = os.getenv(
+    "ANALYSIS_ENABLED", "true" if os.getenv("OPENAI_API_KEY") else "false"
+).lower() in ("1", "true", "yes")
+# Re-score when the caller starts a new turn
+ANALYSIS_ON_CALLER_TURN = os.getenv("ANALYSIS_ON_CALLER_TURN", "true").lower() in ("1", "true", "yes")
+# Re-score immediately when a new segment mentions any of these
+ANALYSIS_KEYWORDS = [
+    keyword.strip().lower()
+    for keyword in os.getenv(
+        "ANALYSIS_KEYWORDS",
+        "knife,gun,weapon,shot,bleeding,blood,unconscious,not breathing,kill,fire,overdose,hit me"
+    ).split(",")
+    if keyword.strip()
+]
+# Never re-score a call more often than this...
+ANALYSIS_MIN_INTERVAL_SECONDS = float(os.getenv("ANALYSIS_MIN_INTERVAL_SECONDS", "3"))
+# ...and re-score pending segments at least this often, even without another trigger
+ANALYSIS_MAX_INTERVAL_SECONDS = float(os.getenv("ANALYSIS_MAX_INTERVAL_SECONDS", "20"))
+# After call-end, wait this long for segments still in the ingest queue before the final score
+ANALYSIS_END_GRACE_SECONDS = float(os.getenv("ANALYSIS_END_GRACE_SECONDS", "1"))
+# Drop the state of a call that sent no segments for this long, in case its call-end never arrives
+ANALYSIS_IDLE_SECONDS = float(os.getenv("ANALYSIS_IDLE_SECONDS", "1800"))
+# Stream model replies and push the score/concerns before the summary is finished
+ANALYSIS_STREAMING = os.getenv("ANALYSIS_STREAMING", "true").lower() in ("1", "true", "yes")
+# Calls scored at least this high keep the high-priority model lane for their re-scores
+ANALYSIS_HIGH_PRIORITY_SCORE = int(os.getenv("ANALYSIS_HIGH_PRIORITY_SCORE", "7"))
+
+_keyword_pattern = re.compile(
+    r"\b(" + "|".join(re.escape(keyword) for keyword in ANALYSIS_KEYWORDS) + r")\b", re.IGNORECASE
+) if ANALYSIS_KEYWORDS else None
+
+
+@dataclass
+class CallAnalysisState:
+    call_id: int
+    summary: str = ""
+    score: Optional[int] = None
+    concerns: List[str] = field(default_factory=list)
+    pending: List[dict] = field(default_factory=list)  # segments not yet seen by the model
+    last_speaker: Optional[str] = None
+    last_scored_at: float = 0.0
+    last_segment_at: float = 0.0
+    triggered: bool = False
+    urgent: bool = False  # first score or keyword hit pending: use the high-priority lane
+    running: bool = False
+    ended: bool = False
+    timer: Optional[asyncio.TimerHandle] = None
+    analyses: int = 0
+
+
+class IncrementalAnalysisEngine:
+    def __init__(self, enabled: bool = ANALYSIS_ENABLED):
+        self.enabled = enabled
+        self._states: Dict[int, CallAnalysisState] = {}
+        self._tasks = set()
+        self._last_sweep = time.monotonic()
+        self._stats = {"segments": 0, "analyses": 0, "failed": 0, "trigger_turn": 0,
+                       "trigger_keyword": 0, "trigger_timer": 0, "trigger_first": 0,
+                       "skipped_filler": 0, "partials": 0, "forgotten_idle": 0}
+
+    def on_segments(self, rows: List[dict]):
+        """Feed committed transcript rows; schedules re-scoring for calls whose triggers fired"""
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        for row in rows:
+            state = self._states.get(row["call_id"])
+            if state is None:
+                state = self._states[row["call_id"]] = CallAnalysisState(call_id=row["call_id"])
+            state.pending.append(row)
+            state.last_segment_at = now
+            self._stats["segments"] += 1
+            reason = self._trigger_reason(state, row)
+            state.last_speaker = row["speaker"]
+            if reason:
+                self._stats[f"trigger_{reason}"] += 1
+                state.triggered = True
+                state.urgent = state.urgent or reason in ("first", "keyword")
+        for call_id in {row["call_id"] for row in rows}:
+            self._schedule(self._states[call_id])
+        if now - self._last_sweep >= ANALYSIS_IDLE_SECONDS:
+            self._forget_idle(now)
+
+    def _forget_idle(self, now: float):
+        self._last_sweep = now
+        for state in [state for state in self._states.values()
+                      if not state.running and now - state.last_segment_at > ANALYSIS_IDLE_SECONDS]:
+            if state.timer is not None:
+                state.timer.cancel()
+            del self._states[state.call_id]
+            self._stats["forgotten_idle"] += 1
+
+    def _trigger_reason(self, state: CallAnalysisState, row: dict) -> Optional[str]:
+        if state.score is None and not state.running:
+            return "first"
+        if ANALYSIS_ON_CALLER_TURN and row["speaker"] == "CALLER" and state.last_speaker != "CALLER":
+            return "turn"
+        if _keyword_pattern is not None and _keyword_pattern.search(row["text"]):
+            return "keyword"
+        return None
+
+    def _schedule(self, state: CallAnalysisState):
+        if state.running or state.ended or not state.pending:
+            return
+        loop = asyncio.get_running_loop()
+        since_last = time.monotonic() - state.last_scored_at
+        if state.triggered:
+            delay = max(0.0, ANALYSIS_MIN_INTERVAL_SECONDS - since_last)
+        else:
+            # No trigger yet: make sure pending segments are scored within the max interval
+            delay = max(0.0, ANALYSIS_MAX_INTERVAL_SECONDS - since_last)
+        if state.timer is not None:
+            state.timer.cancel()
+        state.timer = loop.call_later(delay, self._start, state)
+
+    def _start(self, state: CallAnalysisState):
+        state.timer = None
+        if state.running or not state.pending:
+            return
+        if all(is_filler(segment["text"]) for segment in state.pending):
+            # Greetings and call-taker prompts can't change the score
+            state.pending = []
+            state.triggered = False
+            state.urgent = False
+            self._stats["skipped_filler"] += 1
+            return
+        if not state.triggered:
+            self._stats["trigger_timer"] += 1
+        state.running = True
+        self._spawn(self._analyze(state))
+
+    def _spawn(self, coro):
+        task = asyncio.get_running_loop().create_task(coro)
+        # Keep a reference so the analysis isn't garbage-collected mid-flight
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _analyze(self, state: CallAnalysisState):
+        segments, state.pending = state.pending, []
+        state.triggered = False
+        urgent = state.urgent or (state.score or 0) >= ANALYSIS_HIGH_PRIORITY_SCORE
+        state.urgent = False
+        succeeded = False
+        result = None
+        try:
+            new_text = "\n".join(f"{s['speaker']}: {s['text']}" for s in segments)
+            result = await ai_service.analyze_incremental(
+                state.summary, new_text, state.score, state.concerns,
+                priority=PRIORITY_HIGH if urgent else PRIORITY_RESCORE,
+                on_partial=self._partial_publisher(state) if ANALYSIS_STREAMING else None
+            )
+            if result is None:
+                # Keep the segments so the next attempt still sees them
+                state.pending = segments + state.pending
+                state.urgent = state.urgent or urgent
+                self._stats["failed"] += 1
+                return
+            state.summary = result["summary"]
+            state.score = result["score"]
+            state.concerns = result["concerns"]
+            state.analyses += 1
+            self._stats["analyses"] += 1
+            await self._persist(state)
+            live_updates.publish_score(state.call_id, state.score, state.concerns)
+            succeeded = True
+        except Exception as e:
+            print(f"Error analyzing call {state.call_id}: {e}")
+            if result is None:
+                # The model never answered, so its summary doesn't cover these segments yet
+                state.pending = segments + state.pending
+                state.urgent = state.urgent or urgent
+            self._stats["failed"] += 1
+        finally:
+            state.last_scored_at = time.monotonic()
+            state.running = False
+            if not state.ended:
+                self._schedule(state)
+            elif state.timer is None:
+                # Call ended while this analysis ran; score the remainder once
+                self._finish(state, retry=succeeded)
+
+    def _partial_publisher(self, state: CallAnalysisState):
+        previous = list(state.concerns)
+
+        def publish(score: int, concerns: List[str]):
+            # Concerns rarely go away mid-call, so keep showing earlier ones until the final result
+            merged = previous + [concern for concern in concerns if concern not in previous]
+            self._stats["partials"] += 1
+            live_updates.publish_score(state.call_id, score, merged, partial=True)
+        return publish
+
+    async def _persist(self, state: CallAnalysisState):
+        async with AsyncWriterSessionLocal() as db:
+            db.add(AIInsight(
+                call_id=state.call_id,
+                concern_tags=", ".join(state.concerns),
+                urgency_score=state.score
+            ))
+            await db.execute(update(Call).where(Call.id == state.call_id).values(current_score=state.score))
+            await db.commit()
+        call_board.update_score(state.call_id, state.score)
+
+    def end_call(self, call_id: int):
+        """Score the call's remaining segments once, after a short grace period, then drop its state"""
+        state = self._states.get(call_id)
+        if state is None:
+            return
+        state.ended = True
+        if state.timer is not None:
+            state.timer.cancel()
+        state.timer = asyncio.get_running_loop().call_later(ANALYSIS_END_GRACE_SECONDS, self._finish, state)
+
+    def _finish(self, state: CallAnalysisState, retry: bool = True):
+        state.timer = None
+        if state.running:
+            return  # _analyze calls back here when it completes
+        if state.pending and retry:
+            state.running = True
+            self._spawn(self._analyze(state))
+        elif self._states.get(state.call_id) is state:
+            del self._states[state.call_id]
+
+    def get_stats(self) -> dict:
+        stats = dict(self._stats)
+        stats["enabled"] = self.enabled
+        stats["active_calls"] = len(self._states)
+        return stats
+
+
+# Create a singleton instance
+analysis_engine = IncrementalAnalysisEngine()
@@ -0,0 +1,320 @@
+# Archival of old completed calls to compressed JSONL partitions, with a read path back out
+
+import asyncio
+import gzip
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional
+
+from fastapi import APIRouter
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import selectinload
+from db.models import AsyncSessionLocal, AsyncWriterSessionLocal, async_writer_engine
+from db.models import ArchivedCall, AIInsight, Call, Transcript, Unit
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+ARCHIVE_ENABLED = os.getenv("ARCHIVE_ENABLED", "false").lower() in ("1", "true", "yes")
+# Completed calls that started more than this many days ago are archived
+ARCHIVE_AFTER_DAYS = float(os.getenv("ARCHIVE_AFTER_DAYS", "30"))
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "./archive")
+# zstd needs the optional zstandard package; gzip is always available
+ARCHIVE_COMPRESSION = os.getenv("ARCHIVE_COMPRESSION", "gzip").lower()
+# Calls moved per transaction, so each delete holds the write lock only briefly
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "100"))
+ARCHIVE_INTERVAL_SECONDS = float(os.getenv("ARCHIVE_INTERVAL_SECONDS", "3600"))
+# Archived calls kept decoded in memory for repeat reads
+ARCHIVE_READ_CACHE_SIZE = int(os.getenv("ARCHIVE_READ_CACHE_SIZE", "256"))
+
+router = APIRouter()
+
+
+def _extension(compression: str) -> str:
+    if compression == "zstd" and zstandard is not None:
+        return ".jsonl.zst"
+    return ".jsonl.gz"
+
+
+def _open_write(path: str):
+    if path.endswith(".zst"):
+        return zstandard.ZstdCompressor(level=10).stream_writer(open(path, "wb"))
+    return gzip.open(path, "wb", compresslevel=6)
+
+
+def _open_read(path: str):
+    if path.endswith(".zst"):
+        if zstandard is None:
+            raise RuntimeError(f"Reading {path} needs the zstandard package")
+        return zstandard.ZstdDecompressor().stream_reader(open(path, "rb"))
+    return gzip.open(path, "rb")
+
+
+def _iso(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def call_document(call: Call) -> dict:
+    """One archived call: the call row with its transcripts, insights and units"""
+    return {
+        "id": call.id,
+        "user_id": call.user_id,
+        "external_call_id": call.external_call_id,
+        "timestamp": _iso(call.timestamp),
+        "current_score": call.current_score,
+        "status": call.status,
+        "transcripts": [
+            {"id": t.id, "call_id": t.call_id, "speaker": t.speaker, "timestamp": _iso(t.timestamp), "text": t.text}
+            for t in sorted(call.transcripts, key=lambda t: (t.timestamp or datetime.min, t.id))
+        ],
+        "ai_insights": [
+            {"id": i.id, "call_id": i.call_id, "concern_tags": i.concern_tags, "urgency_score": i.urgency_score}
+            for i in sorted(call.ai_insights, key=lambda i: i.id)
+        ],
+        "units": [
+            {"id": u.id, "call_id": u.call_id, "status": u.status, "eta": _iso(u.eta), "location": u.location}
+            for u in call.units
+        ],
+    }
+
+
+class CallArchiver:
+    """
+    Moves completed calls older than ARCHIVE_AFTER_DAYS out of the hot tables, batch by
+    batch: each batch is written as one compressed JSONL part per day under a temp name,
+    the calls are deleted through the writer engine in the transaction that records where
+    each went in archived_calls, and only after that commits is the part renamed into place.
+    A part whose transaction failed is removed, so the archive never holds a live call.
+    """
+
+    def __init__(self, archive_dir: str = ARCHIVE_DIR, compression: str = ARCHIVE_COMPRESSION,
+                 batch_size: int = ARCHIVE_BATCH_SIZE):
+        self.archive_dir = archive_dir
+        self.compression = compression
+        self.batch_size = batch_size
+        # Filled from worker threads, read on the loop
+        self._cache: "OrderedDict[int, dict]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._stats = {"runs": 0, "archived_calls": 0, "archived_transcripts": 0, "parts_written": 0,
+                       "failed_runs": 0, "archive_reads": 0, "last_run_seconds": 0.0}
+        if compression == "zstd" and zstandard is None:
+            print("Warning: ARCHIVE_COMPRESSION=zstd but zstandard is not installed; archiving with gzip")
+
+    def _write_part(self, day: str, documents: List[dict]) -> str:
+        """Write one partition file under its temp name; returns its final path relative to the archive directory"""
+        relative = os.path.join(f"day={day}", f"calls-{uuid.uuid4().hex[:12]}{_extension(self.compression)}")
+        path = os.path.join(self.archive_dir, relative)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with _open_write(f"{path}.tmp") as f:
+            for document in documents:
+                f.write(json.dumps(document, separators=(",", ":")).encode() + b"\n")
+        return relative
+
+    def _discard_parts(self, parts: List[str]):
+        for relative in parts:
+            try:
+                os.remove(os.path.join(self.archive_dir, f"{relative}.tmp"))
+            except FileNotFoundError:
+                pass
+
+    def _publish_parts(self, parts: List[str]):
+        for relative in parts:
+            path = os.path.join(self.archive_dir, relative)
+            os.replace(f"{path}.tmp", path)
+        self._stats["parts_written"] += len(parts)
+
+    async def archive_batch(self, cutoff: datetime) -> int:
+        """Archive up to batch_size calls; returns how many were moved"""
+        async with AsyncSessionLocal() as db:
+            # Never take the newest call: SQLite hands a deleted max id to the next insert,
+            # which would let a new call reuse an archived call's id
+            newest_id = (await db.execute(select(func.max(Call.id)))).scalar()
+            if newest_id is None:
+                return 0
+            calls = (await db.execute(
+                select(Call)
+                .where(Call.status == "completed", Call.timestamp < cutoff, Call.id < newest_id)
+                .order_by(Call.id)
+                .limit(self.batch_size)
+                .options(selectinload(Call.transcripts), selectinload(Call.ai_insights), selectinload(Call.units))
+            )).scalars().all()
+            if not calls:
+                return 0
+            by_day: Dict[str, List[dict]] = {}
+            for call in calls:
+                by_day.setdefault(call.timestamp.strftime("%Y-%m-%d"), []).append(call_document(call))
+            ids = [call.id for call in calls]
+            transcripts = sum(len(call.transcripts) for call in calls)
+
+        # Compression runs off the loop and before the write transaction, so the writer isn't held for it
+        parts = {}
+        try:
+            for day, documents in by_day.items():
+                parts[day] = await asyncio.to_thread(self._write_part, day, documents)
+            now = datetime.now()
+            async with AsyncWriterSessionLocal() as db:
+                db.add_all(ArchivedCall(call_id=document["id"], external_call_id=document["external_call_id"],
+                                        day=day, path=parts[day], archived_at=now)
+                           for day, documents in by_day.items() for document in documents)
+                await db.flush()
+                for model in (Transcript, AIInsight, Unit):
+                    await db.execute(delete(model).where(model.call_id.in_(ids)))
+                await db.execute(delete(Call).where(Call.id.in_(ids)))
+                await db.commit()
+        except BaseException:
+            # The calls are still live; a leftover part would be exported next to them
+            self._discard_parts(list(parts.values()))
+            raise
+        self._publish_parts(list(parts.values()))
+        self._stats["archived_calls"] += len(ids)
+        self._stats["archived_transcripts"] += transcripts
+        return len(ids)
+
+    async def _recover_parts(self):
+        """Finish parts left under their temp name by a crash: rename committed ones, drop the rest"""
+        if not os.path.isdir(self.archive_dir):
+            return
+        leftovers = [os.path.relpath(os.path.join(directory, name), self.archive_dir)[:-len(".tmp")]
+                     for directory, _, names in os.walk(self.archive_dir) for name in names if name.endswith(".tmp")]
+        if not leftovers:
+            return
+        async with AsyncSessionLocal() as db:
+            committed = set((await db.execute(
+                select(ArchivedCall.path).where(ArchivedCall.path.in_(leftovers)).distinct()
+            )).scalars())
+        self._publish_parts([relative for relative in leftovers if relative in committed])
+        self._discard_parts([relative for relative in leftovers if relative not in committed])
+
+    async def eligible(self, older_than_days: float = ARCHIVE_AFTER_DAYS) -> int:
+        """How many calls a run would archive now"""
+        cutoff = datetime.now() - timedelta(days=older_than_days)
+        async with AsyncSessionLocal() as db:
+            newest_id = (await db.execute(select(func.max(Call.id)))).scalar() or 0
+            return (await db.execute(
+                select(func.count(Call.id))
+                .where(Call.status == "completed", Call.timestamp < cutoff, Call.id < newest_id)
+            )).scalar()
+
+    async def run(self, older_than_days: float = ARCHIVE_AFTER_DAYS, max_batches: Optional[int] = None) -> int:
+        """Archive every eligible call, one bounded batch at a time; returns the number archived"""
+        started = time.monotonic()
+        cutoff = datetime.now() - timedelta(days=older_than_days)
+        archived = 0
+        batches = 0
+        try:
+            async with async_writer_engine.begin() as conn:
+                await conn.run_sync(ArchivedCall.__table__.create, checkfirst=True)
+            await self._recover_parts()
+            while max_batches is None or batches < max_batches:
+                moved = await self.archive_batch(cutoff)
+                if not moved:
+                    break
+                archived += moved
+                batches += 1
+        except Exception:
+            self._stats["failed_runs"] += 1
+            raise
+        finally:
+            self._stats["runs"] += 1
+            self._stats["last_run_seconds"] = time.monotonic() - started
+        if archived:
+            print(f"Archived {archived} completed calls older than {older_than_days:g} days to {self.archive_dir}")
+        return archived
+
+    def _read_document(self, relative: str, call_id: int) -> Optional[dict]:
+        with _open_read(os.path.join(self.archive_dir, relative)) as f:
+            # Parts hold at most one batch of calls, so a scan is cheap
+            for line in f:
+                document = json.loads(line)
+                if document["id"] == call_id:
+                    return document
+        return None
+
+    async def load_async(self, call_id: int) -> Optional[dict]:
+        """An archived call's document, or None if it was never archived"""
+        with self._cache_lock:
+            if call_id in self._cache:
+                self._cache.move_to_end(call_id)
+                return self._cache[call_id]
+        async with AsyncSessionLocal() as db:
+            entry = await db.get(ArchivedCall, call_id)
+            if entry is None:
+                return None
+            relative = entry.path
+        self._stats["archive_reads"] += 1
+        # Decompression and file reads stay off the event loop
+        document = await asyncio.to_thread(self._read_document, relative, call_id)
+        if document is not None:
+            with self._cache_lock:
+                self._cache[call_id] = document
+                while len(self._cache) > ARCHIVE_READ_CACHE_SIZE:
+                    self._cache.popitem(last=False)
+        return document
+
+    def iter_documents(self, since: Optional[datetime] = None, until: Optional[datetime] = None) -> Iterator[dict]:
+        """Every archived call that started in [since, until), day partition by day"""
+        if not os.path.isdir(self.archive_dir):
+            return
+        first_day = since.strftime("%Y-%m-%d") if since else None
+        last_day = until.strftime("%Y-%m-%d") if until else None
+        for partition in sorted(os.listdir(self.archive_dir)):
+            day = partition[len("day="):]
+            if not partition.startswith("day=") or (first_day and day < first_day) or (last_day and day > last_day):
+                continue
+            directory = os.path.join(self.archive_dir, partition)
+            for name in sorted(os.listdir(directory)):
+                if name.endswith(".tmp"):
+                    continue  # not committed (yet)
+                with _open_read(os.path.join(directory, name)) as f:
+                    for line in f:
+                        document = json.loads(line)
+                        started = datetime.fromisoformat(document["timestamp"])
+                        if (since is None or started >= since) and (until is None or started < until):
+                            yield document
+
+    async def start(self):
+        if ARCHIVE_ENABLED and (self._task is None or self._task.done()):
+            self._task = asyncio.get_running_loop().create_task(self._run_periodically())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run_periodically(self):
+        while True:
+            try:
+                await self.run()
+            except Exception as e:
+                print(f"Error archiving calls: {e}")
+            await asyncio.sleep(ARCHIVE_INTERVAL_SECONDS)
+
+    def get_stats(self) -> dict:
+        stats = dict(self._stats)
+        stats["enabled"] = ARCHIVE_ENABLED
+        stats["compression"] = "zstd" if _extension(self.compression).endswith(".zst") else "gzip"
+        with self._cache_lock:
+            stats["read_cache_size"] = len(self._cache)
+        return stats
+
+
+# Create a singleton instance
+call_archive = CallArchiver()
+
+
+@router.get("/metrics/archive")
+async def archive_metrics():
+    """Calls and transcripts moved to the archive, and reads served from it"""
+    return call_archive.get_stats()
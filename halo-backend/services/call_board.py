@@ -0,0 +1,113 @@
+# In-memory board of active calls, most urgent first, for the dispatcher's "what next" view
+
+import bisect
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+from db.models import AsyncSessionLocal, Call
+
+
+class ActiveCallBoard:
+    """
+    Active calls kept sorted by (score desc, start time asc): the most urgent call first,
+    and among equally urgent calls the one waiting longest. Unscored calls rank below
+    any score. Updates are a bisect insert/remove; reading the top k is a slice.
+    Safe to share between the loop and writer threads.
+    """
+
+    def __init__(self):
+        self._order: List[Tuple] = []
+        self._entries: Dict[int, dict] = {}
+        self._lock = threading.Lock()
+        self._stats = {"added": 0, "rescored": 0, "removed": 0, "rebuilt": 0}
+
+    @staticmethod
+    def _sort_key(entry: dict) -> Tuple:
+        score = entry["score"] if entry["score"] is not None else -1
+        started = entry["timestamp"].timestamp() if entry["timestamp"] else 0.0
+        return (-score, started, entry["call_id"])
+
+    def _insert(self, entry: dict):
+        self._entries[entry["call_id"]] = entry
+        bisect.insort(self._order, self._sort_key(entry))
+
+    def _discard(self, call_id: int) -> Optional[dict]:
+        entry = self._entries.pop(call_id, None)
+        if entry is not None:
+            key = self._sort_key(entry)
+            index = bisect.bisect_left(self._order, key)
+            if index < len(self._order) and self._order[index] == key:
+                del self._order[index]
+        return entry
+
+    def add(self, call_id: int, external_call_id: Optional[str], timestamp: Optional[datetime],
+            score: Optional[int] = None):
+        with self._lock:
+            self._discard(call_id)
+            self._insert({"call_id": call_id, "external_call_id": external_call_id,
+                          "timestamp": timestamp, "score": score})
+            self._stats["added"] += 1
+
+    def update_score(self, call_id: int, score: int):
+        """Re-rank a call after a new score is committed; calls not on the board are ignored"""
+        with self._lock:
+            entry = self._discard(call_id)
+            if entry is None:
+                return
+            entry["score"] = score
+            self._insert(entry)
+            self._stats["rescored"] += 1
+
+    def remove(self, call_id: int):
+        with self._lock:
+            if self._discard(call_id) is not None:
+                self._stats["removed"] += 1
+
+    def top(self, k: int) -> List[dict]:
+        """The k most urgent active calls, in order"""
+        with self._lock:
+            entries = [dict(self._entries[key[2]]) for key in self._order[:k]]
+        now = time.time()
+        for rank, entry in enumerate(entries, 1):
+            entry["rank"] = rank
+            entry["age_seconds"] = now - entry["timestamp"].timestamp() if entry["timestamp"] else None
+        return entries
+
+    async def rebuild(self):
+        """Reload every active call from the database, e.g. at startup"""
+        try:
+            async with AsyncSessionLocal() as db:
+                result = await db.execute(
+                    select(Call.id, Call.external_call_id, Call.timestamp, Call.current_score)
+                    .where(Call.status == "active")
+                )
+                rows = result.all()
+        except Exception as e:
+            # e.g. the tables don't exist yet; the board fills as calls arrive
+            print(f"Error loading active calls: {e}")
+            return
+        with self._lock:
+            self._order = []
+            self._entries = {}
+            for call_id, external_call_id, timestamp, score in rows:
+                self._entries[call_id] = {"call_id": call_id, "external_call_id": external_call_id,
+                                          "timestamp": timestamp, "score": score}
+            self._order = sorted(self._sort_key(entry) for entry in self._entries.values())
+            self._stats["rebuilt"] += 1
+        print(f"Active call board loaded with {len(rows)} active calls")
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["active_calls"] = len(self._entries)
+        return stats
+
+
+# Create a singleton instance
+call_board = ActiveCallBoard()
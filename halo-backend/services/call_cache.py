@@ -0,0 +1,117 @@
+# In-memory cache of VAPI call IDs -> Call.id for the webhook hot path
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from db.models import Call, User
+from services.call_board import call_board
+
+CALL_CACHE_MAX_SIZE = int(os.getenv("CALL_CACHE_MAX_SIZE", "10000"))
+CALL_CACHE_TTL_SECONDS = float(os.getenv("CALL_CACHE_TTL_SECONDS", "3600"))
+
+
+class CallIdCache:
+    """Bounded LRU map with a per-entry TTL; safe to share between the loop and writer threads"""
+
+    def __init__(self, max_size: int = CALL_CACHE_MAX_SIZE, ttl_seconds: float = CALL_CACHE_TTL_SECONDS):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # external_call_id -> (call_id, expires_at)
+        self._lock = threading.Lock()
+        self.default_user_id: Optional[int] = None
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expired": 0}
+
+    def get(self, external_call_id: str) -> Optional[int]:
+        with self._lock:
+            entry = self._entries.get(external_call_id)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            call_id, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[external_call_id]
+                self._stats["expired"] += 1
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(external_call_id)
+            self._stats["hits"] += 1
+            return call_id
+
+    def put(self, external_call_id: str, call_id: int):
+        with self._lock:
+            self._entries[external_call_id] = (call_id, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(external_call_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def evict(self, external_call_id: str):
+        with self._lock:
+            self._entries.pop(external_call_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.default_user_id = None
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+# Create a singleton instance
+call_id_cache = CallIdCache()
+
+
+def _default_user_id(db: Session) -> int:
+    # For now, attach new calls to a generic user - in production you'd want to identify the caller
+    if call_id_cache.default_user_id is not None:
+        return call_id_cache.default_user_id
+    # No lock here: under AsyncSession.run_sync this runs on the event loop thread, and a
+    # blocking lock held across the commit deadlocks the loop. Racing first calls may each
+    # add a placeholder user; all of them then settle on the lowest id.
+    user = db.query(User).order_by(User.id).first()
+    if not user:
+        db.add(User(name="Unknown Caller", address="Unknown"))
+        db.commit()
+        user = db.query(User).order_by(User.id).first()
+    call_id_cache.default_user_id = user.id
+    return call_id_cache.default_user_id
+
+
+def resolve_call_id(db: Session, external_call_id: str, timestamp: Optional[datetime] = None) -> int:
+    """Return the Call.id for a VAPI call ID, creating the Call the first time it is seen"""
+    call_id = call_id_cache.get(external_call_id)
+    if call_id is not None:
+        return call_id
+
+    db_call = db.query(Call).filter(Call.external_call_id == external_call_id).first()
+    if db_call is None:
+        db_call = Call(
+            user_id=_default_user_id(db),
+            external_call_id=external_call_id,
+            timestamp=timestamp or datetime.now(),
+            status="active"
+        )
+        db.add(db_call)
+        try:
+            db.commit()
+            call_board.add(db_call.id, external_call_id, db_call.timestamp)
+        except IntegrityError:
+            # Another request created the same call first; the unique index on
+            # external_call_id rejected ours, so use the row that won
+            db.rollback()
+            db_call = db.query(Call).filter(Call.external_call_id == external_call_id).one()
+
+    call_id_cache.put(external_call_id, db_call.id)
+    return db_call.id
@@ -0,0 +1,79 @@
+# Bulk export of calls with their transcripts, insights and units as NDJSON, streamed from server-side cursors
+
+import json
+import os
+from datetime import datetime
+from typing import AsyncIterator, Iterator, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+from starlette.concurrency import iterate_in_threadpool
+from db.models import AsyncSessionLocal, Call
+from services.call_archive import call_archive, call_document
+
+# Calls fetched per round trip; their transcripts, insights and units are loaded per batch too
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "500"))
+
+
+def export_query(status: Optional[str] = None, since: Optional[datetime] = None,
+                 until: Optional[datetime] = None, batch_size: int = EXPORT_BATCH_SIZE):
+    """
+    Calls in id order with their children eager-loaded, read through a server-side cursor:
+    yield_per fetches batch_size calls at a time and runs one IN query per relationship per
+    batch, so memory depends on the batch size rather than the size of the export.
+    """
+    query = (
+        select(Call)
+        .options(selectinload(Call.transcripts), selectinload(Call.ai_insights), selectinload(Call.units))
+        .order_by(Call.id)
+        .execution_options(yield_per=batch_size)
+    )
+    if status is not None:
+        query = query.where(Call.status == status)
+    if since is not None:
+        query = query.where(Call.timestamp >= since)
+    if until is not None:
+        query = query.where(Call.timestamp < until)
+    return query
+
+
+def ndjson_line(document: dict) -> str:
+    return json.dumps(document, separators=(",", ":")) + "\n"
+
+
+def export_lines(db, status: Optional[str] = None, since: Optional[datetime] = None,
+                 until: Optional[datetime] = None, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[str]:
+    """NDJSON lines from a sync session (the CLI)"""
+    for call in db.execute(export_query(status, since, until, batch_size)).scalars():
+        yield ndjson_line(call_document(call))
+        # Drop the exported call so the session doesn't keep the whole export alive
+        db.expunge(call)
+
+
+def archived_lines(status: Optional[str] = None, since: Optional[datetime] = None,
+                   until: Optional[datetime] = None) -> Iterator[str]:
+    # Only completed calls are archived
+    if status is not None and status != "completed":
+        return
+    for document in call_archive.iter_documents(since, until):
+        yield ndjson_line(document)
+
+
+async def stream_export(status: Optional[str] = None, since: Optional[datetime] = None,
+                        until: Optional[datetime] = None, include_archived: bool = False,
+                        batch_size: int = EXPORT_BATCH_SIZE) -> AsyncIterator[str]:
+    """
+    NDJSON for every matching call, one chunk per batch of calls. Archived calls come
+    first when included (they are the oldest), then the calls still in the database.
+    """
+    if include_archived:
+        # Archive parts are read and decompressed off the event loop
+        async for line in iterate_in_threadpool(archived_lines(status, since, until)):
+            yield line
+
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(export_query(status, since, until, batch_size))
+        async for partition in result.scalars().partitions():
+            yield "".join(ndjson_line(call_document(call)) for call in partition)
+            for call in partition:
+                db.expunge(call)
@@ -0,0 +1,183 @@
+# Content-addressed cache for model responses: memory LRU, optional SQLite disk tier,
+# and coalescing of identical in-flight requests
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+LLM_CACHE_MAX_SIZE = int(os.getenv("LLM_CACHE_MAX_SIZE", "2048"))
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", "86400"))
+# SQLite file for the disk tier; unset keeps the cache in memory only
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "")
+
+_whitespace = re.compile(r"\s+")
+
+
+def normalize_transcript(transcript: str) -> str:
+    """Collapse whitespace so formatting-only differences share a cache entry"""
+    return _whitespace.sub(" ", transcript).strip()
+
+
+def cache_key(model: str, prompt_version: str, transcript: str) -> str:
+    payload = json.dumps([model, prompt_version, normalize_transcript(transcript)])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class DiskCache:
+    """SQLite-backed tier so cached responses survive restarts; values are stored as JSON"""
+
+    def __init__(self, path: str):
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._connection.commit()
+
+    def get(self, key: str):
+        """Returns (found, value, expires_at); expired rows are deleted on read"""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return False, None, None
+            if row[1] < time.time():
+                self._connection.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._connection.commit()
+                return False, None, None
+        return True, json.loads(row[0]), row[1]
+
+    def put(self, key: str, value, ttl_seconds: float):
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), time.time() + ttl_seconds),
+            )
+            self._connection.commit()
+
+    def clear(self):
+        with self._lock:
+            self._connection.execute("DELETE FROM llm_cache")
+            self._connection.commit()
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+class LLMResponseCache:
+    """
+    Memory LRU in front of an optional disk tier. Concurrent misses for the same key
+    share one upstream call; failures are never cached.
+    """
+
+    def __init__(self, max_size: int = LLM_CACHE_MAX_SIZE, ttl_seconds: float = LLM_CACHE_TTL_SECONDS,
+                 path: str = LLM_CACHE_PATH, enabled: bool = LLM_CACHE_ENABLED):
+        self.enabled = enabled
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # key -> (value, expires_at)
+        self._disk = DiskCache(path) if enabled and path else None
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "coalesced": 0,
+                       "stores": 0, "evictions": 0, "expired": 0, "errors": 0}
+
+    def _get_memory(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        value, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self._stats["expired"] += 1
+            return False, None
+        self._entries.move_to_end(key)
+        return True, value
+
+    def _put_memory(self, key: str, value, ttl_seconds: float):
+        self._entries[key] = (value, time.monotonic() + ttl_seconds)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the cached value for key, or await compute() once and cache its result"""
+        if not self.enabled:
+            return await compute()
+
+        found, value = self._get_memory(key)
+        if found:
+            self._stats["memory_hits"] += 1
+            return value
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self._stats["coalesced"] += 1
+        else:
+            # The lookup runs in its own task, owned by no caller, so cancelling the
+            # caller that started it doesn't cancel it for everyone else
+            task = asyncio.create_task(self._fill(key, compute))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finished(key, done))
+        return await asyncio.shield(task)
+
+    async def _fill(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        if self._disk is not None:
+            found, value, expires_at = await asyncio.to_thread(self._disk.get, key)
+            if found:
+                self._stats["disk_hits"] += 1
+                # The memory copy expires with the row, not a full TTL after this read
+                self._put_memory(key, value, expires_at - time.time())
+                return value
+
+        self._stats["misses"] += 1
+        try:
+            value = await compute()
+        except Exception:
+            self._stats["errors"] += 1
+            raise
+        self._put_memory(key, value, self.ttl_seconds)
+        if self._disk is not None:
+            await asyncio.to_thread(self._disk.put, key, value, self.ttl_seconds)
+        self._stats["stores"] += 1
+        return value
+
+    def _finished(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # Mark retrieved so a failure whose callers were all cancelled isn't logged
+            task.exception()
+
+    def clear(self):
+        self._entries.clear()
+        if self._disk is not None:
+            self._disk.clear()
+
+    def get_stats(self) -> dict:
+        stats = dict(self._stats)
+        stats["enabled"] = self.enabled
+        stats["size"] = len(self._entries)
+        stats["disk"] = self._disk is not None
+        stats["inflight"] = len(self._inflight)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"] + stats["coalesced"]
+        hits = lookups - stats["misses"]
+        stats["hit_rate"] = hits / lookups if lookups else 0.0
+        return stats
+
+
+# Create a singleton instance
+llm_cache = LLMResponseCache()
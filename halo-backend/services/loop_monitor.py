@@ -0,0 +1,201 @@
+# Opt-in event-loop instrumentation: loop lag, stalls with the route and stack that caused them, per-route timings
+
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Dict, Optional
+
+from fastapi import APIRouter
+from services.percentiles import percentile
+
+LOOP_MONITOR_ENABLED = os.getenv("LOOP_MONITOR_ENABLED", "false").lower() in ("1", "true", "yes")
+# How often the loop is probed
+LOOP_MONITOR_INTERVAL_MS = float(os.getenv("LOOP_MONITOR_INTERVAL_MS", "50"))
+# A probe this late counts as a stall; its stack is captured while the loop is still blocked
+LOOP_SLOW_CALLBACK_MS = float(os.getenv("LOOP_SLOW_CALLBACK_MS", "100"))
+# Most recent stalls kept with their stacks
+LOOP_MONITOR_MAX_STALLS = int(os.getenv("LOOP_MONITOR_MAX_STALLS", "50"))
+LOOP_MONITOR_STACK_DEPTH = int(os.getenv("LOOP_MONITOR_STACK_DEPTH", "12"))
+
+router = APIRouter()
+
+
+class RouteTimingMiddleware:
+    """ASGI middleware timing each request by route; its frame also tells the watchdog which route is running"""
+
+    def __init__(self, app, monitor: "LoopMonitor" = None):
+        self.app = app
+        self.monitor = monitor or loop_monitor
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            self.monitor.record_request(route_label(scope), time.perf_counter() - started, status["code"])
+
+
+def route_label(scope) -> str:
+    # The router fills in scope["route"] once the path has matched, so templated paths group together.
+    # Requests no route matched (404s, scanners) share one label so their paths can't grow the table.
+    route = scope.get("route")
+    path = getattr(route, "path", None) or "unmatched"
+    return f"{scope.get('method', scope['type'].upper())} {path}"
+
+
+class LoopMonitor:
+    """
+    A task on the loop records how late each short sleep wakes up (loop lag). A watchdog
+    thread notices when that task is overdue, and while the loop is still blocked grabs
+    the loop thread's stack and the route of the request running on it.
+    """
+
+    def __init__(self, enabled: bool = LOOP_MONITOR_ENABLED, interval_ms: float = LOOP_MONITOR_INTERVAL_MS,
+                 slow_ms: float = LOOP_SLOW_CALLBACK_MS):
+        self.enabled = enabled
+        self.interval = interval_ms / 1000
+        self.slow = slow_ms / 1000
+        self._lags = deque(maxlen=2000)
+        self._max_lag = 0.0
+        self._stalls = deque(maxlen=LOOP_MONITOR_MAX_STALLS)
+        self._stall_count = 0
+        self._open_stall: Optional[dict] = None
+        self._routes: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._due: Optional[float] = None
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stop = threading.Event()
+        self._watchdog: Optional[threading.Thread] = None
+
+    def start(self):
+        if not self.enabled or self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._stop.clear()
+        self._task = asyncio.get_running_loop().create_task(self._probe())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+        print(f"Loop monitor on: probing every {self.interval * 1000:.0f} ms, "
+              f"stalls over {self.slow * 1000:.0f} ms are captured")
+
+    async def stop(self):
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._due = None
+
+    async def _probe(self):
+        while True:
+            self._due = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.monotonic() - self._due)
+            self._lags.append(lag)
+            self._max_lag = max(self._max_lag, lag)
+            with self._lock:
+                stall, self._open_stall = self._open_stall, None
+            if stall is not None:
+                # The watchdog saw the start; the probe knows how long it lasted
+                stall["duration_ms"] = lag * 1000
+                self._stalls.append(stall)
+                route = self._routes.get(stall["route"]) if stall["route"] else None
+                if route is not None:
+                    route["stalls"] += 1
+                    route["blocked_ms"] += stall["duration_ms"]
+
+    def _watch(self):
+        while not self._stop.wait(self.slow / 4):
+            due = self._due
+            if due is None or self._open_stall is not None:
+                continue
+            overdue = time.monotonic() - due
+            if overdue < self.slow:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            stall = {
+                "at": time.time() - overdue,
+                "route": self._running_route(frame),
+                "stack": traceback.format_stack(frame)[-LOOP_MONITOR_STACK_DEPTH:],
+            }
+            with self._lock:
+                self._open_stall = stall
+                self._stall_count += 1
+
+    @staticmethod
+    def _running_route(frame) -> Optional[str]:
+        """Route of the request whose code is on the loop thread's stack, if any"""
+        while frame is not None:
+            if frame.f_code is RouteTimingMiddleware.__call__.__code__:
+                return route_label(frame.f_locals["scope"])
+            frame = frame.f_back
+        return None  # a background task or callback, not a request
+
+    def record_request(self, route: str, elapsed: float, status_code: int):
+        stats = self._routes.get(route)
+        if stats is None:
+            stats = self._routes[route] = {"count": 0, "errors": 0, "stalls": 0, "blocked_ms": 0.0,
+                                           "latencies": deque(maxlen=1000)}
+        stats["count"] += 1
+        if status_code >= 500:
+            stats["errors"] += 1
+        stats["latencies"].append(elapsed)
+
+    def get_stats(self) -> dict:
+        if not self.enabled:
+            return {"enabled": False}
+        routes = {}
+        for route, stats in sorted(self._routes.items(), key=lambda item: -item[1]["blocked_ms"]):
+            latencies = stats["latencies"]
+            routes[route] = {
+                "count": stats["count"],
+                "errors": stats["errors"],
+                "p50_ms": percentile(latencies, 50) * 1000,
+                "p95_ms": percentile(latencies, 95) * 1000,
+                "max_ms": max(latencies, default=0.0) * 1000,
+                "stalls": stats["stalls"],
+                "blocked_ms": stats["blocked_ms"],
+            }
+        return {
+            "enabled": True,
+            "lag_ms": {
+                "p50": percentile(self._lags, 50) * 1000,
+                "p99": percentile(self._lags, 99) * 1000,
+                "max": self._max_lag * 1000,
+            },
+            "stalls": self._stall_count,
+            "slow_threshold_ms": self.slow * 1000,
+            "routes": routes,
+            # Newest first
+            "recent_stalls": list(reversed(self._stalls)),
+        }
+
+
+# Create a singleton instance
+loop_monitor = LoopMonitor()
+
+
+@router.get("/metrics/loop")
+async def loop_metrics():
+    """Event-loop lag, stalls with the route and stack that blocked the loop, and per-route timings"""
+    return loop_monitor.get_stats()
@@ -0,0 +1,101 @@
+# Micro-batching: gather concurrent jobs for a few milliseconds and run them as one request
+
+import asyncio
+import os
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+from services.priority_limiter import PRIORITY_NORMAL
+
+AI_BATCH_ENABLED = os.getenv("AI_BATCH_ENABLED", "false").lower() in ("1", "true", "yes")
+# Most transcripts scored in one model request
+AI_BATCH_MAX_SIZE = int(os.getenv("AI_BATCH_MAX_SIZE", "8"))
+# Longest a job waits for others to join its batch
+AI_BATCH_MAX_WAIT_MS = float(os.getenv("AI_BATCH_MAX_WAIT_MS", "20"))
+
+
+class MicroBatcher:
+    """
+    Collects submitted inputs until max_size are pending or the oldest has waited max_wait_ms,
+    then calls run_batch(inputs, priority) once. run_batch returns one result per input,
+    in order; an Exception in a result position fails only that input's caller.
+    Identical inputs pending at the same time share one slot in the batch.
+    """
+
+    def __init__(self, run_batch: Callable[[List[Any], int], Awaitable[List[Any]]],
+                 max_size: int = AI_BATCH_MAX_SIZE, max_wait_ms: float = AI_BATCH_MAX_WAIT_MS):
+        self.run_batch = run_batch
+        self.max_size = max_size
+        self.max_wait = max_wait_ms / 1000
+        self._pending: Dict[Any, Tuple[asyncio.Future, int]] = {}  # input -> (future, priority)
+        self._timer = None
+        self._tasks = set()
+        self._stats = {"jobs": 0, "deduplicated": 0, "batches": 0, "batched_inputs": 0,
+                       "full_flushes": 0, "timer_flushes": 0, "failed_batches": 0}
+
+    async def submit(self, item, priority: int = PRIORITY_NORMAL):
+        self._stats["jobs"] += 1
+        pending = self._pending.get(item)
+        if pending is not None:
+            future, batch_priority = pending
+            self._stats["deduplicated"] += 1
+            self._pending[item] = (future, min(batch_priority, priority))
+        else:
+            future = asyncio.get_running_loop().create_future()
+            self._pending[item] = (future, priority)
+            if len(self._pending) >= self.max_size:
+                self._stats["full_flushes"] += 1
+                self._flush()
+            elif self._timer is None:
+                self._timer = asyncio.get_running_loop().call_later(self.max_wait, self._on_timer)
+        # shield: one caller giving up must not cancel the batch for the others
+        return await asyncio.shield(future)
+
+    def _on_timer(self):
+        self._timer = None
+        if self._pending:
+            self._stats["timer_flushes"] += 1
+            self._flush()
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, {}
+        task = asyncio.get_running_loop().create_task(self._run(batch))
+        # Keep a reference so the batch isn't garbage-collected mid-flight
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: Dict[Any, Tuple[asyncio.Future, int]]):
+        items = list(batch)
+        # The batch rides in the lane of its most urgent job
+        priority = min(priority for _, priority in batch.values())
+        self._stats["batches"] += 1
+        self._stats["batched_inputs"] += len(items)
+        try:
+            results = await self.run_batch(items, priority)
+        except Exception as e:
+            self._stats["failed_batches"] += 1
+            results = [e] * len(items)
+        for item, result in zip(items, results):
+            future = batch[item][0]
+            if future.done():
+                continue
+            if isinstance(result, asyncio.CancelledError):
+                future.cancel()
+            elif isinstance(result, BaseException):
+                future.set_exception(result)
+                # Mark retrieved so an exception nobody awaited isn't logged
+                future.exception()
+            else:
+                future.set_result(result)
+
+    def get_stats(self) -> dict:
+        stats = dict(self._stats)
+        stats["max_size"] = self.max_size
+        stats["max_wait_ms"] = self.max_wait * 1000
+        stats["pending"] = len(self._pending)
+        stats["mean_batch_size"] = (
+            stats["batched_inputs"] / stats["batches"] if stats["batches"] else 0.0
+        )
+        return stats
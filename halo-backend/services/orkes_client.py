@@ -0,0 +1,239 @@
+# Starts the Orkes analysis workflows for live calls over one pooled HTTP client
+
+import asyncio
+import os
+import time
+from typing import Dict, List, Optional
+
+import httpx
+from orkes.token_manager import token_manager
+from services.workflow_results import WorkflowResultTracker
+
+# Runs by default only when Orkes credentials are configured
+ORKES_WORKFLOWS_ENABLED = os.getenv(
+    "ORKES_WORKFLOWS_ENABLED", "true" if os.getenv("ORKES_KEY_ID") and os.getenv("ORKES_KEY_SECRET") else "false"
+).lower() in ("1", "true", "yes")
+# Workflows started together for each call
+ORKES_CALL_WORKFLOWS = [
+    name.strip()
+    for name in os.getenv("ORKES_CALL_WORKFLOWS", "urgency_score_agent,key_concerns_agent").split(",")
+    if name.strip()
+]
+# Where the workflows' HTTP tasks reach this backend
+BACKEND_PUBLIC_URL = os.getenv("BACKEND_PUBLIC_URL", "http://localhost:8000")
+# Start a call's workflows at most this often; later segments are picked up by a trailing run
+ORKES_MIN_INTERVAL_SECONDS = float(os.getenv("ORKES_MIN_INTERVAL_SECONDS", "10"))
+ORKES_TIMEOUT_SECONDS = float(os.getenv("ORKES_TIMEOUT_SECONDS", "10"))
+ORKES_MAX_CONNECTIONS = int(os.getenv("ORKES_MAX_CONNECTIONS", "20"))
+# Characters of running transcript kept per call for the workflow input
+ORKES_MAX_TRANSCRIPT_CHARS = int(os.getenv("ORKES_MAX_TRANSCRIPT_CHARS", "8000"))
+# Forget a call that sent no segments for this long, in case its call-end never arrives
+ORKES_CALL_IDLE_SECONDS = float(os.getenv("ORKES_CALL_IDLE_SECONDS", "1800"))
+
+
+class OrkesClient:
+    """Starts workflows concurrently over a keep-alive pool, reusing the shared JWT"""
+
+    def __init__(self, server_url: Optional[str] = None, transport=None):
+        self._server_url = server_url
+        self._transport = transport  # tests pass an ASGI transport to a fake server
+        self._client: Optional[httpx.AsyncClient] = None
+        self._stats = {"started": 0, "failed": 0, "reauthenticated": 0, "bulk_polls": 0}
+
+    @property
+    def server_url(self) -> str:
+        return self._server_url or token_manager.server_url
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                transport=self._transport,
+                limits=httpx.Limits(max_connections=ORKES_MAX_CONNECTIONS,
+                                    max_keepalive_connections=ORKES_MAX_CONNECTIONS),
+                timeout=httpx.Timeout(ORKES_TIMEOUT_SECONDS),
+            )
+        return self._client
+
+    async def close(self):
+        if self._client is not None:
+            client, self._client = self._client, None
+            await client.aclose()
+
+    async def _request(self, method: str, path: str, **kwargs) -> Optional[httpx.Response]:
+        """Authenticated request; re-authenticates once on 401. None if no token or the request failed"""
+        for attempt in range(2):
+            jwt_token = await token_manager.get_token_async(self.client)
+            if not jwt_token:
+                return None
+            try:
+                response = await self.client.request(
+                    method, f"{self.server_url}{path}",
+                    headers={"X-Authorization": jwt_token, "Accept": "application/json"},
+                    **kwargs,
+                )
+            except httpx.HTTPError as e:
+                print(f"Error calling Orkes {method} {path}: {e}")
+                return None
+            if response.status_code == 401 and attempt == 0:
+                # Token revoked or expired early: fetch a new one and retry once
+                self._stats["reauthenticated"] += 1
+                token_manager.invalidate()
+                continue
+            return response
+        return None
+
+    async def start_workflow(self, name: str, workflow_input: dict) -> Optional[str]:
+        """Start one workflow and return its ID, or None if Orkes refused it"""
+        payload = {"name": name, "version": 1, "input": workflow_input}
+        response = await self._request("POST", "/api/workflow", json=payload)
+        if response is None or response.status_code != 200:
+            if response is not None:
+                print(f"Error starting Orkes workflow {name}: {response.status_code} {response.text}")
+            self._stats["failed"] += 1
+            return None
+        self._stats["started"] += 1
+        # Orkes answers with the bare workflow ID as text, or JSON with workflowId
+        if response.headers.get("Content-Type", "").startswith("application/json"):
+            body = response.json()
+            return body.get("workflowId") if isinstance(body, dict) else str(body)
+        return response.text.strip()
+
+    async def get_workflow(self, workflow_id: str) -> Optional[dict]:
+        """Workflow status and output, without the task list"""
+        response = await self._request("GET", f"/api/workflow/{workflow_id}", params={"includeTasks": "false"})
+        if response is None or response.status_code != 200:
+            return None
+        return response.json()
+
+    async def get_statuses(self, workflow_ids: List[str]) -> Dict[str, str]:
+        """Statuses of many workflows from one search request; falls back to one GET each"""
+        query = "workflowId IN ({})".format(",".join(workflow_ids))
+        response = await self._request("GET", "/api/workflow/search",
+                                       params={"query": query, "size": len(workflow_ids)})
+        if response is not None and response.status_code == 200:
+            self._stats["bulk_polls"] += 1
+            return {summary["workflowId"]: summary.get("status")
+                    for summary in response.json().get("results", [])}
+        workflows = await asyncio.gather(*(self.get_workflow(workflow_id) for workflow_id in workflow_ids))
+        return {workflow_id: workflow.get("status")
+                for workflow_id, workflow in zip(workflow_ids, workflows) if workflow}
+
+    async def start_workflows(self, names: List[str], workflow_input: dict) -> Dict[str, Optional[str]]:
+        """Start several workflows at once; maps workflow name to ID (None if it failed)"""
+        ids = await asyncio.gather(*(self.start_workflow(name, workflow_input) for name in names))
+        return dict(zip(names, ids))
+
+    def get_stats(self) -> dict:
+        return dict(self._stats)
+
+
+class CallWorkflowTrigger:
+    """
+    Keeps a running transcript per live call and starts its workflows in the background,
+    at most once per ORKES_MIN_INTERVAL_SECONDS, so the webhook never waits on Orkes.
+    """
+
+    def __init__(self, client: OrkesClient, results: Optional[WorkflowResultTracker] = None,
+                 enabled: bool = ORKES_WORKFLOWS_ENABLED, workflows: List[str] = ORKES_CALL_WORKFLOWS):
+        self.client = client
+        self.results = results
+        self.enabled = enabled
+        self.workflows = workflows
+        self._transcripts: Dict[str, str] = {}
+        self._last_started: Dict[str, float] = {}
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        self._workflow_ids: Dict[str, List[dict]] = {}
+        self._last_seen: Dict[str, float] = {}
+        self._last_sweep = time.monotonic()
+        self._forgotten = 0
+        self._tasks = set()
+
+    def on_segment(self, external_call_id: str, speaker: str, text: str):
+        if not self.enabled or not external_call_id:
+            return
+        transcript = f"{self._transcripts.get(external_call_id, '')}{speaker}: {text}\n"
+        self._transcripts[external_call_id] = transcript[-ORKES_MAX_TRANSCRIPT_CHARS:]
+        now = time.monotonic()
+        self._last_seen[external_call_id] = now
+        if now - self._last_sweep >= ORKES_CALL_IDLE_SECONDS:
+            self._forget_idle(now)
+        if external_call_id in self._timers:
+            return  # a trailing run is already scheduled and will see this segment
+        last_started = self._last_started.get(external_call_id)
+        wait = 0.0 if last_started is None else last_started + ORKES_MIN_INTERVAL_SECONDS - time.monotonic()
+        if wait <= 0:
+            self._start(external_call_id)
+        else:
+            self._timers[external_call_id] = asyncio.get_running_loop().call_later(
+                wait, self._start, external_call_id
+            )
+
+    def _start(self, external_call_id: str):
+        self._timers.pop(external_call_id, None)
+        transcript = self._transcripts.get(external_call_id)
+        if not transcript:
+            return
+        self._last_started[external_call_id] = time.monotonic()
+        task = asyncio.get_running_loop().create_task(self._run(external_call_id, transcript))
+        # Keep a reference so the request isn't garbage-collected mid-flight
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, external_call_id: str, transcript: str) -> Dict[str, Optional[str]]:
+        ids = await self.client.start_workflows(self.workflows, {
+            "call_id": external_call_id,
+            "transcript": transcript,
+            "backend_url": BACKEND_PUBLIC_URL,
+        })
+        started = [{"name": name, "workflow_id": workflow_id, "started_at": time.time()}
+                   for name, workflow_id in ids.items() if workflow_id]
+        if self.results is not None:
+            for workflow in started:
+                self.results.register(workflow["workflow_id"], workflow["name"], external_call_id)
+        if external_call_id in self._transcripts:
+            self._workflow_ids.setdefault(external_call_id, []).extend(started)
+        print(f"Started Orkes workflows for {external_call_id}: {ids}")
+        return ids
+
+    def end_call(self, external_call_id: str):
+        """Run once more for the final transcript, then forget the call"""
+        timer = self._timers.pop(external_call_id, None)
+        if timer is not None:
+            timer.cancel()
+            self._start(external_call_id)
+        self._forget(external_call_id)
+
+    def _forget(self, external_call_id: str):
+        timer = self._timers.pop(external_call_id, None)
+        if timer is not None:
+            timer.cancel()
+        self._transcripts.pop(external_call_id, None)
+        self._last_started.pop(external_call_id, None)
+        self._workflow_ids.pop(external_call_id, None)
+        self._last_seen.pop(external_call_id, None)
+
+    def _forget_idle(self, now: float):
+        self._last_sweep = now
+        for external_call_id in [external_call_id for external_call_id, seen in self._last_seen.items()
+                                 if now - seen > ORKES_CALL_IDLE_SECONDS]:
+            self._forget(external_call_id)
+            self._forgotten += 1
+
+    def workflows_for(self, external_call_id: str) -> List[dict]:
+        return list(self._workflow_ids.get(external_call_id, []))
+
+    def get_stats(self) -> dict:
+        stats = self.client.get_stats()
+        stats["enabled"] = self.enabled
+        stats["active_calls"] = len(self._transcripts)
+        stats["scheduled"] = len(self._timers)
+        stats["in_flight"] = len(self._tasks)
+        stats["forgotten_idle"] = self._forgotten
+        return stats
+
+
+# Create singleton instances
+orkes_client = OrkesClient()
+workflow_results = WorkflowResultTracker(orkes_client)
+call_workflows = CallWorkflowTrigger(orkes_client, workflow_results)
@@ -0,0 +1,10 @@
+# Percentiles for the latency stats reported by the services and the benchmarks
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of values (0.0 when empty); pct is 0-100"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
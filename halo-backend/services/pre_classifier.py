@@ -0,0 +1,188 @@
+# Local urgency/concern pre-classifier: answers clear-cut transcripts without a model call
+
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+PRECLASSIFIER_ENABLED = os.getenv("PRECLASSIFIER_ENABLED", "true").lower() in ("1", "true", "yes")
+# Results below this confidence are escalated to the model
+PRECLASSIFIER_MIN_CONFIDENCE = float(os.getenv("PRECLASSIFIER_MIN_CONFIDENCE", "0.8"))
+
+# One pattern list per VALID_CONCERNS category
+CONCERN_PATTERNS: Dict[str, List[str]] = {
+    "Domestic Violence": [
+        r"(husband|wife|boyfriend|girlfriend|partner|ex)\b.{0,60}\b(hit|hitting|beat|beating|choking|threaten\w*|attack\w*|abus\w*)",
+        r"(hit|hitting|beat|beating|choking|threaten\w*|attack\w*|abus\w*)\b.{0,60}\bmy (husband|wife|boyfriend|girlfriend|partner|ex)\b",
+        r"domestic (violence|abuse|dispute)",
+    ],
+    "Bleeding": [
+        r"bleed\w*",
+        r"blood",
+        r"(stab|stabbed|cut) (wound|him|her|me|them)",
+    ],
+    "Head Injury": [
+        r"hit (his|her|my|their) head",
+        r"head (injury|wound|trauma)",
+        r"concuss\w*",
+        r"(fell|fall|fallen) .{0,40}\bhead",
+    ],
+    "Perpetrator Present": [
+        r"(he|she|they)('s| is| are|'re) still (here|inside|in the house|outside)",
+        r"(threatening|pointing .{0,20}at) me",
+        r"hiding (in|from)",
+        r"(he|she|they)('s| is| are|'re) (coming|trying to get in|outside the door|banging on)",
+        r"someone (is )?(in|inside) (my|the) house",
+    ],
+    "Mental Health Crisis": [
+        r"(kill|hurt|harm) (myself|himself|herself|themselves)",
+        r"suicid\w*",
+        r"overdos\w*",
+        r"hearing voices",
+        r"panic attack",
+        r"(mental|psychotic) (health )?(crisis|breakdown|episode)",
+    ],
+    "Unknown Location": [
+        r"(don't|do not|can't|cannot) (know|tell|find) (where|my way)",
+        r"\bi'?m lost\b",
+        r"\blost in\b",
+        r"not sure where (i am|we are)",
+    ],
+}
+
+# Linear urgency model: each matched feature adds its weight once to a base of 1
+URGENCY_WEIGHTS: List[Tuple[str, float]] = [
+    (r"knife|gun|weapon|shot|shooting|stabb?\w*", 4.0),
+    (r"not breathing|unconscious|not (fully )?conscious|unresponsive|passed out", 4.0),
+    (r"overdos\w*|heart attack|chest pain|seizure|choking", 4.0),
+    (r"(going to|gonna|trying to) kill|kill me", 3.0),
+    (r"bleed\w*|blood", 3.0),
+    (r"hitting me|hit me|beating|attack\w*", 3.0),
+    (r"\bfire\b|smoke|burning", 3.0),
+    (r"hit (his|her|my|their) head|head (injury|wound)", 2.0),
+    (r"accident|crash\w*|flipped|collision", 2.0),
+    (r"hurt|injur\w*|pain", 1.5),
+    (r"scared|help (me|quickly|now)|hurry|please send", 1.0),
+    (r"\blost\b|trapped|stuck|getting dark", 1.0),
+    (r"noise complaint|loud music|parking|non-?emergency|report (a|an) (theft|noise)|stolen (bike|package)", -3.0),
+]
+
+# Severe features decide a confident high score on their own
+SEVERE_WEIGHT = 4.0
+# Scores at or above this with a severe feature, or with no danger at all, are answered locally
+CONFIDENT_HIGH_SCORE = 8
+
+# Call-taker and acknowledgement phrases that carry no urgency signal
+FILLER_PATTERNS = [
+    r"911,? what('s| is) (your|the) (emergency|address|location)\??",
+    r"what('s| is) (the address|your location|your name)\??",
+    r"(okay|ok|alright|all right|yes|yeah|no|uh|um|hello|hi|thank you|thanks)[.,!]?",
+    r"(stay|stay on the line|help is on the way|can you hear me)[.,!?]?",
+]
+
+
+# A single pass over the text finds every concern: one named group per category
+_concern_automaton = re.compile(
+    "|".join(f"(?P<c{i}>{'|'.join(f'(?:{p})' for p in patterns)})"
+             for i, patterns in enumerate(CONCERN_PATTERNS.values())),
+    re.IGNORECASE,
+)
+_concern_names = {f"c{i}": name for i, name in enumerate(CONCERN_PATTERNS)}
+_urgency_features = [(re.compile(rf"\b(?:{p})\b", re.IGNORECASE), weight) for p, weight in URGENCY_WEIGHTS]
+_filler = re.compile(rf"^\s*(?:(?:{'|'.join(FILLER_PATTERNS)})\s*)+$", re.IGNORECASE)
+
+
+@dataclass
+class PreClassification:
+    score: int
+    concerns: List[str] = field(default_factory=list)
+    confidence: float = 0.0
+    features: List[str] = field(default_factory=list)
+    # Separate from the score's: the patterns miss many phrasings, so finding no concern proves little
+    concern_confidence: float = 0.0
+
+    @property
+    def confident(self) -> bool:
+        return self.confidence >= PRECLASSIFIER_MIN_CONFIDENCE
+
+    @property
+    def concerns_confident(self) -> bool:
+        return self.concern_confidence >= PRECLASSIFIER_MIN_CONFIDENCE
+
+
+def is_filler(text: str) -> bool:
+    """True for segments made only of greetings, acknowledgements and call-taker prompts"""
+    return not text.strip() or _filler.match(text) is not None
+
+
+def find_concerns(text: str) -> List[str]:
+    found = set()
+    for match in _concern_automaton.finditer(text):
+        found.add(_concern_names[match.lastgroup])
+    # Keep VALID_CONCERNS order so results compare equal to the model's
+    return [name for name in CONCERN_PATTERNS if name in found]
+
+
+def classify(transcript: str) -> PreClassification:
+    """
+    Score a transcript locally. The result is confident only for clear-cut cases:
+    filler, obvious non-emergencies, or a severe danger feature pushing the score high.
+    """
+    if is_filler(transcript):
+        return PreClassification(score=1, confidence=0.9, features=["filler"], concern_confidence=0.9)
+
+    weight = 0.0
+    severe = False
+    danger = False
+    features = []
+    for pattern, feature_weight in _urgency_features:
+        match = pattern.search(transcript)
+        if match is None:
+            continue
+        features.append(match.group(0).lower())
+        weight += feature_weight
+        danger = danger or feature_weight > 0
+        severe = severe or feature_weight >= SEVERE_WEIGHT
+    score = max(1, min(10, int(round(1 + weight))))
+    concerns = find_concerns(transcript)
+
+    # Concerns are only trusted where there is nothing to be concerned about
+    concern_confidence = 0.5
+    if severe and score >= CONFIDENT_HIGH_SCORE:
+        # More corroborating features, more confidence
+        confidence = min(0.99, 0.75 + 0.05 * len(features))
+    elif not danger and not concerns and weight < 0:
+        confidence = concern_confidence = 0.9  # explicit non-emergency with nothing alarming
+    else:
+        confidence = 0.5
+    return PreClassification(score=score, concerns=concerns, confidence=confidence, features=features,
+                             concern_confidence=concern_confidence)
+
+
+_stats = {"answered": 0, "escalated": 0, "concerns_answered": 0, "concerns_escalated": 0}
+
+
+def answer_locally(transcript: str, concerns: bool = False):
+    """
+    The local classification if its score is confident enough to skip the model, else None.
+    With concerns=True the concerns must be confident too.
+    """
+    if not PRECLASSIFIER_ENABLED:
+        return None
+    result = classify(transcript)
+    if concerns:
+        confident = result.confident and result.concerns_confident
+        _stats["concerns_answered" if confident else "concerns_escalated"] += 1
+    else:
+        confident = result.confident
+        _stats["answered" if confident else "escalated"] += 1
+    return result if confident else None
+
+
+def get_stats() -> dict:
+    stats = dict(_stats)
+    stats["enabled"] = PRECLASSIFIER_ENABLED
+    stats["min_confidence"] = PRECLASSIFIER_MIN_CONFIDENCE
+    total = stats["answered"] + stats["escalated"]
+    stats["answered_rate"] = stats["answered"] / total if total else 0.0
+    return stats
@@ -0,0 +1,67 @@
+# Concurrency limit with priority lanes: waiting high-priority work gets the next free slot
+
+import asyncio
+import heapq
+import itertools
+from contextlib import asynccontextmanager
+
+# Lower numbers are served first
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_RESCORE = 2
+
+PRIORITY_NAMES = {PRIORITY_HIGH: "high", PRIORITY_NORMAL: "normal", PRIORITY_RESCORE: "rescore"}
+
+
+class PriorityLimiter:
+    """A semaphore whose waiters are woken by priority, then first-come first-served"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._active = 0
+        self._waiters = []  # heap of (priority, seq, future)
+        self._seq = itertools.count()
+        self._stats = {name: {"acquired": 0, "waited": 0} for name in PRIORITY_NAMES.values()}
+
+    @asynccontextmanager
+    async def slot(self, priority: int = PRIORITY_NORMAL):
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def acquire(self, priority: int = PRIORITY_NORMAL):
+        stats = self._stats[PRIORITY_NAMES[priority]]
+        if self._active < self.limit and not self._waiters:
+            self._active += 1
+            stats["acquired"] += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        stats["waited"] += 1
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Slot was handed over just as we were cancelled; pass it on
+                self.release()
+            raise
+        stats["acquired"] += 1
+
+    def release(self):
+        # Hand the slot straight to the best waiter so a newcomer can't jump the queue
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self._active -= 1
+
+    def get_stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "active": self._active,
+            "queued": sum(1 for _, _, future in self._waiters if not future.done()),
+            "lanes": {name: dict(stats) for name, stats in self._stats.items()},
+        }
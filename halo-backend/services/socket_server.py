@@ -1 +1,256 @@
 # WebSocket server logic for pushing updates to frontend
+
+import asyncio
+import json
+import os
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from fastapi import APIRouter, Header, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from db.models import AsyncSessionLocal, Call, Transcript
+
+# Events buffered per subscriber before it is considered lagging
+SUBSCRIBER_QUEUE_SIZE = int(os.getenv("LIVE_SUBSCRIBER_QUEUE_SIZE", "256"))
+# Seconds between keep-alive frames on idle streams
+LIVE_KEEPALIVE_SECONDS = float(os.getenv("LIVE_KEEPALIVE_SECONDS", "15"))
+# Most transcript segments replayed on (re)connect; past this the client is told to resync
+LIVE_REPLAY_LIMIT = int(os.getenv("LIVE_REPLAY_LIMIT", "500"))
+
+router = APIRouter()
+
+
+class Subscriber:
+    def __init__(self, call_id: Optional[int]):
+        self.call_id = call_id  # None subscribes to every active call
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        # Set when the queue overflowed; the stream resyncs from the database
+        self.lagged = False
+
+
+class LiveUpdateHub:
+    """Fans committed transcript, score, unit and status changes out to live subscribers"""
+
+    def __init__(self):
+        self._by_call: Dict[int, Set[Subscriber]] = {}
+        self._firehose: Set[Subscriber] = set()
+        self._stats = {"published": 0, "delivered": 0, "dropped": 0}
+
+    def subscribe(self, call_id: Optional[int] = None) -> Subscriber:
+        subscriber = Subscriber(call_id)
+        if call_id is None:
+            self._firehose.add(subscriber)
+        else:
+            self._by_call.setdefault(call_id, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        if subscriber.call_id is None:
+            self._firehose.discard(subscriber)
+            return
+        subscribers = self._by_call.get(subscriber.call_id)
+        if subscribers is not None:
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self._by_call[subscriber.call_id]
+
+    def publish(self, event: dict):
+        """Queue an event for every subscriber of its call; never blocks the publisher"""
+        self._stats["published"] += 1
+        targets = list(self._firehose) + list(self._by_call.get(event.get("call_id"), ()))
+        for subscriber in targets:
+            if subscriber.lagged:
+                continue
+            try:
+                subscriber.queue.put_nowait(event)
+                self._stats["delivered"] += 1
+            except asyncio.QueueFull:
+                # Slow consumer: stop buffering for it and let it catch up from the DB
+                subscriber.lagged = True
+                self._stats["dropped"] += 1
+
+    def publish_transcripts(self, rows: List[dict]):
+        for row in rows:
+            self.publish({
+                "type": "transcript",
+                "call_id": row["call_id"],
+                "id": row["id"],
+                "speaker": row["speaker"],
+                "text": row["text"],
+                "timestamp": row["timestamp"].isoformat(),
+            })
+
+    def publish_score(self, call_id: int, score: int, concerns: Optional[List[str]] = None, partial: bool = False):
+        # partial: read off a reply that is still streaming; a final event follows
+        self.publish({"type": "score", "call_id": call_id, "score": score,
+                      "concerns": concerns or [], "partial": partial})
+
+    def publish_unit(self, call_id: int, unit_id: int, status: str, eta=None, location: Optional[str] = None):
+        self.publish({
+            "type": "unit",
+            "call_id": call_id,
+            "unit_id": unit_id,
+            "status": status,
+            "eta": eta.isoformat() if eta else None,
+            "location": location,
+        })
+
+    def publish_status(self, call_id: int, status: str):
+        self.publish({"type": "status", "call_id": call_id, "status": status})
+
+    def get_stats(self) -> dict:
+        stats = dict(self._stats)
+        stats["call_subscribers"] = sum(len(s) for s in self._by_call.values())
+        stats["firehose_subscribers"] = len(self._firehose)
+        return stats
+
+
+# Create a singleton instance
+live_updates = LiveUpdateHub()
+
+
+async def _load_transcripts_since(call_id: Optional[int], since_id: int,
+                                  limit: int = LIVE_REPLAY_LIMIT) -> Tuple[List[dict], bool]:
+    """
+    Committed transcript segments after the cursor, for replay on (re)connect. At most the
+    newest `limit` are returned; the flag says older ones were left out.
+    """
+    query = select(Transcript).where(Transcript.id > since_id).order_by(Transcript.id.desc()).limit(limit + 1)
+    if call_id is None:
+        query = query.join(Call, Call.id == Transcript.call_id).where(Call.status == "active")
+    else:
+        query = query.where(Transcript.call_id == call_id)
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(query)
+        transcripts = result.scalars().all()
+    truncated = len(transcripts) > limit
+    return [
+        {
+            "type": "transcript",
+            "call_id": t.call_id,
+            "id": t.id,
+            "speaker": t.speaker,
+            "text": t.text,
+            "timestamp": t.timestamp.isoformat(),
+        }
+        for t in reversed(transcripts[:limit])
+    ], truncated
+
+
+async def live_events(call_id: Optional[int], since_id: int = 0,
+                      keepalive: Optional[float] = None) -> AsyncIterator[Optional[dict]]:
+    """
+    Yield replayed then live events for a call (or all active calls).
+    `since_id` is the last transcript id the client has seen; yields None on idle keep-alive.
+    A "resync" event means events after its cursor were skipped (the subscriber lagged, or
+    more than LIVE_REPLAY_LIMIT segments were waiting): reload from the HTTP routes.
+    """
+    subscriber = live_updates.subscribe(call_id)
+    cursor = since_id
+    try:
+        # Subscribe before replaying so nothing committed in between is missed
+        replay, truncated = await _load_transcripts_since(call_id, cursor)
+        if truncated:
+            yield {"type": "resync", "call_id": call_id, "cursor": cursor}
+        for event in replay:
+            cursor = event["id"]
+            yield event
+
+        while True:
+            if subscriber.lagged:
+                # Drop what is buffered and replay from the last delivered cursor
+                while not subscriber.queue.empty():
+                    subscriber.queue.get_nowait()
+                subscriber.lagged = False
+                yield {"type": "resync", "call_id": call_id, "cursor": cursor}
+                replay, _ = await _load_transcripts_since(call_id, cursor)
+                for event in replay:
+                    cursor = event["id"]
+                    yield event
+                continue
+
+            try:
+                event = await asyncio.wait_for(subscriber.queue.get(), keepalive)
+            except asyncio.TimeoutError:
+                yield None
+                continue
+
+            if event["type"] == "transcript":
+                if event["id"] <= cursor:
+                    continue  # already sent during replay
+                cursor = event["id"]
+            yield event
+    finally:
+        live_updates.unsubscribe(subscriber)
+
+
+async def _serve_websocket(websocket: WebSocket, call_id: Optional[int], since_id: int):
+    await websocket.accept()
+
+    async def send_events():
+        async for event in live_events(call_id, since_id, keepalive=LIVE_KEEPALIVE_SECONDS):
+            await websocket.send_text(json.dumps(event if event is not None else {"type": "ping"}))
+
+    async def wait_for_disconnect():
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+
+    # Whichever finishes first (client gone or send failed) tears down the other,
+    # so a closed socket releases its subscription immediately
+    tasks = [asyncio.create_task(send_events()), asyncio.create_task(wait_for_disconnect())]
+    done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    for task in pending:
+        task.cancel()
+    for task in done:
+        if not task.cancelled() and isinstance(task.exception(), (WebSocketDisconnect, RuntimeError)):
+            continue
+        task.result()
+
+
+@router.websocket("/ws/calls/{call_id}")
+async def call_updates_socket(websocket: WebSocket, call_id: int, since_id: int = 0):
+    """Push new transcript segments, score changes and unit updates for one call"""
+    await _serve_websocket(websocket, call_id, since_id)
+
+
+@router.websocket("/ws/calls")
+async def all_calls_socket(websocket: WebSocket, since_id: int = 0):
+    """Firehose of updates for every active call"""
+    await _serve_websocket(websocket, None, since_id)
+
+
+def _sse_response(call_id: Optional[int], since_id: int, last_event_id: Optional[str]) -> StreamingResponse:
+    # Browsers resend the last received id on reconnect, which doubles as the cursor
+    if last_event_id and last_event_id.isdigit():
+        since_id = max(since_id, int(last_event_id))
+
+    async def stream():
+        async for event in live_events(call_id, since_id, keepalive=LIVE_KEEPALIVE_SECONDS):
+            if event is None:
+                yield ": keep-alive\n\n"
+            elif event["type"] == "transcript":
+                yield f"id: {event['id']}\nevent: transcript\ndata: {json.dumps(event)}\n\n"
+            else:
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@router.get("/stream/calls/{call_id}")
+async def call_updates_stream(call_id: int, since_id: int = Query(0),
+                              last_event_id: Optional[str] = Header(None)):
+    """Server-sent events variant of /ws/calls/{call_id}"""
+    return _sse_response(call_id, since_id, last_event_id)
+
+
+@router.get("/stream/calls")
+async def all_calls_stream(since_id: int = Query(0), last_event_id: Optional[str] = Header(None)):
+    """Server-sent events variant of /ws/calls"""
+    return _sse_response(None, since_id, last_event_id)
+
+
+@router.get("/metrics/live")
+async def live_metrics():
+    """Subscriber counts and delivered/dropped event totals"""
+    return live_updates.get_stats()
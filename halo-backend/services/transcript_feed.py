@@ -0,0 +1,88 @@
+# Incremental transcript reads: keyset cursors and ETags for polling clients
+
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from db.models import Transcript
+
+MAX_PAGE_SIZE = 1000
+
+
+def transcript_page_query(call_id: int, since_id: Optional[int] = None,
+                          since_ts: Optional[datetime] = None, limit: Optional[int] = None):
+    """
+    Transcripts for a call in (timestamp, id) order, starting after the cursor.
+    With both since_ts and since_id the cursor is the (timestamp, id) of the last row seen.
+    """
+    query = select(Transcript).where(Transcript.call_id == call_id)
+    if since_ts is not None and since_id is not None:
+        query = query.where(or_(
+            Transcript.timestamp > since_ts,
+            and_(Transcript.timestamp == since_ts, Transcript.id > since_id),
+        ))
+    elif since_ts is not None:
+        query = query.where(Transcript.timestamp > since_ts)
+    elif since_id is not None:
+        query = query.where(Transcript.id > since_id)
+    query = query.order_by(Transcript.timestamp, Transcript.id)
+    if limit is not None:
+        query = query.limit(min(limit, MAX_PAGE_SIZE))
+    return query
+
+
+def transcript_tail_query(call_id: int, limit: int):
+    """The last `limit` transcripts of a call, newest first (reverse them for display)"""
+    return (
+        select(Transcript)
+        .where(Transcript.call_id == call_id)
+        .order_by(Transcript.timestamp.desc(), Transcript.id.desc())
+        .limit(min(limit, MAX_PAGE_SIZE))
+    )
+
+
+async def transcript_etag(db: AsyncSession, call_id: int, *parts) -> str:
+    """
+    Weak ETag for a call's transcript, from the index alone. Segments are append-only,
+    so the newest id plus the row count changes whenever the transcript does.
+    """
+    result = await db.execute(
+        select(func.max(Transcript.id), func.count(Transcript.id)).where(Transcript.call_id == call_id)
+    )
+    max_id, count = result.one()
+    tag = "-".join(str(part) for part in (call_id, *parts, max_id or 0, count))
+    return f'W/"{tag}"'
+
+
+def page_etag_parts(since_id: Optional[int] = None, since_ts: Optional[datetime] = None,
+                    limit: Optional[int] = None) -> tuple:
+    """ETag parts naming the requested page, so each cursor/limit gets its own tag"""
+    if since_id is None and since_ts is None and limit is None:
+        return ()
+    ts = since_ts.isoformat() if since_ts is not None else ""
+    return (f"p{'' if since_id is None else since_id}~{ts}~{'' if limit is None else limit}",)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    # Weak comparison: W/"x" and "x" name the same representation
+    bare = etag[2:] if etag.startswith("W/") else etag
+    return "*" in candidates or any(
+        (candidate[2:] if candidate.startswith("W/") else candidate) == bare
+        for candidate in candidates
+    )
+
+
+def next_cursor_headers(rows, limit: Optional[int]) -> dict:
+    """Cursor for the next page; X-Has-More tells the client whether to keep reading"""
+    headers = {}
+    if rows:
+        last = rows[-1]
+        headers["X-Next-Since-Id"] = str(last.id)
+        headers["X-Next-Since-Ts"] = last.timestamp.isoformat()
+    has_more = limit is not None and len(rows) >= min(limit, MAX_PAGE_SIZE)
+    headers["X-Has-More"] = "true" if has_more else "false"
+    return headers
@@ -0,0 +1,246 @@
+# Background transcript ingestion: webhook segments are queued and written in batches
+
+import asyncio
+import json
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import insert, select
+from db.models import AsyncWriterSessionLocal, Call, Transcript
+from services.call_cache import call_id_cache, resolve_call_id
+from services.socket_server import live_updates
+from services.analysis_engine import analysis_engine
+
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "100"))
+INGEST_FLUSH_INTERVAL_MS = float(os.getenv("INGEST_FLUSH_INTERVAL_MS", "50"))
+INGEST_MAX_QUEUE = int(os.getenv("INGEST_MAX_QUEUE", "10000"))
+# "enqueue": ack the webhook once the segment is queued
+# "commit": ack the webhook only after the batch holding the segment is committed
+INGEST_ACK_MODE = os.getenv("INGEST_ACK_MODE", "enqueue")
+# Pause before the one retry of a batch whose write failed
+INGEST_RETRY_DELAY_MS = float(os.getenv("INGEST_RETRY_DELAY_MS", "200"))
+
+ACK_MODES = ("enqueue", "commit")
+
+
+@dataclass
+class TranscriptSegment:
+    external_call_id: str
+    speaker: str
+    text: str
+    timestamp: datetime
+    committed: Optional[asyncio.Future] = None
+
+
+class TranscriptIngestQueue:
+    def __init__(self, batch_size: int = INGEST_BATCH_SIZE,
+                 flush_interval_ms: float = INGEST_FLUSH_INTERVAL_MS,
+                 max_queue: int = INGEST_MAX_QUEUE,
+                 ack_mode: str = INGEST_ACK_MODE):
+        if ack_mode not in ACK_MODES:
+            raise ValueError(f"INGEST_ACK_MODE must be one of {ACK_MODES}, got {ack_mode!r}")
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.max_queue = max_queue
+        self.ack_mode = ack_mode
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stats = {
+            "enqueued": 0,
+            "flushed_segments": 0,
+            "flushed_batches": 0,
+            "failed_batches": 0,
+            "retried_batches": 0,
+            "dropped_segments": 0,
+            "side_effect_errors": 0,
+            "max_queue_depth": 0,
+            "last_batch_size": 0,
+            "last_flush_ms": 0.0,
+            "max_flush_ms": 0.0,
+            "total_flush_ms": 0.0,
+        }
+
+    async def start(self):
+        """Start the background writer on the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._writer is not None and self._loop is loop and not self._writer.done():
+            return
+        self._loop = loop
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._writer = loop.create_task(self._run())
+
+    async def stop(self):
+        """Flush whatever is still queued and stop the writer"""
+        if self._writer is None or self._loop is not asyncio.get_running_loop():
+            return
+        await self._queue.join()
+        self._writer.cancel()
+        try:
+            await self._writer
+        except asyncio.CancelledError:
+            pass
+        self._writer = None
+
+    async def submit(self, segment: TranscriptSegment):
+        """Queue a segment; in commit mode, wait until it has been written"""
+        await self.start()
+        if self.ack_mode == "commit":
+            segment.committed = self._loop.create_future()
+        # put() waits when the queue is full, pushing back on the webhook instead of growing unbounded
+        await self._queue.put(segment)
+        self._stats["enqueued"] += 1
+        self._stats["max_queue_depth"] = max(self._stats["max_queue_depth"], self._queue.qsize())
+        if segment.committed is not None:
+            await segment.committed
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[TranscriptSegment]):
+        started = time.perf_counter()
+        rows, error = None, None
+        for attempt in range(2):
+            try:
+                rows = await self._write_batch(batch)
+                error = None
+                break
+            except Exception as e:
+                print(f"Error flushing {len(batch)} transcript segments (attempt {attempt + 1}): {e}")
+                error = e
+                if attempt == 0:
+                    # Usually a locked or briefly unavailable database; retry the batch once
+                    self._stats["retried_batches"] += 1
+                    await asyncio.sleep(INGEST_RETRY_DELAY_MS / 1000)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        if error is None:
+            self._stats["flushed_segments"] += len(batch)
+            self._stats["flushed_batches"] += 1
+            self._stats["last_batch_size"] = len(batch)
+            self._stats["last_flush_ms"] = elapsed_ms
+            self._stats["max_flush_ms"] = max(self._stats["max_flush_ms"], elapsed_ms)
+            self._stats["total_flush_ms"] += elapsed_ms
+            self._after_commit(rows)
+        else:
+            self._stats["failed_batches"] += 1
+            self._drop(batch, error)
+
+        for segment in batch:
+            if segment.committed is not None and not segment.committed.done():
+                if error is None:
+                    segment.committed.set_result(None)
+                else:
+                    segment.committed.set_exception(error)
+            self._queue.task_done()
+
+    def _after_commit(self, rows: List[dict]):
+        """Push committed rows on; a failure here must not make the committed batch look failed"""
+        # Only committed rows are pushed, so subscribers never see a segment that rolls back
+        for name, side_effect in (("live updates", live_updates.publish_transcripts),
+                                  ("analysis", analysis_engine.on_segments)):
+            try:
+                side_effect(rows)
+            except Exception as e:
+                self._stats["side_effect_errors"] += 1
+                print(f"Error handing {len(rows)} committed transcript segments to {name}: {e}")
+
+    def _drop(self, batch: List[TranscriptSegment], error: Exception):
+        # In commit mode the webhook reports the error and VAPI retries; otherwise the
+        # segments are lost, so log them in full for replay
+        unacknowledged = [segment for segment in batch if segment.committed is None]
+        self._stats["dropped_segments"] += len(unacknowledged)
+        for segment in unacknowledged:
+            print("Dropped transcript segment: " + json.dumps({
+                "external_call_id": segment.external_call_id,
+                "speaker": segment.speaker,
+                "timestamp": segment.timestamp.isoformat(),
+                "text": segment.text,
+                "error": str(error),
+            }))
+
+    async def _write_batch(self, batch: List[TranscriptSegment]) -> List[dict]:
+        """Resolve call IDs and insert the whole batch in a single transaction; returns the committed rows"""
+        async with AsyncWriterSessionLocal() as db:
+            call_ids = await db.run_sync(self._resolve_calls, batch)
+            rows = [
+                {
+                    "call_id": call_ids[segment.external_call_id],
+                    "speaker": segment.speaker,
+                    "timestamp": segment.timestamp,
+                    "text": segment.text,
+                }
+                for segment in batch
+            ]
+            if db.bind.dialect.insert_executemany_returning_sort_by_parameter_order:
+                result = await db.execute(
+                    insert(Transcript).returning(Transcript.id, sort_by_parameter_order=True), rows
+                )
+                for row, transcript_id in zip(rows, result.scalars().all()):
+                    row["id"] = transcript_id
+            else:
+                # No multi-row RETURNING (e.g. MySQL): let the ORM fetch each new id
+                transcripts = [Transcript(**row) for row in rows]
+                db.add_all(transcripts)
+                await db.flush()
+                for row, transcript in zip(rows, transcripts):
+                    row["id"] = transcript.id
+            await db.commit()
+        return rows
+
+    def _resolve_calls(self, db, batch: List[TranscriptSegment]) -> Dict[str, int]:
+        call_ids = {}
+        unknown = set()
+        for segment in batch:
+            external_id = segment.external_call_id
+            if external_id in call_ids or external_id in unknown:
+                continue
+            call_id = call_id_cache.get(external_id)
+            if call_id is None:
+                unknown.add(external_id)
+            else:
+                call_ids[external_id] = call_id
+        if not unknown:
+            return call_ids
+
+        existing = db.execute(
+            select(Call.external_call_id, Call.id).where(Call.external_call_id.in_(unknown))
+        ).all()
+        for external_id, call_id in existing:
+            call_id_cache.put(external_id, call_id)
+            call_ids[external_id] = call_id
+
+        for segment in batch:
+            if segment.external_call_id not in call_ids:
+                call_ids[segment.external_call_id] = resolve_call_id(
+                    db, segment.external_call_id, segment.timestamp
+                )
+        return call_ids
+
+    def get_stats(self) -> dict:
+        stats = dict(self._stats)
+        total_ms = stats.pop("total_flush_ms")
+        stats["avg_flush_ms"] = total_ms / stats["flushed_batches"] if stats["flushed_batches"] else 0.0
+        stats["queue_depth"] = self._queue.qsize() if self._queue is not None else 0
+        stats["ack_mode"] = self.ack_mode
+        stats["batch_size"] = self.batch_size
+        stats["flush_interval_ms"] = self.flush_interval * 1000
+        return stats
+
+
+# Create a singleton instance
+transcript_ingest = TranscriptIngestQueue()
@@ -0,0 +1,196 @@
+# Full-text search over transcript text: SQLite FTS5, or a MySQL FULLTEXT index
+
+import html
+import os
+import re
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import column, literal_column, select, table, text
+from sqlalchemy.dialects.mysql import match as mysql_match
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+from db.models import Call, Transcript
+
+# Create the index at startup if it is missing (on a large MySQL table, run the migration off-peak instead)
+SEARCH_INDEX_AUTO_CREATE = os.getenv("SEARCH_INDEX_AUTO_CREATE", "true").lower() in ("1", "true", "yes")
+SEARCH_MAX_PAGE_SIZE = int(os.getenv("SEARCH_MAX_PAGE_SIZE", "100"))
+# Words of context shown around the matches
+SEARCH_SNIPPET_WORDS = int(os.getenv("SEARCH_SNIPPET_WORDS", "16"))
+
+FTS_TABLE = "transcripts_fts"
+MYSQL_INDEX = "ft_transcripts_text"
+
+# External-content FTS5 table over transcripts.text, kept in step by triggers so every
+# insert path (webhook ingest batches included) is indexed in the same transaction
+SQLITE_DDL = [
+    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+    f"text, content='transcripts', content_rowid='id', tokenize='porter unicode61')",
+    f"CREATE TRIGGER transcripts_fts_insert AFTER INSERT ON transcripts BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text); END",
+    f"CREATE TRIGGER transcripts_fts_delete AFTER DELETE ON transcripts BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text) VALUES ('delete', old.id, old.text); END",
+    f"CREATE TRIGGER transcripts_fts_update AFTER UPDATE OF text ON transcripts BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text) VALUES ('delete', old.id, old.text); "
+    f"INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text); END",
+]
+
+# Quoted phrases, or bare words with an optional trailing * for prefix search
+QUERY_TERM = re.compile(r'"([^"]*)"|([\w\']+\*?)', re.UNICODE)
+# Snippet markers that cannot occur in transcript text; swapped for <mark> after escaping
+MARK_START, MARK_END = "\x02", "\x03"
+
+
+class SearchUnavailable(Exception):
+    """The database has no full-text search this module can use"""
+
+
+def search_index_exists(connection) -> bool:
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        return connection.execute(
+            text("SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": FTS_TABLE}
+        ).scalar() > 0
+    if dialect == "mysql":
+        return connection.execute(text(
+            "SELECT COUNT(*) FROM INFORMATION_SCHEMA.STATISTICS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'transcripts' AND INDEX_NAME = :name"
+        ), {"name": MYSQL_INDEX}).scalar() > 0
+    return False
+
+
+def ensure_search_index(connection) -> bool:
+    """Create the search index if it is missing and index existing rows; True if it was created"""
+    dialect = connection.dialect.name
+    if dialect not in ("sqlite", "mysql"):
+        print(f"Transcript search is not supported on {dialect}")
+        return False
+    if search_index_exists(connection):
+        return False
+    if dialect == "sqlite":
+        for statement in SQLITE_DDL:
+            connection.execute(text(statement))
+        # Index the rows written before the table existed
+        connection.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+    else:
+        connection.execute(text(f"ALTER TABLE transcripts ADD FULLTEXT INDEX {MYSQL_INDEX} (text)"))
+    print(f"Created transcript search index ({dialect})")
+    return True
+
+
+def parse_query(query: str) -> List[Tuple[str, bool]]:
+    """(term, is_phrase) pairs; anything that isn't a word, a "phrase" or a prefix* is dropped"""
+    terms = []
+    for phrase, word in QUERY_TERM.findall(query):
+        if phrase.strip():
+            terms.append((" ".join(re.findall(r"[\w']+", phrase)), True))
+        elif word:
+            terms.append((word, False))
+    return [(term, is_phrase) for term, is_phrase in terms if term.strip("*'")]
+
+
+def fts5_query(terms: List[Tuple[str, bool]]) -> str:
+    # Every term must match; quoting keeps words like AND/NOT/NEAR from being read as operators
+    parts = []
+    for term, is_phrase in terms:
+        if not is_phrase and term.endswith("*"):
+            parts.append(f'"{term[:-1]}"*')
+        else:
+            parts.append(f'"{term}"')
+    return " ".join(parts)
+
+
+def mysql_boolean_query(terms: List[Tuple[str, bool]]) -> str:
+    return " ".join(f'+"{term}"' if is_phrase else f"+{term}" for term, is_phrase in terms)
+
+
+def _highlight(snippet: str) -> str:
+    # Escape the transcript text, then turn the markers into <mark> tags
+    return html.escape(snippet, quote=False).replace(MARK_START, "<mark>").replace(MARK_END, "</mark>")
+
+
+def mark_terms(body: str, terms: List[Tuple[str, bool]], words: int = SEARCH_SNIPPET_WORDS) -> str:
+    """Snippet around the first match with every match marked (MySQL has no snippet function)"""
+    patterns = []
+    for term, is_phrase in terms:
+        if is_phrase:
+            patterns.append(r"\b" + r"\W+".join(re.escape(word) for word in term.split()) + r"\b")
+        elif term.endswith("*"):
+            patterns.append(r"\b" + re.escape(term[:-1]) + r"\w*")
+        else:
+            patterns.append(r"\b" + re.escape(term) + r"\b")
+    matcher = re.compile("|".join(patterns), re.IGNORECASE)
+    first = matcher.search(body)
+    if first is None:
+        return html.escape(" ".join(body.split()[:words]), quote=False)
+    start = len(body[:first.start()].split())
+    tokens = body.split()
+    begin = max(0, start - words // 4)
+    window = " ".join(tokens[begin:begin + words])
+    marked = matcher.sub(lambda m: f"{MARK_START}{m.group(0)}{MARK_END}", window)
+    prefix = "…" if begin > 0 else ""
+    suffix = "…" if begin + words < len(tokens) else ""
+    return _highlight(f"{prefix}{marked}{suffix}")
+
+
+async def search_transcripts(db: AsyncSession, query: str, status: Optional[str] = None,
+                             since: Optional[datetime] = None, until: Optional[datetime] = None,
+                             limit: int = 20, offset: int = 0) -> Tuple[List[dict], bool]:
+    """Best matches first, with highlighted snippets; also returns whether more results follow"""
+    terms = parse_query(query)
+    if not terms:
+        return [], False
+    limit = min(limit, SEARCH_MAX_PAGE_SIZE)
+    dialect = db.bind.dialect.name
+
+    columns = [Transcript.id, Transcript.call_id, Transcript.speaker, Transcript.timestamp,
+               Call.external_call_id, Call.status]
+    if dialect == "sqlite":
+        fts = table(FTS_TABLE, column("rowid"))
+        statement = (
+            select(*columns,
+                   literal_column(f"snippet({FTS_TABLE}, 0, '{MARK_START}', '{MARK_END}', '…', "
+                                  f"{SEARCH_SNIPPET_WORDS})").label("snippet"),
+                   # bm25 is lower for better matches
+                   literal_column(f"-bm25({FTS_TABLE})").label("rank"))
+            .select_from(fts)
+            .join(Transcript, Transcript.id == fts.c.rowid)
+            .where(text(f"{FTS_TABLE} MATCH :match").bindparams(match=fts5_query(terms)))
+        )
+    elif dialect == "mysql":
+        relevance = mysql_match(Transcript.text, against=mysql_boolean_query(terms)).in_boolean_mode()
+        statement = select(*columns, Transcript.text.label("snippet"), relevance.label("rank")).where(relevance)
+    else:
+        raise SearchUnavailable(f"Transcript search is not supported on {dialect}")
+
+    statement = statement.join(Call, Call.id == Transcript.call_id)
+    if status is not None:
+        statement = statement.where(Call.status == status)
+    if since is not None:
+        statement = statement.where(Transcript.timestamp >= since)
+    if until is not None:
+        statement = statement.where(Transcript.timestamp < until)
+    # One extra row tells whether there is another page
+    statement = statement.order_by(literal_column("rank").desc(), Transcript.id.desc()).limit(limit + 1).offset(offset)
+
+    try:
+        rows = (await db.execute(statement)).all()
+    except DBAPIError:
+        # Only look for the index once a query has failed, so searches don't pay for the check
+        if await db.run_sync(lambda session: search_index_exists(session.connection())):
+            raise
+        raise SearchUnavailable("The transcript search index has not been created yet")
+    results = []
+    for row in rows[:limit]:
+        snippet = _highlight(row.snippet) if dialect == "sqlite" else mark_terms(row.snippet, terms)
+        results.append({
+            "transcript_id": row.id,
+            "call_id": row.call_id,
+            "external_call_id": row.external_call_id,
+            "call_status": row.status,
+            "speaker": row.speaker,
+            "timestamp": row.timestamp,
+            "snippet": snippet,
+            "rank": float(row.rank),
+        })
+    return results, len(rows) > limit
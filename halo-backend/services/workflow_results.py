@@ -0,0 +1,173 @@
+# Orkes workflow results: pushed by the workflows' callback task, polled in bulk as a fallback
+
+import asyncio
+import os
+import random
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Optional
+
+from services.call_cache import call_id_cache
+from services.percentiles import percentile
+from services.socket_server import live_updates
+
+# Poll a workflow only once its callback is this late
+ORKES_CALLBACK_GRACE_SECONDS = float(os.getenv("ORKES_CALLBACK_GRACE_SECONDS", "15"))
+# Fallback poll interval: starts here, doubles while nothing completes, with jitter
+ORKES_POLL_INITIAL_SECONDS = float(os.getenv("ORKES_POLL_INITIAL_SECONDS", "1"))
+ORKES_POLL_MAX_SECONDS = float(os.getenv("ORKES_POLL_MAX_SECONDS", "30"))
+# Give up on a workflow that has shown no result for this long
+ORKES_RESULT_TIMEOUT_SECONDS = float(os.getenv("ORKES_RESULT_TIMEOUT_SECONDS", "600"))
+# Finished results kept for lookups
+ORKES_RESULTS_RETAINED = int(os.getenv("ORKES_RESULTS_RETAINED", "1000"))
+
+TERMINAL_STATUSES = {"COMPLETED", "FAILED", "TERMINATED", "TIMED_OUT"}
+
+
+def _epoch_ms(value) -> Optional[float]:
+    # Orkes sends epoch milliseconds; an unresolved expression arrives as the literal "${...}"
+    try:
+        return float(value) if value not in (None, "", 0) else None
+    except (TypeError, ValueError):
+        return None
+
+
+class WorkflowResultTracker:
+    """
+    Tracks started workflows until their result is visible. Callbacks complete them
+    immediately; workflows whose callback is overdue are polled in bulk with backoff.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self._pending: Dict[str, dict] = {}
+        self._results: "OrderedDict[str, dict]" = OrderedDict()
+        self._latencies = {"callback": deque(maxlen=1000), "poll": deque(maxlen=1000)}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stats = {"registered": 0, "callbacks": 0, "polled": 0, "poll_rounds": 0,
+                       "duplicates": 0, "abandoned": 0}
+
+    def register(self, workflow_id: str, name: str, call_id: Optional[str]):
+        self._pending[workflow_id] = {"name": name, "call_id": call_id, "started_at": time.time()}
+        self._stats["registered"] += 1
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def is_pending(self, workflow_id: str) -> bool:
+        return workflow_id in self._pending
+
+    def is_finished(self, workflow_id: str) -> bool:
+        return workflow_id in self._results
+
+    def complete(self, workflow_id: str, status: str, output: Any = None, end_time=None,
+                 source: str = "callback", name: Optional[str] = None,
+                 call_id: Optional[str] = None) -> Optional[dict]:
+        """Record a finished workflow; returns None if it was already recorded"""
+        if workflow_id in self._results:
+            self._stats["duplicates"] += 1
+            return None
+        started = self._pending.pop(workflow_id, {})
+        visible_at = time.time()
+        end_ms = _epoch_ms(end_time)
+        result = {
+            "workflow_id": workflow_id,
+            "name": name or started.get("name"),
+            "call_id": call_id or started.get("call_id"),
+            "status": status,
+            "output": output,
+            "source": source,
+            "visible_at": visible_at,
+            # Workflow end to result visibility
+            "latency_ms": max(0.0, visible_at * 1000 - end_ms) if end_ms else None,
+        }
+        self._results[workflow_id] = result
+        while len(self._results) > ORKES_RESULTS_RETAINED:
+            self._results.popitem(last=False)
+        self._stats["callbacks" if source == "callback" else "polled"] += 1
+        if result["latency_ms"] is not None:
+            self._latencies[source].append(result["latency_ms"])
+
+        internal_id = call_id_cache.get(result["call_id"]) if result["call_id"] else None
+        if internal_id is not None:
+            live_updates.publish({"type": "workflow", "call_id": internal_id, "workflow_id": workflow_id,
+                                  "name": result["name"], "status": status, "output": output})
+        return result
+
+    def get(self, workflow_id: str) -> Optional[dict]:
+        if workflow_id in self._results:
+            return self._results[workflow_id]
+        if workflow_id in self._pending:
+            return {"workflow_id": workflow_id, "status": "RUNNING", **self._pending[workflow_id]}
+        return None
+
+    async def start(self):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._poll_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _due(self, now: float) -> List[str]:
+        return [workflow_id for workflow_id, pending in self._pending.items()
+                if now - pending["started_at"] >= ORKES_CALLBACK_GRACE_SECONDS]
+
+    async def _poll_loop(self):
+        delay = ORKES_POLL_INITIAL_SECONDS
+        while True:
+            if not self._pending:
+                # Idle: sleep until a workflow is registered
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                delay = ORKES_POLL_INITIAL_SECONDS
+                continue
+            now = time.time()
+            due = self._due(now)
+            if not due:
+                # Nothing overdue yet; wake when the oldest callback becomes late
+                oldest = min(pending["started_at"] for pending in self._pending.values())
+                await asyncio.sleep(max(0.05, oldest + ORKES_CALLBACK_GRACE_SECONDS - now))
+                continue
+            try:
+                completed = await self._poll(due)
+            except Exception as e:
+                print(f"Error polling Orkes workflows: {e}")
+                completed = 0
+            self._abandon_stale(now)
+            # Back off while nothing finishes; jitter keeps replicas from polling in lockstep
+            delay = ORKES_POLL_INITIAL_SECONDS if completed else min(ORKES_POLL_MAX_SECONDS, delay * 2)
+            await asyncio.sleep(delay / 2 + random.uniform(0, delay / 2))
+
+    async def _poll(self, workflow_ids: List[str]) -> int:
+        self._stats["poll_rounds"] += 1
+        statuses = await self.client.get_statuses(workflow_ids)
+        finished = [workflow_id for workflow_id, status in statuses.items()
+                    if status in TERMINAL_STATUSES and workflow_id in self._pending]
+        # Only finished workflows are fetched in full, for their output and end time
+        workflows = await asyncio.gather(*(self.client.get_workflow(workflow_id) for workflow_id in finished))
+        for workflow_id, workflow in zip(finished, workflows):
+            if workflow is not None and workflow_id in self._pending:
+                self.complete(workflow_id, workflow.get("status"), workflow.get("output"),
+                              workflow.get("endTime"), source="poll")
+        return len(finished)
+
+    def _abandon_stale(self, now: float):
+        for workflow_id in [workflow_id for workflow_id, pending in self._pending.items()
+                            if now - pending["started_at"] > ORKES_RESULT_TIMEOUT_SECONDS]:
+            del self._pending[workflow_id]
+            self._stats["abandoned"] += 1
+
+    def get_stats(self) -> dict:
+        stats = dict(self._stats)
+        stats["pending"] = len(self._pending)
+        for source, latencies in self._latencies.items():
+            stats[f"{source}_latency_ms_p50"] = percentile(latencies, 50)
+            stats[f"{source}_latency_ms_p95"] = percentile(latencies, 95)
+        return stats
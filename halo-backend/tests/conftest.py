@@ -0,0 +1,12 @@
+"""Shared test setup: every test module sees the same throwaway database"""
+
+import os
+import sys
+import tempfile
+
+# Set before any test imports the models, which bind their engines at import time
+_tmp_dir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp_dir, 'test.db')}"
+
+# Add parent directory to path to import from backend modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
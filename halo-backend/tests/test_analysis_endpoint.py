@@ -0,0 +1,98 @@
+"""
+Combined analysis tests with a stand-in model client: validation of the reply, the
+fallback when the model fails, and the /api/ai/analysis response.
+
+Usage:
+    python -m pytest tests/test_analysis_endpoint.py
+"""
+
+import asyncio
+import json
+from types import SimpleNamespace
+
+from fastapi.testclient import TestClient
+
+from db.models import Base, engine
+from services.ai_prompts import AIPromptService, ai_service
+from services.llm_cache import llm_cache
+from main import app
+
+# Danger without a severe feature, so the pre-classifier leaves it to the model
+TRANSCRIPT = "My boyfriend is hitting me"
+
+
+class StandInClient:
+    """Answers every chat completion with the queued replies in order; an exception is raised"""
+
+    def __init__(self, *replies):
+        self.replies = list(replies)
+        self.requests = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, **kwargs):
+        self.requests.append(kwargs)
+        reply = self.replies.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=reply))])
+
+    async def close(self):
+        pass
+
+
+def stand_in(monkeypatch, service, *replies):
+    client = StandInClient(*replies)
+    monkeypatch.setattr(service, "_client", client)
+    monkeypatch.setattr(service, "batching", False)
+    monkeypatch.setattr(llm_cache, "enabled", False)
+    return client
+
+
+def test_score_is_clamped_and_concerns_are_filtered(monkeypatch):
+    service = AIPromptService()
+    client = stand_in(
+        monkeypatch, service,
+        json.dumps({"score": 15, "concerns": ["Domestic Violence", "Fire", "Domestic Violence", " Bleeding "]}),
+        json.dumps({"score": 0, "concerns": "Perpetrator Present"}),
+        json.dumps({"score": "7"}),
+    )
+
+    async def run():
+        return [await service.get_analysis(TRANSCRIPT) for _ in range(3)]
+
+    high, low, bare = asyncio.run(run())
+    assert high == {"score": 10, "concerns": ["Domestic Violence", "Bleeding"]}
+    # A string is not a list of concerns; none of its characters is a category
+    assert low == {"score": 1, "concerns": []}
+    assert bare == {"score": 7, "concerns": []}
+    assert client.requests[0]["response_format"] == {"type": "json_object"}
+    assert TRANSCRIPT in client.requests[0]["messages"][0]["content"]
+
+
+def test_model_failures_fall_back(monkeypatch):
+    service = AIPromptService()
+    stand_in(monkeypatch, service, RuntimeError("model unavailable"), "not json", json.dumps({"concerns": []}))
+
+    async def run():
+        return [await service.get_analysis(TRANSCRIPT) for _ in range(3)]
+
+    assert asyncio.run(run()) == [{"score": 5, "concerns": []}] * 3
+
+
+def test_analysis_route(monkeypatch):
+    client = stand_in(monkeypatch, ai_service,
+                      json.dumps({"score": 8, "concerns": ["Perpetrator Present", "Not A Concern"]}),
+                      RuntimeError("model unavailable"))
+
+    # Startup builds the search index on these tables
+    Base.metadata.create_all(bind=engine)
+    with TestClient(app) as http:
+        answered = http.post("/api/ai/analysis", json={"call_id": "analysis-route", "transcript": TRANSCRIPT})
+        fallback = http.post("/api/ai/analysis", json={"call_id": "analysis-route", "transcript": TRANSCRIPT})
+        missing = http.post("/api/ai/analysis", json={"call_id": "analysis-route"})
+
+    assert answered.status_code == 200
+    assert answered.json() == {"call_id": "analysis-route", "score": 8, "concerns": ["Perpetrator Present"]}
+    assert fallback.json() == {"call_id": "analysis-route", "score": 5, "concerns": []}
+    assert missing.status_code == 422
+    assert len(client.requests) == 2
@@ -0,0 +1,199 @@
+"""
+Incremental analysis engine tests with a stand-in model. Only the persistence test
+touches a database, and it uses its own throwaway SQLite file.
+
+Usage:
+    python -m pytest tests/test_analysis_engine.py
+"""
+
+import asyncio
+import os
+from datetime import datetime
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+import services.analysis_engine as engine_module
+from db.models import Base, AIInsight, Call, User
+from services.analysis_engine import IncrementalAnalysisEngine
+from services.call_board import ActiveCallBoard
+
+MIN_INTERVAL = 0.2
+MAX_INTERVAL = 0.5
+
+
+def segment(call_id, speaker, text):
+    return {"call_id": call_id, "speaker": speaker, "text": text}
+
+
+class StandInModel:
+    """Records what each re-score was sent; replies with the queued results in order"""
+
+    def __init__(self, *replies):
+        self.replies = list(replies)
+        self.calls = []
+
+    async def analyze_incremental(self, summary, new_segments, previous_score=None, previous_concerns=None,
+                                  priority=None, on_partial=None):
+        self.calls.append({"summary": summary, "new_segments": new_segments,
+                           "previous_score": previous_score, "previous_concerns": list(previous_concerns or [])})
+        reply = self.replies.pop(0) if self.replies else {
+            "score": 5, "concerns": [], "summary": f"summary {len(self.calls)}"}
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+
+def make_engine(monkeypatch, model, persist=True):
+    monkeypatch.setattr(engine_module, "ANALYSIS_MIN_INTERVAL_SECONDS", MIN_INTERVAL)
+    monkeypatch.setattr(engine_module, "ANALYSIS_MAX_INTERVAL_SECONDS", MAX_INTERVAL)
+    monkeypatch.setattr(engine_module, "ANALYSIS_STREAMING", False)
+    monkeypatch.setattr(engine_module, "ai_service", model)
+    engine = IncrementalAnalysisEngine(enabled=True)
+    if persist:
+        persisted = []
+
+        async def record(state):
+            persisted.append((state.call_id, state.score))
+
+        monkeypatch.setattr(engine, "_persist", record)
+        engine.persisted = persisted
+    return engine
+
+
+def test_triggers_and_debounce(monkeypatch):
+    model = StandInModel()
+    engine = make_engine(monkeypatch, model)
+
+    async def run():
+        # First segment of a call: scored straight away
+        engine.on_segments([segment(1, "CALLER", "Someone broke into my house")])
+        await asyncio.sleep(0.05)
+        assert len(model.calls) == 1
+
+        # A new caller turn triggers, but not before the minimum interval has passed
+        engine.on_segments([segment(1, "DISPATCHER", "Where are you now?")])
+        engine.on_segments([segment(1, "CALLER", "Upstairs in the bathroom")])
+        await asyncio.sleep(MIN_INTERVAL / 2)
+        assert len(model.calls) == 1
+        await asyncio.sleep(MIN_INTERVAL)
+        assert len(model.calls) == 2
+
+        # A keyword triggers even mid-turn
+        engine.on_segments([segment(1, "CALLER", "I think he has a gun")])
+        await asyncio.sleep(MIN_INTERVAL + 0.1)
+        assert len(model.calls) == 3
+
+        # Nothing notable: picked up by the timer, the maximum interval after the last score
+        engine.on_segments([segment(1, "DISPATCHER", "Stay where you are")])
+        await asyncio.sleep(MIN_INTERVAL)
+        assert len(model.calls) == 3
+        await asyncio.sleep(MAX_INTERVAL - MIN_INTERVAL + 0.1)
+        assert len(model.calls) == 4
+
+    asyncio.run(run())
+    stats = engine.get_stats()
+    assert (stats["trigger_first"], stats["trigger_turn"], stats["trigger_keyword"], stats["trigger_timer"]) == (1, 1, 1, 1)
+    assert engine.persisted == [(1, 5)] * 4
+
+
+def test_only_new_segments_and_the_previous_result_are_sent(monkeypatch):
+    first = {"score": 6, "concerns": ["Perpetrator Present"], "summary": "Intruder in the caller's house."}
+    model = StandInModel(first)
+    engine = make_engine(monkeypatch, model)
+
+    async def run():
+        engine.on_segments([segment(1, "CALLER", "Someone broke into my house")])
+        await asyncio.sleep(0.05)
+        engine.on_segments([segment(1, "DISPATCHER", "Where are you now?"),
+                            segment(1, "CALLER", "Upstairs in the bathroom")])
+        await asyncio.sleep(MIN_INTERVAL + 0.1)
+
+    asyncio.run(run())
+    assert model.calls[0] == {"summary": "", "new_segments": "CALLER: Someone broke into my house",
+                              "previous_score": None, "previous_concerns": []}
+    assert model.calls[1] == {
+        "summary": "Intruder in the caller's house.",
+        "new_segments": "DISPATCHER: Where are you now?\nCALLER: Upstairs in the bathroom",
+        "previous_score": 6,
+        "previous_concerns": ["Perpetrator Present"],
+    }
+
+
+def test_failed_runs_keep_their_segments(monkeypatch):
+    model = StandInModel(None, RuntimeError("model unavailable"))
+    engine = make_engine(monkeypatch, model)
+
+    async def run():
+        engine.on_segments([segment(1, "CALLER", "My father collapsed")])
+        await asyncio.sleep(0.05)
+        # No answer: the segment waits for the next run, along with anything newer
+        engine.on_segments([segment(1, "DISPATCHER", "Is he breathing?")])
+        await asyncio.sleep(MAX_INTERVAL + 0.1)
+        # That run raised; both segments are still pending
+        await asyncio.sleep(MAX_INTERVAL + 0.1)
+
+    asyncio.run(run())
+    sent = [call["new_segments"] for call in model.calls]
+    assert sent == ["CALLER: My father collapsed",
+                    "CALLER: My father collapsed\nDISPATCHER: Is he breathing?",
+                    "CALLER: My father collapsed\nDISPATCHER: Is he breathing?"]
+    assert engine.get_stats()["failed"] == 2
+    assert engine.persisted == [(1, 5)]
+
+
+def test_result_is_saved_and_ranked(tmp_path, monkeypatch):
+    path = os.path.join(tmp_path, "analysis.db")
+    sync_engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=sync_engine)
+    with sessionmaker(bind=sync_engine)() as db:
+        user = User(name="Analysis Test")
+        db.add(user)
+        db.flush()
+        call = Call(user_id=user.id, external_call_id="analysis-call", timestamp=datetime.now(), status="active")
+        db.add(call)
+        db.commit()
+        call_id = call.id
+    sync_engine.dispose()
+
+    writer = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    monkeypatch.setattr(engine_module, "AsyncWriterSessionLocal",
+                        async_sessionmaker(writer, class_=AsyncSession, expire_on_commit=False))
+    board = ActiveCallBoard()
+    board.add(call_id, "analysis-call", datetime.now())
+    monkeypatch.setattr(engine_module, "call_board", board)
+    model = StandInModel({"score": 9, "concerns": ["Bleeding", "Head Injury"], "summary": "Fall with head wound."})
+    engine = make_engine(monkeypatch, model, persist=False)
+
+    async def run():
+        engine.on_segments([segment(call_id, "CALLER", "She fell and her head is bleeding")])
+        await asyncio.sleep(0.2)
+        async with async_sessionmaker(writer)() as db:
+            insights = (await db.execute(select(AIInsight).where(AIInsight.call_id == call_id))).scalars().all()
+            score = (await db.execute(select(Call.current_score).where(Call.id == call_id))).scalar_one()
+        await writer.dispose()
+        return insights, score
+
+    insights, score = asyncio.run(run())
+    assert [(insight.urgency_score, insight.concern_tags) for insight in insights] == [(9, "Bleeding, Head Injury")]
+    assert score == 9
+    assert board.top(1)[0]["score"] == 9
+
+
+def test_idle_calls_are_forgotten(monkeypatch):
+    monkeypatch.setattr(engine_module, "ANALYSIS_IDLE_SECONDS", 0.2)
+    engine = IncrementalAnalysisEngine(enabled=True)
+    # Keep the scheduled analyses from reaching the model
+    monkeypatch.setattr(engine, "_start", lambda state: None)
+
+    async def run():
+        # Call 1 never sends its call-end
+        engine.on_segments([segment(1, "CALLER", "My neighbour is shouting")])
+        await asyncio.sleep(0.3)
+        engine.on_segments([segment(2, "CALLER", "There's smoke in the hallway")])
+
+    asyncio.run(run())
+    stats = engine.get_stats()
+    assert stats["active_calls"] == 1
+    assert stats["forgotten_idle"] == 1
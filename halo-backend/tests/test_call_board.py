@@ -0,0 +1,62 @@
+"""
+Active call board tests: ordering as calls are added, re-scored and removed.
+
+Usage:
+    python -m pytest tests/test_call_board.py
+"""
+
+from datetime import datetime, timedelta
+
+from services.call_board import ActiveCallBoard
+
+START = datetime(2026, 1, 1, 12, 0, 0)
+
+
+def board_with_calls():
+    board = ActiveCallBoard()
+    # Call 1 has waited longest; call 4 has no score yet
+    board.add(1, "call-1", START, score=5)
+    board.add(2, "call-2", START + timedelta(seconds=10), score=8)
+    board.add(3, "call-3", START + timedelta(seconds=20), score=5)
+    board.add(4, "call-4", START + timedelta(seconds=30))
+    return board
+
+
+def ranking(board, k=10):
+    return [entry["call_id"] for entry in board.top(k)]
+
+
+def test_most_urgent_first_then_longest_waiting():
+    board = board_with_calls()
+    assert ranking(board) == [2, 1, 3, 4]
+    top = board.top(2)
+    assert [entry["rank"] for entry in top] == [1, 2]
+    assert top[0]["external_call_id"] == "call-2"
+
+
+def test_update_score_moves_the_call():
+    board = board_with_calls()
+    board.update_score(3, 9)
+    assert ranking(board) == [3, 2, 1, 4]
+    board.update_score(2, 5)
+    # Equal scores fall back to start time
+    assert ranking(board) == [3, 1, 2, 4]
+    board.update_score(4, 1)
+    assert ranking(board) == [3, 1, 2, 4]
+    # Calls not on the board are ignored rather than added
+    board.update_score(99, 10)
+    assert ranking(board) == [3, 1, 2, 4]
+    assert board.get_stats()["rescored"] == 3
+
+
+def test_remove_and_re_add():
+    board = board_with_calls()
+    board.remove(2)
+    board.remove(2)
+    assert ranking(board) == [1, 3, 4]
+    assert board.get_stats()["removed"] == 1
+    # Adding an existing call replaces its entry instead of duplicating it
+    board.add(1, "call-1", START, score=2)
+    assert ranking(board) == [3, 1, 4]
+    assert len(board) == 3
+    assert ranking(board, k=1) == [3]
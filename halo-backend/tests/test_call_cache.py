@@ -0,0 +1,99 @@
+"""
+VAPI call ID cache tests: LRU and TTL eviction, and resolving a call that another
+request is creating at the same time. Uses its own throwaway SQLite database.
+
+Usage:
+    python -m pytest tests/test_call_cache.py
+"""
+
+from types import SimpleNamespace
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import services.call_cache as cache_module
+from db.models import Base, Call, User
+from services.call_cache import CallIdCache, resolve_call_id
+
+
+def fake_clock(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(cache_module, "time", SimpleNamespace(monotonic=lambda: clock[0]))
+    return clock
+
+
+def test_least_recently_used_entries_are_evicted_first():
+    cache = CallIdCache(max_size=2, ttl_seconds=60)
+    cache.put("call-a", 1)
+    cache.put("call-b", 2)
+    assert cache.get("call-a") == 1  # call-b is now the least recently used
+    cache.put("call-c", 3)
+
+    assert cache.get("call-b") is None
+    assert cache.get("call-a") == 1
+    assert cache.get("call-c") == 3
+    stats = cache.get_stats()
+    assert stats["evictions"] == 1
+    assert stats["size"] == 2
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    clock = fake_clock(monkeypatch)
+    cache = CallIdCache(max_size=10, ttl_seconds=60)
+    cache.put("call-a", 1)
+    clock[0] += 59
+    assert cache.get("call-a") == 1
+    clock[0] += 2
+    assert cache.get("call-a") is None
+    stats = cache.get_stats()
+    assert stats["expired"] == 1
+    assert stats["size"] == 0
+
+
+def test_losing_the_create_race_returns_the_winning_row(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'race.db'}")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    with Session() as setup:
+        setup.add(User(name="Unknown Caller", address="Unknown"))
+        setup.commit()
+        user_id = setup.query(User.id).scalar()
+    monkeypatch.setattr(cache_module, "call_id_cache", CallIdCache())
+
+    def default_user_created_by_another_request(db):
+        # Runs after the lookup missed and before our insert: another webhook creates the call
+        with Session() as other:
+            other.add(Call(user_id=user_id, external_call_id="race-call", status="active"))
+            other.commit()
+        return user_id
+
+    monkeypatch.setattr(cache_module, "_default_user_id", default_user_created_by_another_request)
+    with Session() as db:
+        call_id = resolve_call_id(db, "race-call")
+
+    with Session() as db:
+        calls = db.query(Call).filter(Call.external_call_id == "race-call").all()
+    assert [call.id for call in calls] == [call_id]
+    assert cache_module.call_id_cache.get("race-call") == call_id
+    engine.dispose()
+
+
+def test_racing_first_calls_settle_on_the_lowest_user(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'users.db'}")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    cache = CallIdCache()
+    monkeypatch.setattr(cache_module, "call_id_cache", cache)
+
+    with Session() as db:
+        placeholder = cache_module._default_user_id(db)
+        assert db.get(User, placeholder).name == "Unknown Caller"
+        # A racing first call added its own placeholder before this process cached one
+        db.add(User(name="Unknown Caller", address="Unknown"))
+        db.commit()
+        cache.clear()
+        assert cache_module._default_user_id(db) == placeholder
+        assert db.query(User).count() == 2
+        # Later calls are served from the cache without a query
+        assert cache.default_user_id == placeholder
+    engine.dispose()
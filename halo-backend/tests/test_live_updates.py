@@ -0,0 +1,99 @@
+"""
+Live update hub tests: replay-then-live ordering and the lagging-subscriber resync,
+with the database replay replaced by an in-memory transcript.
+
+Usage:
+    python -m pytest tests/test_live_updates.py
+"""
+
+import asyncio
+
+import services.socket_server as socket_module
+from services.socket_server import live_events, live_updates
+
+
+def segment(segment_id, call_id=1):
+    return {"type": "transcript", "call_id": call_id, "id": segment_id, "speaker": "CALLER",
+            "text": f"segment {segment_id}", "timestamp": "2025-01-01T00:00:00"}
+
+
+def use_stored_transcript(monkeypatch, stored, limit=100):
+    """Replay reads `stored` (a list of segments) instead of the database"""
+    async def load(call_id, since_id, limit=limit):
+        newer = [event for event in stored if event["id"] > since_id]
+        return newer[-limit:], len(newer) > limit
+
+    monkeypatch.setattr(socket_module, "_load_transcripts_since", load)
+
+
+def commit(stored, segment_id):
+    stored.append(segment(segment_id))
+    live_updates.publish(segment(segment_id))
+
+
+def test_replay_then_live_without_gaps_or_duplicates(monkeypatch):
+    stored = [segment(1), segment(2)]
+    use_stored_transcript(monkeypatch, stored)
+
+    async def run():
+        events = live_events(1, since_id=0)
+        received = [await events.__anext__()]  # subscribed, replay started
+        # Committed while the replay is being sent: already in the replay, and also published
+        commit(stored, 3)
+        live_updates.publish(segment(2))
+        live_updates.publish({"type": "score", "call_id": 1, "score": 8})
+        commit(stored, 4)
+        for _ in range(4):
+            received.append(await asyncio.wait_for(events.__anext__(), 1))
+        await events.aclose()
+        return received
+
+    received = asyncio.run(run())
+    assert [(event["type"], event.get("id")) for event in received] == [
+        ("transcript", 1), ("transcript", 2), ("transcript", 3), ("score", None), ("transcript", 4),
+    ]
+    assert live_updates.get_stats()["call_subscribers"] == 0
+
+
+def test_lagging_subscriber_is_resynced_from_the_cursor(monkeypatch):
+    monkeypatch.setattr(socket_module, "SUBSCRIBER_QUEUE_SIZE", 2)
+    stored = [segment(1)]
+    use_stored_transcript(monkeypatch, stored)
+
+    async def run():
+        events = live_events(1, since_id=0)
+        first = await events.__anext__()
+        # Nobody reads while five segments and a score are committed: the queue overflows
+        for segment_id in range(2, 7):
+            commit(stored, segment_id)
+        live_updates.publish({"type": "score", "call_id": 1, "score": 9})
+        received = [first]
+        # The score is lost with the dropped buffer; the resync tells the client to reload it
+        for _ in range(6):
+            received.append(await asyncio.wait_for(events.__anext__(), 1))
+        commit(stored, 7)
+        received.append(await asyncio.wait_for(events.__anext__(), 1))
+        await events.aclose()
+        return received
+
+    received = asyncio.run(run())
+    assert received[1] == {"type": "resync", "call_id": 1, "cursor": 1}
+    # Caught up from the stored transcript, then live again
+    assert [event.get("id") for event in received if event["type"] == "transcript"] == list(range(1, 8))
+    assert received[2:7] == [segment(segment_id) for segment_id in range(2, 7)]
+
+
+def test_long_replays_are_capped_with_a_resync(monkeypatch):
+    stored = [segment(segment_id) for segment_id in range(1, 11)]
+    use_stored_transcript(monkeypatch, stored, limit=3)
+
+    async def run():
+        events = live_events(None, since_id=0)
+        received = [await events.__anext__() for _ in range(4)]
+        await events.aclose()
+        return received
+
+    received = asyncio.run(run())
+    assert received[0] == {"type": "resync", "call_id": None, "cursor": 0}
+    # Only the newest segments are replayed
+    assert [event["id"] for event in received[1:]] == [8, 9, 10]
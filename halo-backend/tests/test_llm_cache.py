@@ -0,0 +1,181 @@
+"""
+Model response cache tests: TTL expiry, the disk tier and coalescing of in-flight requests.
+
+Usage:
+    python -m pytest tests/test_llm_cache.py
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import services.llm_cache as llm_cache_module
+from services.ai_prompts import AIPromptService
+from services.llm_cache import LLMResponseCache
+
+
+def counting(value):
+    calls = []
+
+    async def compute():
+        calls.append(value)
+        return value
+
+    return compute, calls
+
+
+def test_entries_expire_after_the_ttl(tmp_path, monkeypatch):
+    now = [1000.0]
+    # Only the cache's clock moves; the event loop keeps the real one
+    monkeypatch.setattr(llm_cache_module, "time", SimpleNamespace(monotonic=lambda: now[0], time=lambda: now[0]))
+    cache = LLMResponseCache(max_size=10, ttl_seconds=60, path=str(tmp_path / "cache.db"), enabled=True)
+    compute, calls = counting(7)
+
+    async def run():
+        await cache.get_or_compute("key", compute)
+        now[0] += 59
+        await cache.get_or_compute("key", compute)
+        now[0] += 2
+        return await cache.get_or_compute("key", compute)
+
+    assert asyncio.run(run()) == 7
+    # Fresh, then a memory hit, then both tiers expired
+    assert len(calls) == 2
+    stats = cache.get_stats()
+    assert stats["memory_hits"] == 1
+    assert stats["expired"] == 1
+    assert stats["disk_hits"] == 0
+
+
+def test_disk_hits_are_promoted_to_memory(tmp_path):
+    path = str(tmp_path / "cache.db")
+    compute, calls = counting({"score": 8, "concerns": ["Fire"]})
+
+    asyncio.run(LLMResponseCache(path=path, enabled=True).get_or_compute("key", compute))
+
+    # A new process starts with an empty memory tier
+    restarted = LLMResponseCache(path=path, enabled=True)
+
+    async def run():
+        first = await restarted.get_or_compute("key", compute)
+        second = await restarted.get_or_compute("key", compute)
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first == second == {"score": 8, "concerns": ["Fire"]}
+    assert len(calls) == 1
+    stats = restarted.get_stats()
+    assert stats["disk_hits"] == 1
+    assert stats["memory_hits"] == 1
+    assert stats["size"] == 1
+
+
+def test_promoted_disk_hits_keep_the_row_expiry(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(llm_cache_module, "time", SimpleNamespace(monotonic=lambda: now[0], time=lambda: now[0]))
+    path = str(tmp_path / "cache.db")
+    compute, calls = counting(4)
+    asyncio.run(LLMResponseCache(ttl_seconds=60, path=path, enabled=True).get_or_compute("key", compute))
+
+    restarted = LLMResponseCache(ttl_seconds=60, path=path, enabled=True)
+
+    async def run():
+        now[0] += 50
+        await restarted.get_or_compute("key", compute)
+        # Past the row's expiry, even though the memory copy is only 11 seconds old
+        now[0] += 11
+        await restarted.get_or_compute("key", compute)
+
+    asyncio.run(run())
+    assert len(calls) == 2
+    stats = restarted.get_stats()
+    assert stats["disk_hits"] == 1
+    assert stats["expired"] == 1
+
+
+def test_concurrent_misses_share_one_request():
+    cache = LLMResponseCache(enabled=True, path="")
+    calls = []
+    release = None
+
+    async def compute():
+        calls.append(1)
+        await release.wait()
+        return 5
+
+    async def run():
+        nonlocal release
+        release = asyncio.Event()
+        callers = [asyncio.create_task(cache.get_or_compute("key", compute)) for _ in range(3)]
+        await asyncio.sleep(0)
+        release.set()
+        return await asyncio.gather(*callers)
+
+    assert asyncio.run(run()) == [5, 5, 5]
+    assert len(calls) == 1
+    assert cache.get_stats()["coalesced"] == 2
+    assert cache.get_stats()["inflight"] == 0
+
+
+def test_cancelling_the_first_caller_does_not_cancel_the_others():
+    cache = LLMResponseCache(enabled=True, path="")
+    release = None
+
+    async def compute():
+        await release.wait()
+        return 9
+
+    async def run():
+        nonlocal release
+        release = asyncio.Event()
+        first = asyncio.create_task(cache.get_or_compute("key", compute))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(cache.get_or_compute("key", compute))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        return await asyncio.gather(first, second, return_exceptions=True)
+
+    first, second = asyncio.run(run())
+    assert isinstance(first, asyncio.CancelledError)
+    assert second == 9
+    # The request still completed, so its answer was cached
+    assert cache.get_stats()["stores"] == 1
+
+
+def test_failures_reach_every_waiter_and_are_not_cached():
+    cache = LLMResponseCache(enabled=True, path="")
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0)
+        raise ValueError("Could not parse urgency score: maybe")
+
+    async def run():
+        return await asyncio.gather(
+            cache.get_or_compute("key", compute),
+            cache.get_or_compute("key", compute),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, ValueError) for result in results)
+    assert len(calls) == 1
+
+    with pytest.raises(ValueError):
+        asyncio.run(cache.get_or_compute("key", compute))
+    assert len(calls) == 2
+    assert cache.get_stats()["size"] == 0
+
+
+def test_batched_and_single_answers_use_different_keys():
+    service = AIPromptService()
+    service.batching = True
+    batched = service._cache_key("urgency", "my kitchen is on fire")
+    service.batching = False
+    single = service._cache_key("urgency", "my kitchen  is on fire ")
+    assert batched != single
+    assert single == service._cache_key("urgency", "my kitchen is on fire")
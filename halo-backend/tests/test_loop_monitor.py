@@ -0,0 +1,40 @@
+"""
+Loop monitor tests: per-route request timing through the middleware.
+
+Usage:
+    python -m pytest tests/test_loop_monitor.py
+"""
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from services.loop_monitor import LoopMonitor, RouteTimingMiddleware
+from services.percentiles import percentile
+
+
+def test_requests_are_grouped_by_route_template():
+    app = FastAPI()
+
+    @app.get("/calls/{call_id}")
+    async def get_call(call_id: int):
+        return {"id": call_id}
+
+    monitor = LoopMonitor(enabled=True)
+    app.add_middleware(RouteTimingMiddleware, monitor=monitor)
+    with TestClient(app) as client:
+        for call_id in (1, 2, 3):
+            assert client.get(f"/calls/{call_id}").status_code == 200
+        for path in ("/wp-login.php", "/.env", "/calls/1/nope"):
+            assert client.get(path).status_code == 404
+
+    routes = monitor.get_stats()["routes"]
+    assert set(routes) == {"GET /calls/{call_id}", "GET unmatched"}
+    assert routes["GET /calls/{call_id}"]["count"] == 3
+    assert routes["GET unmatched"]["count"] == 3
+
+
+def test_percentile_uses_the_nearest_rank():
+    assert percentile([], 95) == 0.0
+    assert percentile([3, 1, 2], 50) == 2
+    assert percentile(range(1, 101), 95) == 95
+    assert percentile([5], 99) == 5
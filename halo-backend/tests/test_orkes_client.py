@@ -0,0 +1,227 @@
+"""
+Orkes client tests against a local fake Orkes server (an in-process ASGI app).
+
+Usage:
+    python -m pytest tests/test_orkes_client.py
+"""
+
+import asyncio
+import base64
+import json
+import os
+import sys
+import time
+
+# Add parent directory to path to import from backend modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from fastapi import FastAPI, Header, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+import services.orkes_client as orkes_module
+import services.workflow_results as results_module
+from orkes.token_manager import OrkesTokenManager
+from services.orkes_client import OrkesClient, CallWorkflowTrigger
+from services.workflow_results import WorkflowResultTracker
+
+ORKES_URL = "http://orkes.test"
+WORKFLOW_DELAY = 0.2
+
+
+def make_jwt(expires_in=3600):
+    payload = base64.urlsafe_b64encode(json.dumps({"exp": time.time() + expires_in}).encode()).decode()
+    return f"header.{payload.rstrip('=')}.signature"
+
+
+def fake_orkes(reject_first=0):
+    """Issues JWTs and workflow IDs; rejects the first `reject_first` workflow starts with 401"""
+    app = FastAPI()
+    app.state.tokens = 0
+    app.state.started = []
+    app.state.rejected = 0
+    app.state.searches = 0
+    app.state.finished = {}  # workflow ID -> end time (epoch ms)
+
+    @app.post("/api/token")
+    async def token():
+        app.state.tokens += 1
+        return {"token": make_jwt()}
+
+    @app.post("/api/workflow")
+    async def start(request: Request, x_authorization: str = Header(None)):
+        if not x_authorization:
+            return JSONResponse({"message": "missing token"}, status_code=401)
+        if app.state.rejected < reject_first:
+            app.state.rejected += 1
+            return JSONResponse({"message": "token expired"}, status_code=401)
+        body = await request.json()
+        await asyncio.sleep(WORKFLOW_DELAY)
+        workflow_id = f"wf-{body['name']}-{len(app.state.started)}"
+        app.state.started.append((body["name"], body["input"]))
+        return PlainTextResponse(workflow_id)
+
+    @app.get("/api/workflow/search")
+    async def search(query: str):
+        app.state.searches += 1
+        ids = query[query.index("(") + 1:query.index(")")].split(",")
+        return {"results": [{"workflowId": workflow_id,
+                             "status": "COMPLETED" if workflow_id in app.state.finished else "RUNNING"}
+                            for workflow_id in ids]}
+
+    @app.get("/api/workflow/{workflow_id}")
+    async def get_workflow(workflow_id: str):
+        return {"workflowId": workflow_id, "status": "COMPLETED", "output": {"score": 8},
+                "endTime": app.state.finished[workflow_id]}
+
+    return app
+
+
+def make_client(monkeypatch, app):
+    monkeypatch.setattr(orkes_module, "token_manager",
+                        OrkesTokenManager(server_url=ORKES_URL, key_id="key", key_secret="secret"))
+    return OrkesClient(server_url=ORKES_URL, transport=httpx.ASGITransport(app=app))
+
+
+def test_workflows_start_concurrently_with_one_token(monkeypatch):
+    app = fake_orkes()
+    client = make_client(monkeypatch, app)
+
+    async def run():
+        started = time.perf_counter()
+        ids = await client.start_workflows(["urgency_score_agent", "key_concerns_agent"],
+                                           {"call_id": "call-1", "transcript": "help"})
+        elapsed = time.perf_counter() - started
+        await client.close()
+        return ids, elapsed
+
+    ids, elapsed = asyncio.run(run())
+    assert set(ids) == {"urgency_score_agent", "key_concerns_agent"}
+    assert all(workflow_id and workflow_id.startswith("wf-") for workflow_id in ids.values())
+    # Both started in parallel, not back to back
+    assert elapsed < 2 * WORKFLOW_DELAY
+    assert app.state.tokens == 1
+
+
+def test_rejected_token_is_refreshed_once(monkeypatch):
+    app = fake_orkes(reject_first=1)
+    client = make_client(monkeypatch, app)
+
+    async def run():
+        workflow_id = await client.start_workflow("urgency_score_agent", {"call_id": "call-1"})
+        await client.close()
+        return workflow_id
+
+    assert asyncio.run(run()) is not None
+    assert app.state.tokens == 2
+    assert client.get_stats()["reauthenticated"] == 1
+
+
+def test_segments_are_throttled_per_call(monkeypatch):
+    app = fake_orkes()
+    client = make_client(monkeypatch, app)
+    monkeypatch.setattr(orkes_module, "ORKES_MIN_INTERVAL_SECONDS", 0.3)
+    trigger = CallWorkflowTrigger(client, enabled=True, workflows=["urgency_score_agent"])
+
+    async def run():
+        # on_segment returns immediately; the workflow start runs in the background
+        started = time.perf_counter()
+        trigger.on_segment("call-1", "CALLER", "There's a fire")
+        trigger.on_segment("call-1", "CALLER", "in the kitchen")
+        trigger.on_segment("call-1", "CALLER", "and smoke upstairs")
+        assert time.perf_counter() - started < WORKFLOW_DELAY
+        await asyncio.sleep(0.3 + 2 * WORKFLOW_DELAY)
+        await client.close()
+
+    asyncio.run(run())
+    transcripts = [workflow_input["transcript"] for _, workflow_input in app.state.started]
+    # One immediate start, then one trailing start covering everything since
+    assert len(transcripts) == 2
+    assert transcripts[0] == "CALLER: There's a fire\n"
+    assert transcripts[1].endswith("CALLER: and smoke upstairs\n")
+    assert len(trigger.workflows_for("call-1")) == 2
+
+
+def test_idle_calls_are_forgotten(monkeypatch):
+    app = fake_orkes()
+    client = make_client(monkeypatch, app)
+    monkeypatch.setattr(orkes_module, "ORKES_CALL_IDLE_SECONDS", 0.3)
+    trigger = CallWorkflowTrigger(client, enabled=True, workflows=["urgency_score_agent"])
+
+    async def run():
+        # call-1 never sends its call-end
+        trigger.on_segment("call-1", "CALLER", "There's a fire")
+        await asyncio.sleep(0.3 + 2 * WORKFLOW_DELAY)
+        trigger.on_segment("call-2", "CALLER", "Someone collapsed")
+        stats = trigger.get_stats()
+        await asyncio.sleep(2 * WORKFLOW_DELAY)
+        await client.close()
+        return stats
+
+    stats = asyncio.run(run())
+    assert stats["active_calls"] == 1
+    assert stats["forgotten_idle"] == 1
+    assert trigger.workflows_for("call-1") == []
+    assert len(trigger.workflows_for("call-2")) == 1
+
+
+def test_overdue_workflows_are_polled_in_bulk(monkeypatch):
+    app = fake_orkes()
+    client = make_client(monkeypatch, app)
+    monkeypatch.setattr(results_module, "ORKES_CALLBACK_GRACE_SECONDS", 0)
+    monkeypatch.setattr(results_module, "ORKES_POLL_INITIAL_SECONDS", 0.05)
+    tracker = WorkflowResultTracker(client)
+
+    async def run():
+        await tracker.start()
+        # One workflow reports back through its callback, the other two never do
+        tracker.register("wf-a", "urgency_score_agent", "call-1")
+        tracker.register("wf-b", "key_concerns_agent", "call-1")
+        tracker.register("wf-c", "urgency_score_agent", "call-2")
+        tracker.complete("wf-a", "COMPLETED", {"score": 9}, time.time() * 1000, source="callback")
+        await asyncio.sleep(0.2)
+        app.state.finished = {"wf-b": time.time() * 1000, "wf-c": time.time() * 1000}
+        await asyncio.sleep(0.5)
+        await tracker.stop()
+        await client.close()
+
+    asyncio.run(run())
+    assert tracker.get("wf-a")["source"] == "callback"
+    assert tracker.get("wf-b")["source"] == "poll"
+    assert tracker.get("wf-c")["output"] == {"score": 8}
+    stats = tracker.get_stats()
+    assert stats["pending"] == 0
+    # Each round asks about every overdue workflow in one request
+    assert app.state.searches == stats["poll_rounds"]
+    assert stats["poll_latency_ms_p95"] < 500
+
+
+def test_callback_needs_the_secret_and_a_started_workflow(monkeypatch):
+    from fastapi.testclient import TestClient
+    import api.orkes_callback as callback_module
+
+    tracker = WorkflowResultTracker(client=None)
+    tracker.register("wf-known", "urgency_score_agent", None)
+    published = []
+    monkeypatch.setattr(results_module.live_updates, "publish", published.append)
+    monkeypatch.setattr(callback_module, "workflow_results", tracker)
+    monkeypatch.setattr(callback_module, "ORKES_CALLBACK_SECRET", "s3cret")
+    app = FastAPI()
+    app.include_router(callback_module.router)
+    client = TestClient(app)
+
+    def callback(workflow_id, secret="s3cret"):
+        headers = {"X-Orkes-Callback-Secret": secret} if secret else {}
+        return client.post("/api/orkes/callback", headers=headers,
+                           json={"workflow_id": workflow_id, "output": {"score": 10}})
+
+    assert callback("wf-known", secret=None).status_code == 401
+    assert callback("wf-known", secret="guess").status_code == 401
+    # A workflow the backend never started is refused and not recorded
+    assert callback("wf-forged").status_code == 404
+    assert tracker.get("wf-forged") is None
+    assert published == []
+
+    assert callback("wf-known").json() == {"status": "ok", "duplicate": False}
+    assert tracker.get("wf-known")["output"] == {"score": 10}
+    assert callback("wf-known").json() == {"status": "ok", "duplicate": True}
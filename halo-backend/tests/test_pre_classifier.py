@@ -0,0 +1,86 @@
+"""
+Local pre-classifier tests: which transcripts are answered locally and which go to the model.
+
+Usage:
+    python -m pytest tests/test_pre_classifier.py
+"""
+
+import asyncio
+
+import services.pre_classifier as classifier_module
+from services.ai_prompts import AIPromptService
+from services.llm_cache import llm_cache
+from services.pre_classifier import answer_locally, classify, find_concerns, is_filler
+
+
+def test_filler_is_answered_as_not_urgent():
+    assert is_filler("911, what's your emergency?")
+    assert is_filler("Okay. Yes. Thank you.")
+    assert not is_filler("Okay, he's not breathing")
+    result = answer_locally("Hello. Okay, thank you.")
+    assert result.score == 1
+    assert result.concerns == []
+
+
+def test_severe_danger_is_answered_with_a_high_score():
+    result = answer_locally("He has a knife and he stabbed her, she's bleeding everywhere")
+    assert result is not None
+    assert result.score >= classifier_module.CONFIDENT_HIGH_SCORE
+    assert result.concerns == ["Bleeding"]
+    assert "knife" in result.features
+
+
+def test_plain_non_emergency_is_answered_with_a_low_score():
+    result = answer_locally("I'd like to report a noise complaint, the loud music next door won't stop")
+    assert result is not None
+    assert result.score == 1
+    assert result.concerns == []
+
+
+def test_ambiguous_transcripts_go_to_the_model():
+    # Danger without a severe feature: the model decides the score
+    assert answer_locally("My boyfriend is hitting me") is None
+    result = classify("My boyfriend is hitting me")
+    assert result.concerns == ["Domestic Violence"]
+    assert not result.confident
+    # Severe feature but a low overall score
+    assert answer_locally("There's a gun in the drawer at my neighbour's") is None
+
+
+def test_concerns_keep_the_category_order():
+    text = "I'm lost in the woods, my friend hit his head and there's blood"
+    assert find_concerns(text) == ["Bleeding", "Head Injury", "Unknown Location"]
+
+
+def test_disabled_classifier_answers_nothing(monkeypatch):
+    monkeypatch.setattr(classifier_module, "PRECLASSIFIER_ENABLED", False)
+    assert answer_locally("Okay.") is None
+
+
+def test_severe_score_is_local_but_concerns_go_to_the_model(monkeypatch):
+    transcript = "There is a fire, my kid is unconscious and I do not know the address, we just moved here"
+    result = classify(transcript)
+    assert result.confident and result.score >= classifier_module.CONFIDENT_HIGH_SCORE
+    # No pattern matched the location problem, so an empty list is not an answer
+    assert not result.concerns_confident
+    assert answer_locally(transcript, concerns=True) is None
+
+    service = AIPromptService()
+    service.batching = False
+    monkeypatch.setattr(llm_cache, "enabled", False)
+    asked = []
+
+    async def request_key_concerns(text, priority):
+        asked.append(text)
+        return ["Unknown Location"]
+
+    monkeypatch.setattr(service, "_request_key_concerns", request_key_concerns)
+    analysis = asyncio.run(service.get_analysis(transcript))
+    assert analysis == {"score": result.score, "concerns": ["Unknown Location"]}
+    assert asked == [transcript]
+
+
+def test_non_emergency_concerns_stay_local():
+    result = answer_locally("I'd like to report a noise complaint about the loud music upstairs", concerns=True)
+    assert result is not None
+    assert result.concerns == []
@@ -0,0 +1,79 @@
+"""
+Priority limiter tests: waiters are served by priority, and cancelled waiters never lose a slot.
+
+Usage:
+    python -m pytest tests/test_priority_limiter.py
+"""
+
+import asyncio
+
+from services.priority_limiter import PriorityLimiter, PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_RESCORE
+
+
+def test_waiters_are_served_by_priority_then_arrival():
+    limiter = PriorityLimiter(1)
+    served = []
+
+    async def worker(name, priority):
+        async with limiter.slot(priority):
+            served.append(name)
+            await asyncio.sleep(0)
+
+    async def run():
+        await limiter.acquire()
+        workers = []
+        for name, priority in [("rescore", PRIORITY_RESCORE), ("normal", PRIORITY_NORMAL),
+                               ("high-1", PRIORITY_HIGH), ("high-2", PRIORITY_HIGH)]:
+            workers.append(asyncio.create_task(worker(name, priority)))
+            await asyncio.sleep(0)
+        assert limiter.get_stats()["queued"] == 4
+        limiter.release()
+        await asyncio.gather(*workers)
+
+    asyncio.run(run())
+    assert served == ["high-1", "high-2", "normal", "rescore"]
+    stats = limiter.get_stats()
+    assert stats["active"] == 0
+    assert stats["lanes"]["high"] == {"acquired": 2, "waited": 2}
+
+
+def test_cancelled_waiter_is_skipped():
+    limiter = PriorityLimiter(1)
+
+    async def run():
+        await limiter.acquire()
+        cancelled = asyncio.create_task(limiter.acquire(PRIORITY_HIGH))
+        waiting = asyncio.create_task(limiter.acquire(PRIORITY_NORMAL))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        await asyncio.sleep(0)
+        assert limiter.get_stats()["queued"] == 1
+        limiter.release()
+        await asyncio.wait_for(waiting, 1)
+        assert cancelled.cancelled()
+        return limiter.get_stats()
+
+    stats = asyncio.run(run())
+    assert stats["active"] == 1
+    assert stats["queued"] == 0
+
+
+def test_slot_handed_to_a_cancelled_waiter_is_passed_on():
+    limiter = PriorityLimiter(1)
+
+    async def run():
+        await limiter.acquire()
+        first = asyncio.create_task(limiter.acquire(PRIORITY_HIGH))
+        second = asyncio.create_task(limiter.acquire(PRIORITY_NORMAL))
+        await asyncio.sleep(0)
+        # The slot goes to the first waiter, which is cancelled before it can run
+        limiter.release()
+        first.cancel()
+        await asyncio.wait_for(second, 1)
+        assert first.cancelled()
+        limiter.release()
+        return limiter.get_stats()
+
+    stats = asyncio.run(run())
+    assert stats["active"] == 0
+    assert stats["queued"] == 0
@@ -0,0 +1,89 @@
+"""
+Query-plan regression test: every per-call read route must be served by an index.
+
+Runs the routes against a temporary SQLite database, captures the SQL they
+execute and fails if EXPLAIN QUERY PLAN shows a table scan or a sort.
+
+Usage:
+    python -m pytest tests/test_query_plans.py
+"""
+
+import sqlite3
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from db.models import Base, engine, async_engine, SessionLocal, User, Call, Transcript, AIInsight, Unit
+from main import app
+
+# The throwaway database set up in conftest.py
+DB_PATH = engine.url.database
+
+# Routes a dispatcher screen hits for a single call
+READ_ROUTES = [
+    "/calls/1",
+    "/calls/1/transcripts",
+    "/calls/1/transcripts?since_id=5&limit=10",
+    "/calls/1/ai-insights",
+    "/calls/1/units",
+    "/calls/1/snapshot",
+    "/calls/1/snapshot?transcripts=5",
+    "/test/calls/plan-test-1",
+    "/test/calls/plan-test-1?since_id=5",
+]
+
+
+def seed_database():
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    user = User(name="Plan Test")
+    db.add(user)
+    db.flush()
+    now = datetime.now()
+    for n in range(3):
+        call = Call(user_id=user.id, external_call_id=f"plan-test-{n + 1}", timestamp=now, status="active")
+        db.add(call)
+        db.flush()
+        for i in range(20):
+            db.add(Transcript(call_id=call.id, speaker="CALLER", timestamp=now + timedelta(seconds=i), text=f"segment {i}"))
+        db.add(AIInsight(call_id=call.id, concern_tags="Bleeding", urgency_score=7))
+        db.add(Unit(call_id=call.id, status="en_route", eta=now + timedelta(minutes=5), location="37.8715,-122.2730"))
+    db.commit()
+    db.close()
+
+
+def capture_route_queries():
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", record)
+    try:
+        with TestClient(app) as client:
+            for route in READ_ROUTES:
+                before = len(statements)
+                response = client.get(route)
+                assert response.status_code == 200, f"{route} returned {response.status_code}"
+                assert len(statements) > before, f"{route} executed no queries"
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", record)
+    return statements
+
+
+def test_read_routes_use_indexes():
+    seed_database()
+    statements = capture_route_queries()
+
+    connection = sqlite3.connect(DB_PATH)
+    problems = []
+    for statement, parameters in statements:
+        plan = connection.execute(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+        details = [row[-1] for row in plan]
+        for detail in details:
+            if detail.startswith("SCAN") or "TEMP B-TREE" in detail:
+                problems.append(f"{detail}\n    in: {' '.join(statement.split())}")
+    connection.close()
+
+    assert not problems, "Read routes fell back to scans/sorts:\n" + "\n".join(problems)
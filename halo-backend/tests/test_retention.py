@@ -0,0 +1,94 @@
+"""
+Call archival tests against the temporary SQLite database.
+
+Usage:
+    python -m pytest tests/test_retention.py
+"""
+
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from db.models import Base, engine, SessionLocal, User, Call, Transcript, AIInsight, Unit, ArchivedCall
+import services.call_archive as archive_module
+from services.call_archive import call_archive
+from main import app
+
+OLD = datetime.now() - timedelta(days=40)
+
+
+def seed_calls(tag="archive"):
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    user = User(name="Archive Test")
+    db.add(user)
+    db.flush()
+    old = Call(user_id=user.id, external_call_id=f"{tag}-old", timestamp=OLD, current_score=7, status="completed")
+    db.add(old)
+    db.flush()
+    # Still active, and newer than the old call, so it stays hot
+    recent = Call(user_id=user.id, external_call_id=f"{tag}-recent", timestamp=datetime.now(), status="active")
+    db.add(recent)
+    db.add_all([
+        Transcript(call_id=old.id, speaker="CALLER", timestamp=OLD, text="There's smoke in the stairwell"),
+        Transcript(call_id=old.id, speaker="DISPATCHER", timestamp=OLD + timedelta(seconds=4), text="Get outside now"),
+        AIInsight(call_id=old.id, concern_tags="Fire", urgency_score=6),
+        AIInsight(call_id=old.id, concern_tags="Fire,Smoke", urgency_score=7),
+        Unit(call_id=old.id, status="arrived", eta=OLD, location="37.87,-122.27"),
+    ])
+    db.commit()
+    ids = old.id, recent.id
+    db.close()
+    return ids
+
+
+def test_archived_calls_are_served_from_the_archive(tmp_path, monkeypatch):
+    monkeypatch.setattr(call_archive, "archive_dir", str(tmp_path))
+    old_id, recent_id = seed_calls()
+
+    with TestClient(app) as client:
+        # Archive on the app's loop, like the periodic job
+        assert client.portal.call(call_archive.run, 30) == 1
+
+        with SessionLocal() as db:
+            assert db.get(Call, old_id) is None
+            assert db.query(Transcript).filter(Transcript.call_id == old_id).count() == 0
+            assert db.query(AIInsight).filter(AIInsight.call_id == old_id).count() == 0
+            assert db.get(Call, recent_id) is not None
+            entry = db.get(ArchivedCall, old_id)
+        assert entry.day == OLD.strftime("%Y-%m-%d")
+        assert os.path.exists(os.path.join(tmp_path, entry.path))
+        assert not os.path.exists(os.path.join(tmp_path, entry.path + ".tmp"))
+
+        call = client.get(f"/calls/{old_id}")
+        assert call.status_code == 200
+        assert call.json()["external_call_id"] == "archive-old"
+        assert call.json()["status"] == "completed"
+
+        snapshot = client.get(f"/calls/{old_id}/snapshot", params={"transcripts": 1}).json()
+        assert snapshot["ai_insight"]["urgency_score"] == 7
+        assert [t["text"] for t in snapshot["transcripts"]] == ["Get outside now"]
+        assert snapshot["units"][0]["status"] == "arrived"
+
+        assert client.get("/calls/999999").status_code == 404
+
+
+def test_failed_archive_transaction_leaves_no_part(tmp_path, monkeypatch):
+    monkeypatch.setattr(call_archive, "archive_dir", str(tmp_path))
+    old_id, _ = seed_calls("archive-failed")
+
+    def failing_delete(model):
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(archive_module, "delete", failing_delete)
+    with TestClient(app) as client:
+        with pytest.raises(RuntimeError):
+            client.portal.call(call_archive.run, 30)
+
+    # The call is still live, and no file could export it a second time
+    with SessionLocal() as db:
+        assert db.get(Call, old_id) is not None
+        assert db.get(ArchivedCall, old_id) is None
+    assert [names for _, _, names in os.walk(tmp_path) if names] == []
+    assert list(call_archive.iter_documents()) == []
@@ -0,0 +1,68 @@
+"""
+NDJSON export tests against the temporary SQLite database.
+
+Usage:
+    python -m pytest tests/test_streaming_export.py
+"""
+
+import json
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+from db.models import Base, engine, SessionLocal, User, Call, Transcript, AIInsight
+from services.call_archive import call_archive
+from main import app
+
+# Far enough back that no other test's calls fall in the window
+START = datetime(2001, 1, 1)
+
+
+def seed_calls():
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    user = User(name="Export Test")
+    db.add(user)
+    db.flush()
+    for n, status in enumerate(["completed", "completed", "active", "completed"]):
+        call = Call(user_id=user.id, external_call_id=f"export-{n}", timestamp=START + timedelta(hours=n), status=status)
+        db.add(call)
+        db.flush()
+        db.add_all([
+            Transcript(call_id=call.id, speaker="CALLER", timestamp=call.timestamp + timedelta(seconds=i),
+                       text=f"call {n} segment {i}")
+            for i in range(3)
+        ])
+        db.add(AIInsight(call_id=call.id, concern_tags="Fall", urgency_score=4 + n))
+    # A newer call, so the archive job may take every export call
+    db.add(Call(user_id=user.id, external_call_id="export-newest", timestamp=datetime.now(), status="active"))
+    db.commit()
+    db.close()
+
+
+def export(client, **params):
+    response = client.get("/export/calls", params=params)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_export_streams_calls_with_nested_children(tmp_path, monkeypatch):
+    monkeypatch.setattr(call_archive, "archive_dir", str(tmp_path))
+    seed_calls()
+    window = {"since": START.isoformat(), "until": (START + timedelta(days=1)).isoformat()}
+
+    with TestClient(app) as client:
+        calls = export(client, **window)
+        assert [call["external_call_id"] for call in calls] == ["export-0", "export-1", "export-2", "export-3"]
+        assert [t["text"] for t in calls[0]["transcripts"]] == [f"call 0 segment {i}" for i in range(3)]
+        assert calls[1]["ai_insights"][0]["urgency_score"] == 5
+
+        completed = export(client, status="completed", **window)
+        assert [call["external_call_id"] for call in completed] == ["export-0", "export-1", "export-3"]
+
+        # Archived calls are only exported on request
+        assert client.portal.call(call_archive.run, 365) >= 3
+        assert [call["external_call_id"] for call in export(client, **window)] == ["export-2"]
+        archived = export(client, status="completed", include_archived="true", **window)
+        assert [call["external_call_id"] for call in archived] == ["export-0", "export-1", "export-3"]
+        assert archived[2]["transcripts"][2]["text"] == "call 3 segment 2"
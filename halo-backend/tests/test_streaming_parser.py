@@ -0,0 +1,61 @@
+"""
+Streaming analysis parser tests: replies split at every possible point, including mid-token.
+
+Usage:
+    python -m pytest tests/test_streaming_parser.py
+"""
+
+import json
+import random
+
+from services.ai_prompts import StreamingAnalysisParser, parse_analysis
+
+REPLY = json.dumps({
+    "score": 10,
+    "concerns": ["Bleeding", "Perpetrator \"Present\"", "Perpetrator Present", "Not A Concern", "Bleeding"],
+    "summary": "Caller reports a stabbing; the attacker is still inside.",
+})
+
+
+def feed_all(chunks):
+    """Feed the chunks; returns the parser and the (score, concerns) seen after each change"""
+    parser = StreamingAnalysisParser()
+    seen = []
+    for chunk in chunks:
+        if parser.feed(chunk):
+            seen.append((parser.score, list(parser.concerns)))
+    return parser, seen
+
+
+def test_one_character_at_a_time():
+    parser, seen = feed_all(REPLY)
+    assert parser.score == 10
+    assert parser.concerns == ["Bleeding", "Perpetrator Present"]
+    # The score is never reported from a prefix of its digits ("1" of "10")
+    assert all(score == 10 for score, _ in seen)
+    # Each valid concern is reported once, as soon as its closing quote arrives
+    assert [concerns for _, concerns in seen] == [[], ["Bleeding"], ["Bleeding", "Perpetrator Present"]]
+
+
+def test_every_two_way_split_matches_the_full_parse():
+    expected = parse_analysis(REPLY)
+    for cut in range(1, len(REPLY)):
+        parser, _ = feed_all([REPLY[:cut], REPLY[cut:]])
+        assert (parser.score, parser.concerns) == (expected["score"], expected["concerns"]), cut
+
+
+def test_random_chunking_matches_the_full_parse():
+    rng = random.Random(7)
+    reply = json.dumps({"score": "7", "concerns": [], "summary": "Smoke in the stairwell"}, indent=2)
+    for _ in range(200):
+        cuts = sorted(rng.sample(range(1, len(reply)), 6))
+        chunks = [reply[start:end] for start, end in zip([0] + cuts, cuts + [len(reply)])]
+        parser, _ = feed_all(chunks)
+        assert parser.score == 7
+        assert parser.concerns == []
+        assert parser._concerns_done
+
+
+def test_score_is_clamped():
+    parser, _ = feed_all(['{"score": 4', '2, "concerns": [', "]}"])
+    assert parser.score == 10
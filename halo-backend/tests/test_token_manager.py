@@ -0,0 +1,116 @@
+"""
+Orkes token cache tests with a fake /api/token endpoint and a controllable clock.
+
+Usage:
+    python -m pytest tests/test_token_manager.py
+"""
+
+import base64
+import json
+import os
+from types import SimpleNamespace
+
+import orkes.token_manager as token_module
+from orkes.token_manager import OrkesTokenManager
+
+SERVER_URL = "http://orkes.test"
+
+
+def make_jwt(expires_at, serial=0):
+    payload = base64.urlsafe_b64encode(json.dumps({"exp": expires_at, "jti": serial}).encode()).decode()
+    return f"header.{payload.rstrip('=')}.signature"
+
+
+class FakeSession:
+    """Stands in for requests: every token request returns a new JWT valid for `lifetime` seconds"""
+
+    def __init__(self, clock, lifetime=300):
+        self.clock = clock
+        self.lifetime = lifetime
+        self.requests = []
+        self.fail = False
+
+    def post(self, url, json):
+        self.requests.append((url, json))
+        if self.fail:
+            return SimpleNamespace(status_code=503, text="unavailable", json=lambda: {})
+        token = make_jwt(self.clock[0] + self.lifetime, len(self.requests))
+        return SimpleNamespace(status_code=200, text="", json=lambda: {"token": token})
+
+
+def fake_clock(monkeypatch):
+    clock = [1_700_000_000.0]
+    monkeypatch.setattr(token_module, "time", SimpleNamespace(time=lambda: clock[0]))
+    return clock
+
+
+def make_manager(cache_path=None, key_id="key"):
+    return OrkesTokenManager(server_url=SERVER_URL, key_id=key_id, key_secret="secret",
+                             cache_path=cache_path, refresh_margin=60)
+
+
+def test_token_is_reused_until_the_refresh_margin(monkeypatch):
+    clock = fake_clock(monkeypatch)
+    session = FakeSession(clock)
+    manager = make_manager()
+
+    first = manager.get_token(session)
+    clock[0] += 239
+    assert manager.get_token(session) == first
+    assert len(session.requests) == 1
+
+    # Inside the last minute of its lifetime: refreshed ahead of expiry
+    clock[0] += 2
+    second = manager.get_token(session)
+    assert second != first
+    assert len(session.requests) == 2
+    assert session.requests[0] == (f"{SERVER_URL}/api/token", {"keyId": "key", "keySecret": "secret"})
+
+
+def test_failed_refresh_keeps_the_old_token_until_it_expires(monkeypatch):
+    clock = fake_clock(monkeypatch)
+    session = FakeSession(clock)
+    manager = make_manager()
+    token = manager.get_token(session)
+
+    session.fail = True
+    clock[0] += 250
+    assert manager.get_token(session) == token
+    clock[0] += 100
+    assert manager.get_token(session) is None
+    assert manager.get_stats()["failures"] == 2
+
+
+def test_invalidate_forces_a_new_token(tmp_path, monkeypatch):
+    clock = fake_clock(monkeypatch)
+    session = FakeSession(clock)
+    cache_path = str(tmp_path / "token.json")
+    manager = make_manager(cache_path)
+
+    first = manager.get_token(session)
+    assert os.path.exists(cache_path)
+    manager.invalidate()
+    # The disk copy goes too, or the next call would just read it back
+    assert not os.path.exists(cache_path)
+    clock[0] += 1
+    assert manager.get_token(session) != first
+    assert len(session.requests) == 2
+
+
+def test_disk_cache_is_read_back_for_the_same_key(tmp_path, monkeypatch):
+    clock = fake_clock(monkeypatch)
+    session = FakeSession(clock)
+    cache_path = str(tmp_path / "token.json")
+    token = make_manager(cache_path).get_token(session)
+    assert os.stat(cache_path).st_mode & 0o777 == 0o600
+
+    # The next script run starts with an empty manager
+    restarted = make_manager(cache_path)
+    assert restarted.get_token(session) == token
+    assert restarted.get_stats()["disk_hits"] == 1
+    assert len(session.requests) == 1
+
+    # A token issued for another key is not reused
+    other_key = make_manager(cache_path, key_id="other")
+    assert other_key.get_token(session) != token
+    assert len(session.requests) == 2
@@ -0,0 +1,55 @@
+"""
+Transcript cursor and ETag tests against the temporary SQLite database.
+
+Usage:
+    python -m pytest tests/test_transcript_feed.py
+"""
+
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+from db.models import Base, engine, SessionLocal, User, Call, Transcript
+from main import app
+
+NOW = datetime.now()
+
+
+def seed_call():
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    user = User(name="Feed Test")
+    db.add(user)
+    db.flush()
+    call = Call(user_id=user.id, external_call_id="feed-test", timestamp=NOW, status="active")
+    db.add(call)
+    db.flush()
+    segments = [Transcript(call_id=call.id, speaker="CALLER", timestamp=NOW + timedelta(seconds=i), text=f"segment {i}")
+                for i in range(5)]
+    db.add_all(segments)
+    db.commit()
+    ids = call.id, [segment.id for segment in segments]
+    db.close()
+    return ids
+
+
+def test_each_page_has_its_own_etag():
+    call_id, segment_ids = seed_call()
+    with TestClient(app) as client:
+        for path in (f"/calls/{call_id}/transcripts", "/test/calls/feed-test"):
+            full = client.get(path)
+            full_etag = full.headers["ETag"]
+            assert client.get(path, headers={"If-None-Match": full_etag}).status_code == 304
+
+            # A page the client has never seen is not "not modified" because of the full-list tag
+            page = client.get(path, params={"since_id": segment_ids[2]}, headers={"If-None-Match": full_etag})
+            assert page.status_code == 200
+            assert page.headers["ETag"] != full_etag
+            assert client.get(path, params={"since_id": segment_ids[2]},
+                              headers={"If-None-Match": page.headers["ETag"]}).status_code == 304
+            limited = client.get(path, params={"since_id": segment_ids[2], "limit": 1})
+            assert limited.headers["ETag"] not in (full_etag, page.headers["ETag"])
+
+        # since_ts pages the test route too
+        since = (NOW + timedelta(seconds=2)).isoformat()
+        newer = client.get("/test/calls/feed-test", params={"since_ts": since}).json()
+        assert [t["text"] for t in newer["transcripts"]] == ["segment 3", "segment 4"]
@@ -0,0 +1,114 @@
+"""
+Transcript ingest queue tests, with the database write replaced by a recorder.
+
+Usage:
+    python -m pytest tests/test_transcript_ingest.py
+"""
+
+import asyncio
+from datetime import datetime
+
+import pytest
+
+import services.transcript_ingest as ingest_module
+from services.transcript_ingest import TranscriptIngestQueue, TranscriptSegment
+
+
+def segment(n, call="ingest-call"):
+    return TranscriptSegment(external_call_id=call, speaker="CALLER", text=f"segment {n}", timestamp=datetime.now())
+
+
+def recording_queue(monkeypatch, failures=0, **options):
+    """A queue whose writes are recorded; the first `failures` writes raise"""
+    monkeypatch.setattr(ingest_module, "INGEST_RETRY_DELAY_MS", 0)
+    queue = TranscriptIngestQueue(**options)
+    queue.batches = []
+    attempts = {"count": 0}
+
+    async def write_batch(batch):
+        attempts["count"] += 1
+        if attempts["count"] <= failures:
+            raise RuntimeError("database is locked")
+        queue.batches.append([s.text for s in batch])
+        return [{"call_id": 1, "id": n, "speaker": s.speaker, "text": s.text, "timestamp": s.timestamp}
+                for n, s in enumerate(batch)]
+
+    queue._write_batch = write_batch
+    published = []
+    monkeypatch.setattr(ingest_module.live_updates, "publish_transcripts", published.extend)
+    monkeypatch.setattr(ingest_module.analysis_engine, "on_segments", lambda rows: None)
+    return queue, published
+
+
+def test_segments_are_batched_and_flushed_on_shutdown(monkeypatch):
+    queue, published = recording_queue(monkeypatch, batch_size=3, flush_interval_ms=300)
+
+    async def run():
+        for n in range(7):
+            await queue.submit(segment(n))
+        # Two full batches go out at once; the last segment waits for its interval or shutdown
+        await asyncio.sleep(0.05)
+        assert [len(batch) for batch in queue.batches] == [3, 3]
+        await queue.stop()
+
+    asyncio.run(run())
+    assert [len(batch) for batch in queue.batches] == [3, 3, 1]
+    assert [row["text"] for row in published] == [f"segment {n}" for n in range(7)]
+    assert queue.get_stats()["flushed_segments"] == 7
+
+
+def test_commit_mode_acks_after_the_write(monkeypatch):
+    queue, _ = recording_queue(monkeypatch, failures=1, ack_mode="commit", flush_interval_ms=1)
+
+    async def run():
+        await queue.submit(segment(0))
+        # Acknowledged only once written, after one retry
+        assert queue.batches == [["segment 0"]]
+        await queue.stop()
+
+    asyncio.run(run())
+    stats = queue.get_stats()
+    assert stats["retried_batches"] == 1 and stats["failed_batches"] == 0
+
+
+def test_commit_mode_reports_a_write_that_fails_twice(monkeypatch):
+    queue, published = recording_queue(monkeypatch, failures=2, ack_mode="commit", flush_interval_ms=1)
+
+    async def run():
+        with pytest.raises(RuntimeError):
+            await queue.submit(segment(0))
+        await queue.stop()
+
+    asyncio.run(run())
+    assert published == []
+    # The webhook returned an error and VAPI retries, so nothing counts as dropped
+    assert queue.get_stats()["dropped_segments"] == 0
+
+
+def test_side_effect_errors_do_not_fail_a_committed_batch(monkeypatch):
+    queue, _ = recording_queue(monkeypatch, ack_mode="commit", flush_interval_ms=1)
+
+    def broken(rows):
+        raise ValueError("subscriber bug")
+
+    monkeypatch.setattr(ingest_module.analysis_engine, "on_segments", broken)
+
+    async def run():
+        await queue.submit(segment(0))  # would raise if the batch were treated as failed
+        await queue.stop()
+
+    asyncio.run(run())
+    stats = queue.get_stats()
+    assert stats["failed_batches"] == 0 and stats["side_effect_errors"] == 1
+
+
+def test_enqueue_mode_logs_segments_it_drops(monkeypatch, capsys):
+    queue, _ = recording_queue(monkeypatch, failures=2, flush_interval_ms=1)
+
+    async def run():
+        await queue.submit(segment(0, call="lost-call"))
+        await queue.stop()
+
+    asyncio.run(run())
+    assert queue.get_stats()["dropped_segments"] == 1
+    assert 'Dropped transcript segment: {"external_call_id": "lost-call"' in capsys.readouterr().out
@@ -0,0 +1,110 @@
+"""
+Transcript search tests against the temporary SQLite database (FTS5).
+
+Usage:
+    python -m pytest tests/test_transcript_search.py
+"""
+
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+from db.models import Base, engine, SessionLocal, User, Call, Transcript
+from main import app
+
+NOW = datetime.now()
+
+
+def seed_calls():
+    db = SessionLocal()
+    user = User(name="Search Test")
+    db.add(user)
+    db.flush()
+    active = Call(user_id=user.id, external_call_id="search-active", timestamp=NOW, status="active")
+    done = Call(user_id=user.id, external_call_id="search-done", timestamp=NOW, status="completed")
+    db.add_all([active, done])
+    db.flush()
+    db.add_all([
+        Transcript(call_id=active.id, speaker="CALLER", timestamp=NOW, text="He has a knife and he's bleeding"),
+        Transcript(call_id=active.id, speaker="DISPATCHER", timestamp=NOW + timedelta(seconds=5),
+                   text="Is anyone else bleeding? <stay> on the line"),
+        Transcript(call_id=done.id, speaker="CALLER", timestamp=NOW - timedelta(days=1),
+                   text="My neighbour has a knife collection, nobody is hurt"),
+    ])
+    db.commit()
+    db.close()
+
+
+def test_search_transcripts():
+    # The tables must exist before startup creates the index on them
+    Base.metadata.create_all(bind=engine)
+    with TestClient(app) as client:
+        # Startup created the index; rows written afterwards reach it through the triggers
+        seed_calls()
+        search = lambda **params: client.get("/search/transcripts", params=params).json()
+
+        phrase = search(q='"has a knife"')["results"]
+        assert {r["external_call_id"] for r in phrase} == {"search-active", "search-done"}
+        assert "He <mark>has a knife</mark> and he's bleeding" in [r["snippet"] for r in phrase]
+
+        # Prefix, stemmed, escaped, and filtered by call status
+        prefix = search(q="bleed*", status="active")["results"]
+        assert len(prefix) == 2
+        assert all(r["call_status"] == "active" for r in prefix)
+        assert any("&lt;stay&gt;" in r["snippet"] for r in prefix)
+        assert search(q="knife", since=(NOW - timedelta(hours=1)).isoformat())["results"][0]["speaker"] == "CALLER"
+        assert len(search(q="knife", since=(NOW - timedelta(hours=1)).isoformat())["results"]) == 1
+
+        first = search(q="knife", limit=1)
+        assert len(first["results"]) == 1 and first["next_offset"] == 1
+        second = search(q="knife", limit=1, offset=1)
+        assert second["next_offset"] is None
+        assert second["results"][0]["transcript_id"] != first["results"][0]["transcript_id"]
+
+        # Operators and stray quotes are searched as plain words, not parsed
+        assert search(q='knife NOT "')["results"] == []
+        assert len(search(q='knife AND "')["results"]) == 1
+
+
+def test_search_on_an_unsupported_database_is_501():
+    from types import SimpleNamespace
+    from db.models import get_async_db
+
+    async def postgres_session():
+        yield SimpleNamespace(bind=SimpleNamespace(dialect=SimpleNamespace(name="postgresql")))
+
+    app.dependency_overrides[get_async_db] = postgres_session
+    try:
+        with TestClient(app) as client:
+            response = client.get("/search/transcripts", params={"q": "knife"})
+    finally:
+        del app.dependency_overrides[get_async_db]
+    assert response.status_code == 501
+    assert "postgresql" in response.json()["detail"]
+
+
+def test_search_without_the_index_is_501(tmp_path):
+    import os
+    from sqlalchemy import create_engine
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+    from db.models import get_async_db
+
+    # Tables from the models, but no FTS table (the migration has not run)
+    path = os.path.join(tmp_path, "no_index.db")
+    sync_engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=sync_engine)
+    sync_engine.dispose()
+    unindexed = create_async_engine(f"sqlite+aiosqlite:///{path}")
+
+    async def unindexed_session():
+        async with async_sessionmaker(unindexed, class_=AsyncSession)() as db:
+            yield db
+
+    app.dependency_overrides[get_async_db] = unindexed_session
+    try:
+        with TestClient(app) as client:
+            response = client.get("/search/transcripts", params={"q": "knife"})
+            client.portal.call(unindexed.dispose)
+    finally:
+        del app.dependency_overrides[get_async_db]
+    assert response.status_code == 501
+    assert "index" in response.json()["detail"]
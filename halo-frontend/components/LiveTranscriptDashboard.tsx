@@ -14,6 +14,11 @@ interface TranscriptEntry {
   keywords?: string[];
 }
 
+const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || "http://localhost:8000";
+const WS_BASE_URL = API_BASE_URL.replace(/^http/, "ws");
+// How often to look for a newer call when no specific call is tracked
+const LATEST_CALL_POLL_MS = 5000;
+
 interface LiveTranscriptDashboardProps {
   darkMode?: boolean;
   externalCallId?: string; // Optional: to track a specific call
@@ -29,6 +34,10 @@ export default function LiveTranscriptDashboard({
   const [lastUpdateTime, setLastUpdateTime] = useState<Date>(new Date());
   const [error, setError] = useState<string | null>(null);
   const transcriptEndRef = useRef<HTMLDivElement>(null);
+  // Highest transcript id received; sent as the resume cursor on reconnect
+  const lastTranscriptIdRef = useRef<number>(0);
+  // Call currently shown, read by the new-call check
+  const currentCallIdRef = useRef<number | undefined>(undefined);
   
   // Auto-scroll to bottom when new transcripts arrive
   const scrollToBottom = () => {
@@ -39,6 +48,21 @@ export default function LiveTranscriptDashboard({
     scrollToBottom();
   }, [transcripts]);
 
+  // Show a call's snapshot; its live updates then arrive over the WebSocket below
+  const showCall = (data: ApiCallWithTranscripts) => {
+    currentCallIdRef.current = data.call.id;
+    setCallData(data);
+    
+    // Transform transcripts to frontend format
+    const frontendTranscripts = data.transcripts.map(transformTranscriptToFrontend);
+    setTranscripts(frontendTranscripts);
+    lastTranscriptIdRef.current = data.transcripts.reduce(
+      (maxId: number, t: any) => Math.max(maxId, t.id ?? 0),
+      0
+    );
+    setLastUpdateTime(new Date());
+  };
+
   // Fetch data from backend
   const fetchData = async () => {
     try {
@@ -54,12 +78,7 @@ export default function LiveTranscriptDashboard({
       }
       
       if (data) {
-        setCallData(data);
-        
-        // Transform transcripts to frontend format
-        const frontendTranscripts = data.transcripts.map(transformTranscriptToFrontend);
-        setTranscripts(frontendTranscripts);
-        setLastUpdateTime(new Date());
+        showCall(data);
       } else {
         setError("No active calls found");
       }
@@ -71,14 +90,111 @@ export default function LiveTranscriptDashboard({
     }
   };
 
-  // Auto-refresh every 2 seconds for live updates
+  // Initial snapshot; live updates arrive over the WebSocket below
   useEffect(() => {
-    fetchData(); // Initial fetch
-    
-    const interval = setInterval(fetchData, 2000);
-    return () => clearInterval(interval);
+    fetchData();
+  }, [externalCallId]);
+
+  // Following the most recent call: the socket only covers the call already shown,
+  // so look for a newer active call now and then and switch to it when one starts
+  useEffect(() => {
+    if (externalCallId) return;
+    const timer = setInterval(async () => {
+      try {
+        const latest = await fetchLatestCall();
+        if (!latest || latest.call.id === currentCallIdRef.current) return;
+        if (currentCallIdRef.current !== undefined && latest.call.status !== "active") return;
+        setError(null);
+        showCall(latest);
+      } catch (err) {
+        console.error("Error checking for a new call:", err);
+      }
+    }, LATEST_CALL_POLL_MS);
+    return () => clearInterval(timer);
   }, [externalCallId]);
 
+  // Subscribe to pushed updates for the call, resuming from the last seen segment on reconnect
+  const liveCallId = callData?.call.id;
+  useEffect(() => {
+    if (!liveCallId) return;
+
+    let socket: WebSocket | null = null;
+    let retryTimer: ReturnType<typeof setTimeout> | undefined;
+    let retryDelay = 1000;
+    let closed = false;
+
+    // Missed score/status changes come from the snapshot, missed segments from the transcript cursor
+    const resync = async () => {
+      try {
+        const [snapshot, missed] = await Promise.all([
+          fetch(`${API_BASE_URL}/calls/${liveCallId}/snapshot?transcripts=1`).then((r) => r.json()),
+          fetch(
+            `${API_BASE_URL}/calls/${liveCallId}/transcripts?since_id=${lastTranscriptIdRef.current}`
+          ).then((r) => r.json()),
+        ]);
+        if (closed) return;
+        setCallData((current) =>
+          current ? { ...current, call: { ...current.call, ...snapshot.call } } : current
+        );
+        const fresh = missed.filter((t: any) => t.id > lastTranscriptIdRef.current);
+        if (fresh.length > 0) {
+          lastTranscriptIdRef.current = fresh[fresh.length - 1].id;
+          setTranscripts((current) => [...current, ...fresh.map(transformTranscriptToFrontend)]);
+        }
+        setLastUpdateTime(new Date());
+      } catch (err) {
+        console.error("Error resyncing live call:", err);
+      }
+    };
+
+    const connect = () => {
+      socket = new WebSocket(
+        `${WS_BASE_URL}/ws/calls/${liveCallId}?since_id=${lastTranscriptIdRef.current}`
+      );
+      socket.onopen = () => {
+        retryDelay = 1000;
+      };
+      socket.onmessage = (message) => {
+        const event = JSON.parse(message.data);
+        if (event.type === "transcript") {
+          if (event.id <= lastTranscriptIdRef.current) return;
+          lastTranscriptIdRef.current = event.id;
+          setTranscripts((current) => [...current, transformTranscriptToFrontend(event)]);
+        } else if (event.type === "score" || event.type === "status") {
+          setCallData((current) =>
+            current
+              ? {
+                  ...current,
+                  call: {
+                    ...current.call,
+                    ...(event.type === "score" ? { current_score: event.score } : { status: event.status }),
+                  },
+                }
+              : current
+          );
+        } else if (event.type === "resync") {
+          // Events were dropped while this dashboard lagged; reload what they would have changed
+          resync();
+        } else if (event.type === "ping") {
+          return;
+        }
+        setLastUpdateTime(new Date());
+      };
+      socket.onclose = () => {
+        if (closed) return;
+        retryTimer = setTimeout(connect, retryDelay);
+        retryDelay = Math.min(retryDelay * 2, 30000);
+      };
+    };
+
+    connect();
+    return () => {
+      closed = true;
+      clearTimeout(retryTimer);
+      socket?.close();
+    };
+  }, [liveCallId]);
+
   const cardClasses = darkMode ? "bg-gray-800 border-gray-700 text-white" : "bg-white border-[#FFD700]/20 shadow-lg";
 
   if (isLoading && !callData) {
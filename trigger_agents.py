@@ -15,6 +15,9 @@ load_dotenv(dotenv_path)
 # Get Orkes server URL from environment variable or use default
 orkes_server_url = os.environ.get("ORKES_SERVER_URL", "https://developer.orkescloud.com")
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "halo-backend"))
+from orkes.token_manager import token_manager
+
 # Default values
 DEFAULT_API_URL = f"{orkes_server_url}/api/workflow"
 DEFAULT_WORKFLOW = "urgency_score_agent"
@@ -38,36 +41,7 @@ def load_test_transcript(file_path=None):
 
 def get_jwt_token():
     """Get a JWT token from the Orkes API using key ID and secret"""
-    token_url = f"{orkes_server_url}/api/token"
-    
-    # Get key ID and secret from environment variables
-    key_id = os.environ.get("ORKES_KEY_ID")
-    key_secret = os.environ.get("ORKES_KEY_SECRET")
-    
-    if not key_id or not key_secret:
-        print("Error: ORKES_KEY_ID and ORKES_KEY_SECRET environment variables are required")
-        return None
-    
-    print(f"Using key ID: {key_id[:5]}...")
-    
-    payload = {
-        "keyId": key_id,
-        "keySecret": key_secret
-    }
-    
-    try:
-        response = requests.post(token_url, json=payload)
-        if response.status_code == 200:
-            jwt_token = response.json().get("token")
-            print(f"Successfully obtained JWT token")
-            return jwt_token
-        else:
-            print(f"Error getting JWT token: {response.status_code}")
-            print(f"Response: {response.text}")
-            return None
-    except Exception as e:
-        print(f"Error getting JWT token: {e}")
-        return None
+    return token_manager.get_token()
 
 def trigger_workflow(workflow_name, call_id, transcript, backend_url=DEFAULT_BACKEND_URL, 
                     api_url=DEFAULT_API_URL):
@@ -117,7 +91,7 @@ def trigger_workflow(workflow_name, call_id, transcript, backend_url=DEFAULT_BAC
 def main():
     parser = argparse.ArgumentParser(description="Trigger Orkes workflow agents")
     
-    parser.add_argument("--workflow", "-w", choices=["urgency_score_agent", "key_concerns_agent"], 
+    parser.add_argument("--workflow", "-w", choices=["urgency_score_agent", "key_concerns_agent", "call_analysis_agent"], 
                         default=DEFAULT_WORKFLOW, help="Workflow to trigger")
     parser.add_argument("--call-id", "-c", default=DEFAULT_CALL_ID, 
                         help="Call ID to use for the workflow")